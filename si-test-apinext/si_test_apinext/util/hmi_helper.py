@@ -7,6 +7,7 @@ from typing import Optional
 
 from si_test_apinext.idc23 import HMI_BUTTONS_REF_IMG_PATH
 import si_test_apinext.util.driver_utils as utils
+from si_test_apinext.util.image_handle import ImageHandle
 from si_test_apinext.util.screenshot_utils import capture_screenshot, compare_snapshot, match_template
 
 logger = logging.getLogger(__name__)
@@ -48,15 +49,15 @@ class HMIhelper:
         """
         elem_bounds, ref_imgs_list = self.check_button_status_base(button, self.ref_images_dir, image_pattern)
         screenshot = capture_screenshot(test=self.test, test_name=test_name, results_dir_path=self.results_dir_path)
-        for ref_img in ref_imgs_list:
-            result, _ = match_template(
-                image=screenshot,
-                image_to_search=ref_img,
-                region=elem_bounds,
-                results_path=self.results_dir_path,
-                acceptable_diff=6.0,
-                save_diff=True,
-            )
+        match_results = match_template(
+            image=screenshot,
+            image_to_search=ref_imgs_list,
+            region=elem_bounds,
+            results_path=self.results_dir_path,
+            acceptable_diff=6.0,
+            save_diff=True,
+        )
+        for ref_img, (result, _) in zip(ref_imgs_list, match_results):
             if result:
                 return "button_on" in Path(ref_img).stem
         return False
@@ -76,9 +77,15 @@ class HMIhelper:
             button, self.ref_images_dir, button_reference + "*.png"
         )
         comparison_results = []
+        screenshot_image = ImageHandle.open(screenshot)
         for file_path in files_data:
             result, error = compare_snapshot(
-                screenshot, file_path, test_name + "_compare", fuzz_percent=20, region=elem_bounds, unlink_files=True
+                screenshot_image,
+                file_path,
+                test_name + "_compare",
+                fuzz_percent=20,
+                region=elem_bounds,
+                unlink_files=True,
             )
             comparison_results.append(result)
             if result:
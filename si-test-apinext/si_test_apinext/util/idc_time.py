@@ -5,8 +5,8 @@ import time
 import os
 
 from dateutil import parser
-from mtee.testing.tools import image_to_text, OcrMode, TimeoutCondition
-from si_test_apinext.util.screenshot_utils import crop_image
+from mtee.testing.tools import OcrMode, TimeoutCondition
+from si_test_apinext.util.ocr_service import ocr_service
 
 TimeTrustee_base = "TimeTrusteeSDaT.getSecureDateAndTime."
 TimeTrustee_tta = TimeTrustee_base + "ttaQualifier"
@@ -55,25 +55,30 @@ def get_current_time_from_ui(test, element=None, idc_ui_time_box_bounds=None, in
     screenshot_name = "IDC_CID_screenshot.png"
     screenshot_path = os.path.join(test.results_dir, screenshot_name)
     test.apinext_target.take_screenshot(screenshot_path)
-    curr_time_shot = os.path.join(test.results_dir, "current_time_screenshot.png")
-    for bounds in idc_ui_time_box_bounds:
-        crop_image(screenshot_path, bounds, output=curr_time_shot)
-        logger.info("Searching for text on image: " + curr_time_shot)
-        time_regex = re.compile("^(2[0-3]|[01]?[0-9]):([0-5][0-9])$")  # noqa: W605
-        error = []
+    logger.info("Searching for text on image: " + screenshot_path)
+    time_regex = re.compile("^(2[0-3]|[01]?[0-9]):([0-5][0-9])$")  # noqa: W605
+    # Submit all the time boxes and OCR modes at once, so they are recognized concurrently
+    ocr_jobs = [
+        dict(image=screenshot_path, region=bounds, invert=invert, pagesegmode=pagesegmode)
+        for bounds in idc_ui_time_box_bounds
         for pagesegmode in (
             OcrMode.PAGE_SEGMENTATION_WITHOUT_OSD,
             OcrMode.SINGLE_UNIFORM_BLOCK_OF_TEXT,
             OcrMode.SINGLE_LINE,
-        ):
-            text = image_to_text(curr_time_shot, invert=invert, pagesegmode=pagesegmode)
-            logger.debug(f"Found this UI time: '{text}', with len:{len(text)}, on image: {curr_time_shot}")
+        )
+    ]
+    ocr_results = ocr_service.submit_batch(ocr_jobs)
+    try:
+        for ocr_job, ocr_result in zip(ocr_jobs, ocr_results):
+            text = ocr_result.result()
+            logger.debug(f"Found this UI time: '{text}', with len:{len(text)}, on box: {ocr_job['region']}")
             if text and re.search(time_regex, text):
-                assert re.search(time_regex, text), f"The text found doesn't have the expected format: {text}"
                 hour, minute = re.search(time_regex, text).group(1), re.search(time_regex, text).group(2)
                 return datetime.datetime.now().replace(hour=int(hour), minute=int(minute))
             else:
-                error.append(f"Extracted text: '{text}' using OCR mode:'{pagesegmode}'")
+                logger.debug(f"Extracted text: '{text}' using OCR mode:'{ocr_job['pagesegmode']}'")
+    finally:
+        ocr_service.cancel(ocr_results)
 
 
 def get_time_zone_offset(time_zone_str):
@@ -0,0 +1,135 @@
+"""In-memory image handles, to chain crop/contrast/OCR on screenshots without temporary files
+
+A screenshot is decoded once into a NumPy array and every following operation works on that array:
+
+    screenshot = ImageHandle.open(screenshot_path)
+    background = screenshot.crop(region)
+    background.save(cropped_path)
+    extract_text(screenshot, region=text_region)
+
+Crops are views of the decoded screenshot, so they cost no copy. Images are only written to disk by 'save',
+e.g. to keep the artifacts of a failed check, or by 'save_artifact' when SAVE_IMAGE_ARTIFACTS=1 is set to
+debug the tests.
+"""
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from PIL import Image, ImageEnhance
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Set SAVE_IMAGE_ARTIFACTS=1 to write the intermediate images (crops) of the image checks to disk
+SAVE_IMAGE_ARTIFACTS = int(os.getenv("SAVE_IMAGE_ARTIFACTS", "0"))
+
+
+class ImageHandle:
+    """Decoded RGB image kept in memory as a read-only (height, width, 3) uint8 NumPy array"""
+
+    def __init__(self, array, name="image", source_path=None):
+        """
+        Param array: (height, width, 3) uint8 array with the RGB pixels
+        Param name: name used on the artifacts written for this image
+        Param source_path: path of the file the image was decoded from, if any.
+            Artifacts are written next to it by default.
+        """
+        self.array = array
+        self.array.setflags(write=False)
+        self.name = name
+        self.source_path = Path(source_path) if source_path else None
+
+    @classmethod
+    def open(cls, image):
+        """Returns an ImageHandle for an image path, a PIL image or an ImageHandle (returned as it is)
+
+        Param image: path (str or Path) of the image file, PIL Image or ImageHandle
+        Raises RuntimeError: if the image file doesn't exist or is empty
+        """
+        if isinstance(image, ImageHandle):
+            return image
+        if isinstance(image, Image.Image):
+            return cls(np.array(image.convert("RGB")))
+
+        image_path = Path(image)
+        if not image_path.exists() or image_path.stat().st_size == 0:
+            raise RuntimeError(f"Image file size is 0 or file not found at: {image_path}")
+        with Image.open(image_path) as img:
+            array = np.array(img.convert("RGB"))
+        return cls(array, name=image_path.stem, source_path=image_path)
+
+    def __repr__(self):
+        return f"ImageHandle({self.name}, {self.width}x{self.height})"
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    @property
+    def size(self):
+        """Image size as (width, height), same as PIL"""
+        return self.width, self.height
+
+    def to_pil(self):
+        """Returns the image as a PIL Image, e.g. to draw on it or to use PIL filters"""
+        return Image.fromarray(self.array)
+
+    def crop(self, box):
+        """Returns the region of the image given by box, without copying the pixels
+
+        Param box: (left, upper, right, lower) coordinates, as on PIL 'Image.crop'.
+            Regions outside of the image are filled with black, also as on PIL.
+        """
+        left, upper, right, lower = (int(coordinate) for coordinate in box)
+        if 0 <= left <= right <= self.width and 0 <= upper <= lower <= self.height:
+            array = self.array[upper:lower, left:right]
+        else:
+            array = np.array(self.to_pil().crop((left, upper, right, lower)))
+        return ImageHandle(array, name=f"{self.name}_cropped", source_path=self.source_path)
+
+    def enhance_contrast(self, contrast_ratio):
+        """Returns a copy of the image with its contrast changed by the given ratio"""
+        image = ImageEnhance.Contrast(self.to_pil()).enhance(contrast_ratio)
+        return ImageHandle(np.array(image), name=self.name, source_path=self.source_path)
+
+    def default_artifact_path(self, suffix=".png"):
+        """Returns the default path of this image artifacts: next to the source image, or on the temp dir"""
+        directory = self.source_path.parent if self.source_path else Path(tempfile.gettempdir())
+        return directory / f"{self.name}{suffix}"
+
+    def save(self, path=None, **kwargs):
+        """Writes the image to disk
+
+        Param path: path of the file to write, defaults to 'default_artifact_path'
+        Param kwargs: extra arguments for PIL 'Image.save', e.g. compress_level
+        Returns: path of the written file
+        """
+        path = Path(path) if path else self.default_artifact_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.to_pil().save(path, **kwargs)
+        logger.debug(f"Image {self} written to '{path}'")
+        return path
+
+    def save_artifact(self, path=None):
+        """Writes the image to disk only when SAVE_IMAGE_ARTIFACTS is enabled, see 'save'
+
+        Returns: path of the written file, or None if it was not written
+        """
+        return self.save(path) if SAVE_IMAGE_ARTIFACTS else None
+
+    @contextmanager
+    def temporary_file(self):
+        """Writes the image to an uncompressed temporary file, removed on exit, for tools which only read files
+
+        e.g. tesseract:
+            with cropped_image.temporary_file() as image_path:
+                image_to_text(image_path)
+        """
+        with tempfile.TemporaryDirectory(prefix="image_handle_") as temporary_dir:
+            yield str(self.save(Path(temporary_dir, f"{self.name}.png"), compress_level=0))
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mtee.testing.tools import OcrMode, image_to_text
+from si_test_apinext.util.image_handle import ImageHandle
+
+logger = logging.getLogger(__name__)
+
+# Number of OCR jobs run at the same time, each one on its own tesseract process
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# Number of OCR results kept, to answer identical jobs (same pixels, language, mode and options) without OCR
+OCR_RESULT_CACHE_SIZE = 512
+
+
+class OcrService:
+    """
+    Pool of OCR workers, to run the OCR of several regions and page segmentation modes concurrently.
+
+    Jobs are submitted one by one ('submit') or in batches ('submit_batch') and their text is returned as
+    futures. Identical jobs, i.e. the same pixels recognized with the same language, mode and options, are
+    only recognized once: they share the future of the first one. Each submit of a pending job is counted, so
+    'cancel' only cancels it when none of its callers are waiting for it anymore.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, cache_size=OCR_RESULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr_worker")
+        self._results = OrderedDict()
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def submit(self, image, region=None, lang="eng", pagesegmode=OcrMode.PAGE_SEGMENTATION_WITHOUT_OSD, **options):
+        """
+        Submit an OCR job.
+
+        Param image: Path of the image file, or its ImageHandle.
+        Param region: Optional box (left, upper, right, lower) to recognize, cropped in memory.
+        Param lang: Language which tesseract should consider when extracting the text.
+        Param pagesegmode: Page segmentation mode to control layout analysis.
+        Param options: Extra image_to_text options (brightness, contrast, monochrome, invert, resize_height
+            and resize_width).
+        Returns: Future with the extracted text.
+        """
+        if region or isinstance(image, ImageHandle):
+            image = ImageHandle.open(image)
+            if region:
+                image = image.crop(region)
+                image.save_artifact()
+            content_digest = hashlib.blake2b(image.array.tobytes(), digest_size=16)
+            content_digest.update(repr(image.array.shape).encode())
+        else:
+            if not os.path.exists(image) or os.stat(image).st_size == 0:
+                raise RuntimeError(f"Image file size is 0 or file not found at: {image}")
+            content_digest = hashlib.blake2b(Path(image).read_bytes(), digest_size=16)
+
+        key = (content_digest.hexdigest(), lang, pagesegmode, tuple(sorted(options.items())))
+        with self._lock:
+            if key in self._results and not self._is_failed(self._results[key]):
+                self._results.move_to_end(key)
+                self.hits += 1
+                future = self._results[key]
+                if future in self._waiters:
+                    self._waiters[future] += 1
+                return future
+            self.misses += 1
+            future = self._executor.submit(self._recognize, image, lang, pagesegmode, options)
+            self._results[key] = future
+            self._waiters[future] = 1
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        # Outside the lock, the callback runs right away if the job is already done
+        future.add_done_callback(self._release)
+        return future
+
+    def submit_batch(self, jobs):
+        """
+        Submit several OCR jobs at once, e.g. all the regions and page segmentation modes of a check.
+
+        Param jobs: List of dicts with the 'submit' arguments, e.g. {"image": path, "region": box, "pagesegmode": 7}.
+        Returns: List with a future per job, in the same order as the jobs.
+        """
+        # Decode each image file only once for all its regions
+        images = {}
+        futures = []
+        for job in jobs:
+            job = dict(job)
+            if job.get("region") and not isinstance(job["image"], ImageHandle):
+                if job["image"] not in images:
+                    images[job["image"]] = ImageHandle.open(job["image"])
+                job["image"] = images[job["image"]]
+            futures.append(self.submit(**job))
+        return futures
+
+    def cancel(self, futures):
+        """
+        Cancel the OCR jobs which didn't start yet, e.g. the rest of a batch once a match is found.
+
+        A job shared with other callers which are still waiting for it is not cancelled, only released by this one.
+
+        Param futures: Futures returned by 'submit' or 'submit_batch', each one cancelled once per submit.
+            Cancelled jobs are recognized again if they are submitted later.
+        """
+        for future in futures:
+            with self._lock:
+                if future not in self._waiters:
+                    continue
+                self._waiters[future] -= 1
+                if self._waiters[future] > 0:
+                    continue
+            future.cancel()
+
+    def _release(self, future):
+        with self._lock:
+            self._waiters.pop(future, None)
+
+    @staticmethod
+    def _is_failed(future):
+        return future.cancelled() or (future.done() and future.exception() is not None)
+
+    @staticmethod
+    def _recognize(image, lang, pagesegmode, options):
+        if isinstance(image, ImageHandle):
+            # The OCR engine only reads files, so the image is handed to it through an uncompressed temporary file
+            with image.temporary_file() as image_path:
+                return image_to_text(image_path, lang=lang, pagesegmode=pagesegmode, **options)
+        return image_to_text(image, lang=lang, pagesegmode=pagesegmode, **options)
+
+    def clear(self):
+        """
+        Remove all the OCR results kept.
+        """
+        with self._lock:
+            self._results.clear()
+
+
+ocr_service = OcrService()
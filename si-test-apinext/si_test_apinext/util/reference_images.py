@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Maximum memory used by the decoded reference images kept in the cache
+REFERENCE_IMAGE_CACHE_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes
+
+CachedReferenceImage = namedtuple("CachedReferenceImage", ["path", "array", "mean", "square_norm"])
+
+
+class ReferenceImageCache:
+    """
+    Process-wide cache of decoded reference images, to decode each reference at most once per session.
+
+    Images are kept as read-only grayscale ("L") NumPy arrays, optionally cropped to a region, together with
+    statistics used by the image comparisons. Entries are keyed by path, mtime and region, so a reference
+    updated on disk is decoded again. The least recently used entries are evicted when the memory budget
+    is exceeded.
+    """
+
+    def __init__(self, memory_budget=REFERENCE_IMAGE_CACHE_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, image_path, region=None):
+        """
+        Get a reference image from the cache, decoding it if needed.
+
+        Param image_path: Path of the reference image.
+        Param region: Optional box (left, upper, right, lower) to crop from the reference image.
+        Returns: CachedReferenceImage with the grayscale array and its statistics.
+        """
+        image_path = os.path.abspath(image_path)
+        key = (image_path, os.stat(image_path).st_mtime_ns, tuple(region) if region else None)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        with Image.open(image_path) as image:
+            if region:
+                image = image.crop(region)
+            array = np.asarray(image.convert(mode="L"), dtype=np.float64)
+        array.setflags(write=False)
+        entry = CachedReferenceImage(image_path, array, float(np.mean(array)), float(np.sum(array**2)))
+
+        with self._lock:
+            self.misses += 1
+            # Drop the entries decoded from an older version of the same file
+            stale_keys = [k for k in self._entries if k[0] == image_path and k[1] != key[1]]
+            for stale_key in stale_keys:
+                self._remove(stale_key)
+            self._entries[key] = entry
+            self.memory_used += array.nbytes
+            while self.memory_used > self.memory_budget and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+        logger.debug(f"Reference image '{image_path}' decoded, {len(self)} images cached")
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.memory_used -= entry.array.nbytes
+
+    def clear(self):
+        """
+        Remove all the reference images from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.memory_used = 0
+
+
+reference_image_cache = ReferenceImageCache()
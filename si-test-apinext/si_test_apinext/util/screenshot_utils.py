@@ -3,21 +3,29 @@ import logging
 import os
 import re
 import time
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Optional, Tuple
 
+import numpy as np
 import si_test_apinext.util.driver_utils as utils
-from mtee.testing.tools import OcrMode, image_to_text, retry_on_except
+from mtee.testing.tools import OcrMode, retry_on_except
 from mtee_apinext.util.images import compare_images
-from PIL import Image, ImageChops, ImageDraw, ImageStat
+from PIL import Image, ImageChops, ImageDraw
 from selenium.common.exceptions import ScreenshotException
 from si_test_apinext.testing.test_base import TestBase
+from si_test_apinext.util.image_handle import ImageHandle
+from si_test_apinext.util.ocr_service import ocr_service
+from si_test_apinext.util.reference_images import reference_image_cache
 
 logger = logging.getLogger(__name__)
 screenshot_cmd = (
     'echo -n "/tmp/screenshot_blah_SCREEN_XXXXXXXX.png" | socat -u STDIN UNIX-CONNECT:/var/run/logntrace/command'
 )
 
+# Offsets with the lowest SSD on which match_template computes the exact diff ratio
+MATCH_TEMPLATE_CANDIDATES = 16
+
 
 @retry_on_except(retry_count=3)
 def capture_screenshot(test: TestBase, test_name: str, bounds=None, results_dir_path=""):
@@ -68,7 +76,7 @@ def extract_text(
     """
     -Extract the text present in the given screenshot via OCR
     Args:
-            screenshot - File path of the captured screenshot.
+            screenshot - File path of the captured screenshot, or its ImageHandle.
             region - area which will be used to extract the text.
             brightness - Brightness multiplier.
             contrast - Contrast multiplier.
@@ -82,14 +90,11 @@ def extract_text(
             image_text - Extracted text from the image
             regex.findall - returns list of the matched regex
     """
-    if os.path.exists(screenshot) and os.stat(screenshot).st_size > 0:
-        logger.info(f"Searching for text on image: '{screenshot}'")
-        image_path = screenshot
-        if region:
-            image_path = os.path.join(Path(screenshot).parent, Path(screenshot).stem + "_cropped.png")
-            crop_image(screenshot, region, image_path)
-        image_text = image_to_text(
-            image_path,
+    logger.info(f"Searching for text on image: '{screenshot}'")
+    image_text = (
+        ocr_service.submit(
+            screenshot,
+            region=region,
             lang=lang,
             monochrome=monochrome,
             brightness=brightness,
@@ -98,13 +103,12 @@ def extract_text(
             resize_height=resize_height,
             resize_width=resize_width,
             pagesegmode=pagesegmode,
-        ).replace("\n", " ")
-        logger.debug(f"Extracted text: '{image_text}' using OCR mode:'{pagesegmode}'")
-        return image_text
-    else:
-        err = "Image file size is 0 or file not found at: " + screenshot
-        logger.info(err)
-        raise RuntimeError(err)
+        )
+        .result()
+        .replace("\n", " ")
+    )
+    logger.debug(f"Extracted text: '{image_text}' using OCR mode:'{pagesegmode}'")
+    return image_text
 
 
 def check_screendump(
@@ -144,29 +148,37 @@ def check_screendump(
 
     # In case we get a list of regions to try iterate the list, if not create list
     region = [region] if not isinstance(region, list) else region
-    for region_box in region:
+    # Submit all the regions and OCR modes at once, so they are recognized concurrently
+    ocr_jobs = [
+        dict(
+            image=screenshot,
+            region=region_box,
+            lang=lang,
+            monochrome=monochrome,
+            brightness=brightness,
+            contrast=contrast,
+            invert=invert,
+            resize_height=resize_height,
+            resize_width=resize_width,
+            pagesegmode=pagesegmode,
+        )
+        for region_box in region
         for pagesegmode in [
             OcrMode.PAGE_SEGMENTATION_WITHOUT_OSD,
             OcrMode.SINGLE_WORD_IN_A_CIRCLE,
             OcrMode.SINGLE_UNIFORM_BLOCK_OF_TEXT,
             OcrMode.SINGLE_LINE,
             OcrMode.SINGLE_CHARACTER,
-        ]:
-            image_text = extract_text(
-                screenshot,
-                region=region_box,
-                lang=lang,
-                monochrome=monochrome,
-                brightness=brightness,
-                contrast=contrast,
-                invert=invert,
-                resize_height=resize_height,
-                resize_width=resize_width,
-                pagesegmode=pagesegmode,
-            )
+        ]
+    ]
+    ocr_results = ocr_service.submit_batch(ocr_jobs)
+    try:
+        for ocr_job, ocr_result in zip(ocr_jobs, ocr_results):
+            image_text = ocr_result.result().replace("\n", " ")
             image_text_found += [image_text.strip()]
             logger.debug(
-                f"check_screendump, on image:'{screenshot}' searching for: '{search_text}' ---> Found: '{image_text}'"
+                f"check_screendump, on image:'{screenshot}' region: {ocr_job['region']} "
+                f"mode: {ocr_job['pagesegmode']} searching for: '{search_text}' ---> Found: '{image_text}'"
             )
             # If search_text is regex expression or string search for it
             if isinstance(search_text, re.Pattern):
@@ -182,11 +194,19 @@ def check_screendump(
                     f"Unexpected type of expression to be searched on image: '{search_text}' ",
                     f"Got type: '{type(search_text)}' expected: str or regex expression",
                 )
+    finally:
+        # Don't keep the OCR workers busy with the jobs left after a match
+        ocr_service.cancel(ocr_results)
     test_result_text = False
     error_message = (
         f"Didn't find expected: '{search_text}' on image: '{screenshot}' ---> Found this text: '{image_text_found}'"
     )
     logger.info(error_message)
+    # Keep the regions given to the OCR, to debug the failure
+    if any(region):
+        screenshot_image = ImageHandle.open(screenshot)
+        for region_box in filter(None, region):
+            screenshot_image.crop(region_box).save()
     return test_result_text, error_message
 
 
@@ -201,8 +221,8 @@ def compare_snapshot(
     """
     -Compare the captured image with the reference image
     Args:
-            screenshot_path - File path of the captured screenshot
-            reference_image - expected sting to be extracted from the image
+            screenshot_path - File path of the captured screenshot, or its ImageHandle
+            reference_image - File path of the reference image
             test_name - test scenario name
             fuzz_percent - acceptable fuzz percent acceptable when comparing two images
             region - area which will be cropped out from actual image.
@@ -213,15 +233,22 @@ def compare_snapshot(
     """
     test_result_comp = True
     error_message = ""
-    output_path = Path(Path(screenshot_path).parent, f"{test_name.replace(' ', '_')}.png")
-    if region:
-        cropped_image = Path(Path(screenshot_path).parent, Path(screenshot_path).stem + "_cropped.png")
-        crop_image(screenshot_path, region, cropped_image)
-        screenshot_path = cropped_image
+    if region or isinstance(screenshot_path, ImageHandle):
+        screenshot = ImageHandle.open(screenshot_path)
+        if region:
+            screenshot = screenshot.crop(region)
+        output_path = screenshot.default_artifact_path().with_name(f"{test_name.replace(' ', '_')}.png")
+        # compare_images only reads files, so the image is handed to it through an uncompressed temporary file
+        compare_input = screenshot.temporary_file()
+    else:
+        screenshot = None
+        output_path = Path(Path(screenshot_path).parent, f"{test_name.replace(' ', '_')}.png")
+        compare_input = nullcontext(screenshot_path)
     try:
-        result = compare_images(
-            screenshot_path, reference_image, output=output_path, acceptable_fuzz_percent=fuzz_percent
-        )
+        with compare_input as image_path:
+            result = compare_images(
+                image_path, reference_image, output=output_path, acceptable_fuzz_percent=fuzz_percent
+            )
     except Exception:
         return False, error_message
     logger.info(f"Compare screenshots {screenshot_path} and {reference_image}," f" got the result: {str(result)}")
@@ -229,11 +256,14 @@ def compare_snapshot(
         test_result_comp = False
         error_message += f"Failure compare image {test_name.replace(' ', '_')} \n"
         logger.info(error_message)
+        # Keep the compared crop, to debug the failure
+        if region:
+            screenshot.save()
     #  Remove temp files created for testing
-    elif result and unlink_files:
-        for each_file in (output_path, screenshot_path):
-            if each_file.exists():
-                each_file.unlink()
+    elif unlink_files:
+        output_path.unlink(missing_ok=True)
+        if not screenshot:
+            Path(screenshot_path).unlink(missing_ok=True)
     return test_result_comp, error_message
 
 
@@ -286,40 +316,113 @@ def crop_image(image_path, box, output="test.png"):
     im1.save(output)
 
 
+def _load_grayscale_array(image):
+    """Returns a PIL image as a float array in "L" mode, to reduce computation by factor 3 "RGB"->"L" """
+    return np.asarray(image.convert(mode="L"), dtype=np.float64)
+
+
+def _prepare_search_array(search_array):
+    """Returns the real FFT and the integral image of squares of a search array, shared by all the templates"""
+    search_height, search_width = search_array.shape
+    integral = np.zeros((search_height + 1, search_width + 1))
+    integral[1:, 1:] = np.cumsum(np.cumsum(search_array**2, axis=0), axis=1)
+    return np.fft.rfft2(search_array), integral
+
+
+def _find_best_template_offset(search_array, search_spectrum, search_integral, template):
+    """Finds the offset of the search array where the template array has the lowest diff ratio
+
+    The sum of squared differences (SSD) of every offset is computed at once, with an FFT cross-correlation and
+    an integral image of the search array. The exact diff ratio (mean absolute difference, in %) is then
+    computed for the MATCH_TEMPLATE_CANDIDATES offsets with the lowest SSD, and for every other offset which can
+    still beat them: as each pixel differs by at most 255, the diff ratio of an offset is at least
+    SSD * 100 / (255 * 255 * pixels), so the offsets above the best diff ratio found are skipped without changing
+    the result of a full scan.
+    :param search_array: (np.ndarray)- Search image in "L" mode
+    :param search_spectrum: (np.ndarray)- Real FFT of the search array
+    :param search_integral: (np.ndarray)- Integral image of the squares of the search array
+    :param template: (CachedReferenceImage)- Template image in "L" mode, from the reference image cache
+    :return: (xs, ys, diff_ratio) of the best offset, or None if the template is bigger than the search image
+    """
+    search_height, search_width = search_array.shape
+    template_array = template.array
+    template_height, template_width = template_array.shape
+    valid_height, valid_width = search_height - template_height + 1, search_width - template_width + 1
+    if valid_height <= 0 or valid_width <= 0:
+        return None
+
+    template_spectrum = np.fft.rfft2(template_array, s=search_array.shape)
+    correlation = np.fft.irfft2(search_spectrum * np.conj(template_spectrum), s=search_array.shape)
+    correlation = correlation[:valid_height, :valid_width]
+
+    integral = search_integral
+    bottom, right = template_height, template_width
+    window_squares = (
+        integral[bottom:, right:] - integral[:valid_height, right:] - integral[bottom:, :valid_width]
+    ) + integral[:valid_height, :valid_width]
+    ssd = window_squares - 2 * correlation + template.square_norm
+
+    def diff_ratio_at(index):
+        ys, xs = divmod(int(index), valid_width)
+        y_end, x_end = ys + template_height, xs + template_width
+        return float(np.mean(np.abs(search_array[ys:y_end, xs:x_end] - template_array))) * 100 / 255, xs, ys
+
+    ssd = ssd.ravel()
+    candidates = min(MATCH_TEMPLATE_CANDIDATES, ssd.size)
+    candidate_indexes = np.argpartition(ssd, candidates - 1)[:candidates]
+    # On ties, keep the first offset on the search order (column by column)
+    best_diff_ratio, best_xs, best_ys = min(diff_ratio_at(index) for index in candidate_indexes)
+
+    # Small tolerance for the rounding errors of the FFT, so ties are compared on their exact diff ratio
+    min_diff_ratios = np.maximum(ssd, 0) * 100 / (255 * 255 * template_array.size)
+    remaining_indexes = np.flatnonzero(min_diff_ratios <= best_diff_ratio + 1e-6)
+    for index in np.setdiff1d(remaining_indexes, candidate_indexes, assume_unique=True):
+        if min_diff_ratios[index] > best_diff_ratio + 1e-6:
+            continue
+        best_diff_ratio, best_xs, best_ys = min((best_diff_ratio, best_xs, best_ys), diff_ratio_at(index))
+    return best_xs, best_ys, best_diff_ratio
+
+
 def match_template(image, image_to_search, region, results_path, context="", acceptable_diff=2.0, save_diff=False):
     """
     To search for a smaller image inside a bigger image
     :param image:(str)- Path to Main image in which template image is to be searched
-    :param image_to_search:(str)- Path to Small image which is to be searched.
+    :param image_to_search:(str or list)- Path to Small image which is to be searched, or list of paths to search
+        several templates in one call. The main image is only loaded and transformed once.
     :param region:(tuple)- If search is to be performed in a limited region of main_image
     :param results_path:(str)- Path to save the images generated.
     :param context:(str)- Name prefix from which will derive the artifacts saved
     :param acceptable_diff:(float)- Acceptable diff ratio. Defaults to 2.
-    :param save_diff:(boolean)- Save the diff image if diff_ratio less than acceptable_diff. Defaults to False.
+    :param save_diff:(boolean)- Save the diff image of the best offset if no match is found and its diff ratio is
+        less than acceptable_diff + 5. Defaults to False.
+    :return: (result, location) tuple of the offset with the lowest diff ratio, or a list of these tuples
+        (in the same order) when a list of templates is given
     disclaimer:
-        Searching a template in 1000x150 image takes approx 8-10 seconds
+        The search is vectorized with NumPy, searching a template in the full CID screenshot takes milliseconds
     """
     results_path = Path(results_path) if results_path else Path(image).parent
-    logger.debug(f"Searching for '{image_to_search}' inside '{image}'")
+    templates = [image_to_search] if isinstance(image_to_search, (str, Path)) else list(image_to_search)
+    logger.debug(f"Searching for '{templates}' inside '{image}'")
     image_name = Path(image).stem
     start = time.time()
-    main_image = Image.open(image)
-    template_image = Image.open(image_to_search)
-    search_image = main_image.crop(region)
-    # Convert images to "L" to reduce computation by factor 3 "RGB"->"L"
-    search_image = search_image.convert(mode="L")
-    template_image = template_image.convert(mode="L")
-    search_width, search_height = search_image.size
-    template_width, template_height = template_image.size
-    diff_ratio_history = []  # keep track of diff ratio
-    # Loop over each pixel in the search image
-    for xs in range(search_width - template_width + 1):
-        for ys in range(search_height - template_height + 1):
-            search_crop = search_image.crop((xs, ys, xs + template_width, ys + template_height))
-            diff = ImageChops.difference(template_image, search_crop)
-            stat = ImageStat.Stat(diff)
-            diff_ratio = sum(stat.mean) * 100 / (len(stat.mean) * 255)
-            diff_ratio_history.append(diff_ratio)
+    results = []
+    with Image.open(image) as main_image:
+        region = region or (0, 0) + main_image.size
+        search_image = main_image.crop(region)
+        search_array = _load_grayscale_array(search_image)
+        search_spectrum, search_integral = _prepare_search_array(search_array)
+        matched_image = None
+        for template in templates:
+            template_image = reference_image_cache.get(template)
+            best_offset = _find_best_template_offset(search_array, search_spectrum, search_integral, template_image)
+            if best_offset is None:
+                logging.info(f"No match found for '{template}', template is bigger than the search region")
+                results.append((False, None))
+                continue
+
+            xs, ys, diff_ratio = best_offset
+            template_height, template_width = template_image.array.shape
+            crop_box = (xs, ys, xs + template_width, ys + template_height)
             if diff_ratio <= acceptable_diff:
                 location = (
                     xs + region[0],
@@ -327,28 +430,32 @@ def match_template(image, image_to_search, region, results_path, context="", acc
                     xs + template_width + region[0],
                     ys + template_height + region[1],
                 )
-                draw = ImageDraw.Draw(main_image)
+                matched_image = matched_image or main_image.copy()
+                draw = ImageDraw.Draw(matched_image)
                 draw.rectangle(location, outline="red")
-                main_image.save(f"{results_path}/{image_name}_{context}_matched_image.png")
-                time_elapsed = round(time.time() - start, 3)
-                logging.info(f"Found match. diff={round(diff_ratio, 3)} time elapsed: {time_elapsed}s")
-                return True, location
+                logging.info(f"Found match for '{template}'. diff={round(diff_ratio, 3)}")
+                results.append((True, location))
+                continue
 
-            elif save_diff and diff_ratio == min(diff_ratio_history) and diff_ratio < (acceptable_diff + 5):
+            logging.info(f"No match found for '{template}'. Lowest diff ratio found was: {diff_ratio}")
+            if save_diff and diff_ratio < (acceptable_diff + 5):
                 # Save the closest match within a 5 diff radius from the desired value
                 logging.debug(f"Keeping artifact... Diff_ratio: '{round(diff_ratio, 3)}'")
-                screenshot_name_diff = f"{image_name}_{context}_diff_{xs}_{ys}.png"
-                screenshot_path_diff = results_path / screenshot_name_diff
+                diff = ImageChops.difference(
+                    Image.fromarray(template_image.array.astype(np.uint8)),
+                    search_image.convert(mode="L").crop(crop_box),
+                )
+                screenshot_path_diff = results_path / f"{image_name}_{context}_diff_{xs}_{ys}.png"
                 diff.save(screenshot_path_diff, lossless=True)
                 logging.debug(f"screenshot_path_diff: '{screenshot_path_diff}'")
+            results.append((False, None))
+
+        if matched_image:
+            matched_image.save(f"{results_path}/{image_name}_{context}_matched_image.png")
 
     time_elapsed = round(time.time() - start, 3)
-    logging.info(f"No match found. time elapsed: {time_elapsed}s")
-    if diff_ratio_history:
-        logging.info(f"Lowest diff ratio found was: {min(diff_ratio_history)}")
-    else:
-        logging.info("diff_ratio_history is empty")
-    return False, None
+    logging.info(f"Searched {len(templates)} template(s). time elapsed: {time_elapsed}s")
+    return results[0] if isinstance(image_to_search, (str, Path)) else results
 
 
 def compare_captured_image_with_multiple_snapshots(
@@ -362,7 +469,7 @@ def compare_captured_image_with_multiple_snapshots(
     """
     -Compare the captured image with a list of reference images
     Args:
-            screenshot_path - file path of the captured screenshot
+            screenshot_path - file path of the captured screenshot, or its ImageHandle
             ref_image_path_pattern - reference image folder path and file name pattern
             test_name - test scenario name
             fuzz_percent - acceptable fuzz percent acceptable when comparing two images
@@ -374,10 +481,12 @@ def compare_captured_image_with_multiple_snapshots(
     error = ""
     reference_image_list = glob.glob(ref_image_path_pattern)
     logger.info(f"List of {test_name} reference images - {reference_image_list}")
+    # Decode the screenshot once for all the references
+    screenshot = ImageHandle.open(screenshot_path)
     for reference_image in reference_image_list:
         logger.info(f"Image {reference_image} is getting matched")
         result, error = compare_snapshot(
-            screenshot_path,
+            screenshot,
             reference_image,
             test_name,
             fuzz_percent,
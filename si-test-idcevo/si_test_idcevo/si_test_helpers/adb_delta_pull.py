@@ -0,0 +1,168 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Incremental pull of android directories, only transferring the files changed since the previous pull
+
+'adb pull' transfers a whole directory (e.g. /data/system/dropbox) on every post test, even when most of its
+files were already pulled on a previous run. Instead, the remote files are listed with their size and mtime
+(optionally also their md5) in a single shell call, compared to the manifest written on the host by the previous
+pull, and only the new or changed files are streamed as a single tar over 'adb exec-out'.
+
+    pulled_files = delta_pull(target, "/data/anr", "crash_artifacts/anr", with_root=True)
+
+The pull is enabled on the crash post tests with CRASH_ARTIFACTS_DELTA_PULL=1 (default). When it fails, e.g. if
+the target has no tar, the post tests fall back to the full 'adb pull'.
+"""
+import json
+import logging
+import os
+import shlex
+import subprocess
+import tarfile
+
+from si_test_idcevo.si_test_helpers.remote_probe import RemoteProbe
+
+logger = logging.getLogger(__name__)
+
+CRASH_ARTIFACTS_DELTA_PULL = int(os.getenv("CRASH_ARTIFACTS_DELTA_PULL", "1"))
+# Set CRASH_ARTIFACTS_PULL_HASH=1 to also compare the md5 of the files, not only their size and mtime
+CRASH_ARTIFACTS_PULL_HASH = int(os.getenv("CRASH_ARTIFACTS_PULL_HASH", "0"))
+DELTA_PULL_MANIFEST_SUFFIX = "_delta_pull_manifest.json"
+# Files streamed on each tar, to keep the remote command line short
+DELTA_PULL_BATCH_SIZE = 200
+DELTA_PULL_TIMEOUT = 600  # seconds
+
+
+class DeltaPullError(RuntimeError):
+    """Raised when the remote files can't be listed or streamed"""
+
+
+def list_remote_files(target, remote_dir, with_root=False, with_hash=False):
+    """Lists the files of a remote directory, recursively, in a single shell call
+
+    :param target: apinext target, used to run the shell commands
+    :param str remote_dir: directory to list on the target
+    :param bool with_root: list the files as root
+    :param bool with_hash: also compute the md5 of each file
+    :return: dict with {"size", "mtime", "md5"} per file path, relative to 'remote_dir'
+    :raises DeltaPullError: if the directory can't be listed
+    """
+    prefix = "su 0 " if with_root else ""
+    quoted_dir = shlex.quote(remote_dir)
+    probe = RemoteProbe(target)
+    probe.add_command("stat", f"{prefix}find {quoted_dir} -type f -exec stat -c '%s %Y %n' {{}} +")
+    if with_hash:
+        probe.add_command("md5", f"{prefix}find {quoted_dir} -type f -exec md5sum {{}} +")
+    results = probe.run()
+    if results["stat"].returncode != 0:
+        raise DeltaPullError(f"Could not list '{remote_dir}' on the target: {results['stat'].stdout.strip()}")
+
+    remote_files = {}
+    for line in results["stat"].stdout.splitlines():
+        size, mtime, path = line.split(" ", 2)
+        remote_files[os.path.relpath(path, remote_dir)] = {"size": int(size), "mtime": int(mtime), "md5": None}
+    if with_hash:
+        for line in results["md5"].stdout.splitlines():
+            md5, path = line.split(None, 1)
+            relative_path = os.path.relpath(path.strip(), remote_dir)
+            if relative_path in remote_files:
+                remote_files[relative_path]["md5"] = md5
+    return remote_files
+
+
+def get_manifest_path(local_dir):
+    """Returns the path of the manifest of a pulled directory, stored next to it so it isn't taken as pulled file
+
+    e.g. 'crash_artifacts/.anr_delta_pull_manifest.json' for 'crash_artifacts/anr'
+    """
+    local_dir = os.path.normpath(local_dir)
+    return os.path.join(os.path.dirname(local_dir), f".{os.path.basename(local_dir)}{DELTA_PULL_MANIFEST_SUFFIX}")
+
+
+def load_manifest(local_dir):
+    """Returns the remote files pulled to 'local_dir' by the previous delta pulls"""
+    try:
+        with open(get_manifest_path(local_dir)) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as error:
+        logger.warning(f"Ignoring invalid delta pull manifest on '{local_dir}': {error}")
+        return {}
+
+
+def save_manifest(local_dir, manifest):
+    manifest_path = get_manifest_path(local_dir)
+    with open(manifest_path + ".tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def stream_remote_files(remote_dir, relative_paths, local_dir, with_root=False, serial=None):
+    """Streams remote files as a single tar over 'adb exec-out', extracting it while it is received
+
+    :param str remote_dir: remote directory of the files
+    :param list relative_paths: paths of the files to stream, relative to 'remote_dir'
+    :param str local_dir: directory where the files are extracted
+    :param bool with_root: read the files as root
+    :param str serial: android serial number of the target, needed when more than one device is connected
+    :raises DeltaPullError: if the tar can't be created on the target or extracted on the host
+    """
+    prefix = "su 0 " if with_root else ""
+    command = f"{prefix}tar -cf - -C {shlex.quote(remote_dir)} " + " ".join(shlex.quote(p) for p in relative_paths)
+    adb_command = ["adb"] + (["-s", serial] if serial else []) + ["exec-out", command]
+    with subprocess.Popen(adb_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(local_dir, filter="data")
+                else:
+                    tar.extractall(local_dir)
+        except tarfile.TarError as error:
+            process.kill()
+            raise DeltaPullError(f"Could not extract the files of '{remote_dir}': {error}")
+        finally:
+            stderr = process.stderr.read()
+        if process.wait(timeout=DELTA_PULL_TIMEOUT) != 0:
+            raise DeltaPullError(f"Could not stream the files of '{remote_dir}': {stderr.decode(errors='replace')}")
+
+
+def _is_changed(pulled_entry, remote_entry):
+    """Compares a remote file to its entry on the manifest, the md5 is only compared when both have it"""
+    if not pulled_entry:
+        return True
+    if (pulled_entry["size"], pulled_entry["mtime"]) != (remote_entry["size"], remote_entry["mtime"]):
+        return True
+    return bool(pulled_entry["md5"] and remote_entry["md5"] and pulled_entry["md5"] != remote_entry["md5"])
+
+
+def delta_pull(target, remote_dir, local_dir, with_root=False, with_hash=CRASH_ARTIFACTS_PULL_HASH):
+    """Pulls the files of a remote directory which are new or changed since the previous pull to 'local_dir'
+
+    :param target: apinext target, used to run the shell commands
+    :param str remote_dir: directory to pull from the target
+    :param str local_dir: host directory mirroring 'remote_dir', e.g. 'crash_artifacts/anr' for '/data/anr'
+    :param bool with_root: read the files as root
+    :param bool with_hash: also compare the md5 of the files, to detect changes keeping the size and mtime
+    :return: list with the local paths of the pulled files
+    :raises DeltaPullError: if the remote files can't be listed or streamed
+    """
+    remote_files = list_remote_files(target, remote_dir, with_root=with_root, with_hash=with_hash)
+    serial = target.get_android_serial_number()
+    os.makedirs(local_dir, exist_ok=True)
+    manifest = load_manifest(local_dir)
+    changed_files = [
+        path
+        for path, entry in remote_files.items()
+        if _is_changed(manifest.get(path), entry) or not os.path.isfile(os.path.join(local_dir, path))
+    ]
+    logger.info(
+        f"Pulling {len(changed_files)} of {len(remote_files)} files of '{remote_dir}', "
+        "the others were already pulled"
+    )
+
+    for batch_start in range(0, len(changed_files), DELTA_PULL_BATCH_SIZE):
+        batch_end = batch_start + DELTA_PULL_BATCH_SIZE
+        batch = changed_files[batch_start:batch_end]
+        stream_remote_files(remote_dir, batch, local_dir, with_root=with_root, serial=serial)
+        manifest.update({path: remote_files[path] for path in batch})
+        save_manifest(local_dir, manifest)
+    return [os.path.join(local_dir, path) for path in changed_files]
@@ -0,0 +1,245 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Pool of persistent 'adb shell' sessions, to run android shell commands without spawning a process per command
+
+Each 'apinext_target.execute_command' spawns a new 'adb shell' process on the host, and a new shell on the target.
+Helpers polling android (monitors, activity checks) run tens of commands per second, so instead the commands are
+written to long lived 'adb shell' sessions, each command framed by unique begin/end markers carrying its return
+code. Several sessions run commands concurrently. A session whose adb process exited (e.g. after a reboot, or an
+'adb root' restarting adbd) is replaced by a new one on the next command.
+
+    result = execute_adb_shell_command(test.apinext_target, "dumpsys activity activities")
+    result.stdout, result.stderr, result.exit_code, str(result)
+
+Commands returning a non zero code raise the same 'sh.ErrorReturnCode_<code>' exceptions as
+'apinext_target.execute_command'. The pool is enabled with ADB_SHELL_POOL=1, otherwise the commands are run with
+'apinext_target.execute_command'.
+"""
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import uuid
+import sh
+
+logger = logging.getLogger(__name__)
+
+# Set ADB_SHELL_POOL=1 to run the android shell commands of the helpers on the session pool
+ADB_SHELL_POOL = int(os.getenv("ADB_SHELL_POOL", "0"))
+ADB_SHELL_POOL_SIZE = int(os.getenv("ADB_SHELL_POOL_SIZE", "4"))
+ADB_SHELL_TIMEOUT = 60  # seconds
+# adb commands restarting adbd, which closes all the running 'adb shell' sessions
+ADBD_RESTART_COMMANDS = ("root", "unroot", "remount", "reboot", "disable-verity", "enable-verity")
+
+
+class AdbShellError(RuntimeError):
+    """Raised when a command can't be run on an 'adb shell' session, e.g. the session was closed by a reboot"""
+
+
+class AdbShellResult(object):
+    """Output of a command run on an 'adb shell' session, usable as the result of 'apinext_target.execute_command'"""
+
+    def __init__(self, command, stdout, stderr, exit_code):
+        self.command = command
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+
+    @property
+    def returncode(self):
+        return self.exit_code
+
+    def __str__(self):
+        return self.stdout.decode("utf-8", errors="replace")
+
+    def __contains__(self, text):
+        return text in str(self)
+
+    def __repr__(self):
+        return f"AdbShellResult(command={self.command!r}, exit_code={self.exit_code})"
+
+
+def build_shell_command(command, privileged=False):
+    """Builds the shell command line of a command, with the same semantics as 'adb shell <args>'
+
+    :param command: command line (str) or list of arguments, joined with spaces as done by 'adb shell'
+    :param bool privileged: run the command as root
+    """
+    command_line = command if isinstance(command, str) else " ".join(str(arg) for arg in command)
+    if privileged:
+        command_line = f"su 0 sh -c {shlex.quote(command_line)}"
+    return command_line
+
+
+class AdbShellSession(object):
+    """Long lived 'adb shell' process, running one framed command at a time"""
+
+    def __init__(self, serial=None, adb="adb"):
+        """
+        :param str serial: android serial of the device, ANDROID_SERIAL (or the only device) is used if None
+        :param str adb: adb executable
+        """
+        self.serial = serial
+        self.adb = adb
+        self._process = None
+        self._stdout_lines = None
+        self._stderr_lines = None
+
+    @property
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        serial_args = ["-s", self.serial] if self.serial else []
+        self._process = subprocess.Popen(
+            [self.adb, *serial_args, "shell"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._stdout_lines = self._start_reader(self._process.stdout)
+        self._stderr_lines = self._start_reader(self._process.stderr)
+        logger.debug(f"Started adb shell session with pid {self._process.pid}")
+
+    @staticmethod
+    def _start_reader(stream):
+        """Reads the lines of a stream on a thread, a None line is queued when the stream is closed"""
+        lines = queue.Queue()
+
+        def read_lines():
+            for line in iter(stream.readline, b""):
+                lines.put(line)
+            lines.put(None)
+
+        threading.Thread(target=read_lines, name="adb_shell_reader", daemon=True).start()
+        return lines
+
+    def close(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process = None
+
+    def _read_frame(self, lines, end_marker, timeout):
+        """Returns the output lines until the end marker line, and the content of the end marker line"""
+        output = []
+        while True:
+            try:
+                line = lines.get(timeout=timeout)
+            except queue.Empty:
+                raise AdbShellError(f"No answer of the adb shell session after {timeout} seconds")
+            if line is None:
+                raise AdbShellError("The adb shell session was closed while running the command")
+            if line.startswith(end_marker):
+                return b"".join(output), line.partition(end_marker)[2].strip()
+            output.append(line)
+
+    def execute(self, command_line, timeout=ADB_SHELL_TIMEOUT):
+        """Runs a command line on the session
+
+        :param str command_line: shell command line
+        :param timeout: maximum time to wait for the command to finish (seconds)
+        :return: tuple with the stdout (bytes), stderr (bytes) and the return code of the command
+        :raises AdbShellError: if the session is closed or the command times out. The session is then closed.
+        """
+        if not self.is_alive:
+            self.start()
+        marker = f"ADB_SHELL_{uuid.uuid4().hex}".encode()
+        # A newline is always written before the end markers, so the output doesn't need to end with one
+        script = (
+            f"( {command_line} ) </dev/null; rc=$?; echo; echo {marker.decode()}:$rc; "
+            f"echo >&2; echo {marker.decode()} >&2\n"
+        )
+        try:
+            self._process.stdin.write(script.encode())
+            self._process.stdin.flush()
+            stdout, exit_code = self._read_frame(self._stdout_lines, marker + b":", timeout)
+            stderr, _ = self._read_frame(self._stderr_lines, marker, timeout)
+        except (AdbShellError, OSError) as error:
+            self.close()
+            raise AdbShellError(f"Could not run '{command_line}' on the adb shell session: {error}")
+        return stdout[:-1], stderr[:-1], int(exit_code)
+
+
+class AdbShellPool(object):
+    """Persistent 'adb shell' sessions, shared by all the threads running android shell commands"""
+
+    def __init__(self, serial=None, size=ADB_SHELL_POOL_SIZE, adb="adb"):
+        """
+        :param str serial: android serial of the device, ANDROID_SERIAL (or the only device) is used if None
+        :param int size: maximum amount of sessions, i.e. of commands running at the same time
+        :param str adb: adb executable
+        """
+        self.serial = serial
+        self.adb = adb
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle_sessions = queue.LifoQueue()
+
+    def _acquire_session(self):
+        try:
+            return self._idle_sessions.get_nowait()
+        except queue.Empty:
+            return AdbShellSession(serial=self.serial, adb=self.adb)
+
+    def execute_command(self, command, privileged=False, timeout=ADB_SHELL_TIMEOUT):
+        """Runs an android shell command on one of the sessions
+
+        :param command: command line (str) or list of arguments, as for 'apinext_target.execute_command'
+        :param bool privileged: run the command as root
+        :param timeout: maximum time to wait for the command to finish (seconds)
+        :return: AdbShellResult of the command
+        :raises sh.ErrorReturnCode: if the command returns a non zero code, as 'apinext_target.execute_command'
+        :raises AdbShellError: if the command could not be run, e.g. the device rebooted while running it
+        """
+        command_line = build_shell_command(command, privileged=privileged)
+        with self._slots:
+            session = self._acquire_session()
+            # A session closed since its last command (e.g. by a reboot) is restarted before running the command,
+            # so only a failure while the command runs is raised
+            stdout, stderr, exit_code = session.execute(command_line, timeout=timeout)
+            self._idle_sessions.put(session)
+
+        result = AdbShellResult(command_line, stdout, stderr, exit_code)
+        if exit_code != 0:
+            raise sh.get_rc_exc(exit_code)(f"adb shell {command_line}", stdout, stderr)
+        return result
+
+    def reset(self):
+        """Closes all the idle sessions, e.g. after adbd was restarted"""
+        while True:
+            try:
+                self._idle_sessions.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_adb_shell_pool(serial=None):
+    """Returns the session pool of an android device, shared by all the helpers"""
+    with _pools_lock:
+        if serial not in _pools:
+            _pools[serial] = AdbShellPool(serial=serial)
+        return _pools[serial]
+
+
+def reset_adb_shell_pools():
+    """Closes the idle sessions of all the pools, to be called after the adb server or adbd were restarted"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.reset()
+
+
+def execute_adb_shell_command(apinext_target, command, **kwargs):
+    """Drop-in replacement of 'apinext_target.execute_command', running the command on the session pool of the
+    target when ADB_SHELL_POOL=1
+
+    :param apinext_target: apinext target, running the command when the pool is disabled
+    :param command: command line (str) or list of arguments
+    :param kwargs: 'privileged' and 'timeout' arguments of 'AdbShellPool.execute_command'
+    """
+    if not ADB_SHELL_POOL:
+        return apinext_target.execute_command(command, **kwargs)
+    return get_adb_shell_pool(apinext_target.get_android_serial_number()).execute_command(command, **kwargs)
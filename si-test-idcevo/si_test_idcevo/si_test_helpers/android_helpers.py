@@ -4,13 +4,13 @@ import re
 import time
 
 from pathlib import Path
-from PIL import Image, ImageEnhance
 
 from mtee.testing.connectors.connector_dlt import DLTContext
 from mtee.testing.tools import OcrMode
 
 from si_test_idcevo.si_test_config.idcevo_kpi_metrics_config import GENERIC_DLT_KPI_CONFIG
 from si_test_idcevo.si_test_helpers.dlt_logs_handlers import validate_expected_dlt_payloads_in_dlt_trace
+from si_test_idcevo.si_test_helpers.image_handle import ImageHandle
 from si_test_idcevo.si_test_helpers.pages.cde.launcher_page import LauncherPage as CDELauncher
 from si_test_idcevo.si_test_helpers.pages.idcevo.launcher_page import LauncherPage as Launcher
 from si_test_idcevo.si_test_helpers.pages.idcevo.perso_page import PersoBMWIDPage as Perso
@@ -60,21 +60,15 @@ def get_ready_textbox_phud(test, image_path):
     return ready_box_text.upper().strip()
 
 
-def change_image_contrast_ratio(image_path, contrast_ratio):
-    """change image contrast with the given ratio and save changed image on the same path"""
-    with Image.open(image_path) as img:
-        img = ImageEnhance.Contrast(img).enhance(contrast_ratio)
-        img.save(image_path)
-
-
 def get_text_from_phud_with_ocr(test, image_path, crop_region, ocr_mode=OcrMode.SINGLE_LINE, contrast_ratio=None):
     """This function captures the screenshot, contrast it and extracts the text with respect to crop region and OCR
     mode"""
     screenshot_path = Path(test.results_dir, str(image_path))
     take_phud_driver_screenshot(test, screenshot_path)
+    screenshot = ImageHandle.open(screenshot_path)
     if contrast_ratio:
-        change_image_contrast_ratio(screenshot_path, contrast_ratio)
-    ocr_text = extract_text(screenshot_path, region=crop_region, pagesegmode=ocr_mode)
+        screenshot = screenshot.enhance_contrast(contrast_ratio)
+    ocr_text = extract_text(screenshot, region=crop_region, pagesegmode=ocr_mode)
     logger.debug(f"Extracted text from cropped image : {ocr_text}")
     return ocr_text.strip()
 
@@ -102,7 +96,9 @@ def ensure_launcher_page(test, screenshot_path_inside_results_dir="", image_file
     Note: Used for exiting the "Emergency stop" pop-up"""
     screenshot_path = os.path.join(test.results_dir, screenshot_path_inside_results_dir)
     if pre_screenshot:
-        test.take_apinext_target_screenshot(screenshot_path, "before_trying_focus_on_launcher" + image_file_sufix)
+        test.take_apinext_target_screenshot(
+            screenshot_path, "before_trying_focus_on_launcher" + image_file_sufix, background=True
+        )
     if not check_android_launcher(test) and test.driver:
         Launcher.check_and_close_emergency_stop_page(wait_until_stop_visible=3)
     if not check_android_launcher(test):
@@ -112,9 +108,11 @@ def ensure_launcher_page(test, screenshot_path_inside_results_dir="", image_file
         test.go_home_android_keyevent()
         time.sleep(2)
         if not check_android_launcher(test):
-            test.take_apinext_target_screenshot(screenshot_path, "fail_on_focusing_on_launcher" + image_file_sufix)
+            test.take_apinext_target_screenshot(
+                screenshot_path, "fail_on_focusing_on_launcher" + image_file_sufix, background=True
+            )
 
-    test.take_apinext_target_screenshot(screenshot_path, "launcher_focused" + image_file_sufix)
+    test.take_apinext_target_screenshot(screenshot_path, "launcher_focused" + image_file_sufix, background=True)
     return True
 
 
@@ -15,6 +15,7 @@ import threading
 import time
 
 from datetime import datetime
+from si_test_idcevo.si_test_helpers.adb_shell_pool import ADB_SHELL_POOL, get_adb_shell_pool
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
@@ -222,8 +223,10 @@ class SIAndroidMonitor:
         """Monitor specified attribute and generates a report"""
         while not stop_flag.is_set():
             try:
-                cmd = ["adb", "shell", "dumpsys", attribute]
-                output = subprocess.check_output(cmd)
+                if ADB_SHELL_POOL:
+                    output = get_adb_shell_pool().execute_command(["dumpsys", attribute]).stdout
+                else:
+                    output = subprocess.check_output(["adb", "shell", "dumpsys", attribute])
                 self.cmd_time = datetime.now().strftime(DATE_FORMAT)
                 if attribute == "cpuinfo":
                     self.parse_total_cpu_to_csv(output.decode())
@@ -14,8 +14,14 @@ from si_test_idcevo.si_test_helpers.apinext_target_handlers import IDCEvoApinext
 from si_test_idcevo.si_test_helpers.appium_handler import IDCEvoAppiumHandler
 from si_test_idcevo.si_test_helpers.dmverity_helpers import disable_dm_verity
 from si_test_idcevo.si_test_helpers.file_path_helpers import get_calling_test
+from si_test_idcevo.si_test_helpers.framebuffer_capture import framebuffer_capture
 from si_test_idcevo.si_test_helpers.pages.idcevo.base_page import BasePage
 from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
+from si_test_idcevo.si_test_helpers.target_facts_cache import (
+    TargetFactsCache,
+    get_build_id,
+    get_target_facts_cache_path,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +50,7 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
         self.__results_dir = None
         self.__generation = None
         self.__build_branch = None
+        self.__target_facts_key = None
         self.vcar_manager = None
         self.activities_list = {}
         self.activities_file = ""
@@ -88,6 +95,10 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
     def build_branch(self):
         return self.__build_branch
 
+    @property
+    def target_facts_cache(self):
+        return TargetFactsCache(get_target_facts_cache_path(self.mtee_target.options.result_dir))
+
     def setup_base_class(self, root=False, enable_appium=False, disable_dmverity=False, skip_setup_apinext=False):
         if not self.apinext_target and not skip_setup_apinext:
             try:
@@ -123,17 +134,58 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
 
         self.setup_results_dir(current_test_name)
 
-        self.get_generation()
-
-        self.get_build_branch()
+        target_facts = self.load_target_facts()
 
         if self.apinext_target and not skip_setup_apinext:
             ensure_launcher_page(test=self)
 
-            if not self.activities_list:
+            if not self.activities_list and target_facts.get("activities_list"):
+                logger.info("Loading android activities list from the target facts cache")
+                self.activities_list = target_facts["activities_list"]
+                self.save_activities_file()
+            elif not self.activities_list:
                 self.set_activities_list()
 
+    def load_target_facts(self):
+        """
+        Load the facts of the target and flashed build, discovering and caching the missing ones
+
+        The facts are keyed by the target VIN and android serial number, and by the hash of '/etc/os-release',
+        so the facts discovered on another target or on a previous build are never used.
+
+        :return: dict with the cached facts of the current target and build
+        """
+        os_release = self.mtee_target.execute_command("cat /etc/os-release").stdout
+        serial = self.apinext_target.get_android_serial_number() if self.apinext_target else None
+        target_facts_key = (self.mtee_target.options.vin, serial, get_build_id(os_release))
+        if target_facts_key != self.__target_facts_key:
+            if self.__target_facts_key:
+                logger.info("Target or flashed build changed, discarding the known target facts")
+            self.__target_facts_key = target_facts_key
+            self.activities_list = {}
+
+        target_facts = self.target_facts_cache.load(*target_facts_key)
+        if "generation" in target_facts and "build_branch" in target_facts:
+            self.__generation = target_facts["generation"]
+            self.__build_branch = target_facts["build_branch"]
+        else:
+            self.get_generation()
+            self.get_build_branch(os_release)
+            self.target_facts_cache.update(
+                *target_facts_key, generation=self.generation, build_branch=self.build_branch
+            )
+        return target_facts
+
+    def invalidate_target_facts(self):
+        """
+        Discard the known and cached facts of the target, e.g. after coding it
+        """
+        self.__target_facts_key = None
+        self.activities_list = {}
+        self.target_facts_cache.invalidate(self.mtee_target.options.vin)
+
     def teardown_base_class(self):
+        framebuffer_capture.flush()
         if self.opened_session:
             self.teardown_appium()
         if self.rooted is True:
@@ -156,9 +208,6 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
         Output:
             * List packages available on target
         """
-        self.activities_file = os.path.join(
-            self.mtee_target.options.result_dir, "extracted_files/android_activities.json"
-        )
         monkey_file = self.apinext_target.execute_command(
             ["monkey", "-c android.intent.category.LAUNCHER --pct-syskeys 0 -v -v -v 0"]
         )
@@ -175,8 +224,19 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
                         self.activities_list[match_dict.get("package")].append(match_dict.get("activity"))
 
         if self.activities_list:
-            with open(Path(self.activities_file), "w") as outfile:
-                json.dump(self.activities_list, outfile)
+            self.save_activities_file()
+            if self.__target_facts_key:
+                self.target_facts_cache.update(*self.__target_facts_key, activities_list=self.activities_list)
+
+    def save_activities_file(self):
+        """
+        Write the list of packages and activities to 'extracted_files/android_activities.json'
+        """
+        self.activities_file = os.path.join(
+            self.mtee_target.options.result_dir, "extracted_files/android_activities.json"
+        )
+        with open(Path(self.activities_file), "w") as outfile:
+            json.dump(self.activities_list, outfile)
 
     def get_most_similar_activity(self, package_activity):
         """
@@ -215,16 +275,19 @@ class TestBase(IDCEvoApinextTargetHandler, IDCEvoAppiumHandler):
             generation = "25"
         self.__generation = generation
 
-    def get_build_branch(self):
+    def get_build_branch(self, os_release=None):
         """
         Fetch the current build branch flashed on the target
+
+        :param os_release[str]: content of the target '/etc/os-release', read from the target if not given
         """
         build_branch = None
-        command_output = self.mtee_target.execute_command("cat /etc/os-release")
-        if 'VERSION="idcevo-mainline' in command_output.stdout:
+        if os_release is None:
+            os_release = self.mtee_target.execute_command("cat /etc/os-release").stdout
+        if 'VERSION="idcevo-mainline' in os_release:
             build_branch = "mainline"
-        elif 'VERSION="idcevo-pu' in command_output.stdout:
+        elif 'VERSION="idcevo-pu' in os_release:
             build_branch = "pu"
-        elif "dirty" in command_output.stdout:
+        elif "dirty" in os_release:
             build_branch = "dirty"
         self.__build_branch = build_branch
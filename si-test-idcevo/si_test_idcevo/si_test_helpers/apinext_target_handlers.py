@@ -13,6 +13,7 @@ import sh
 from si_test_idcevo.si_test_helpers.apinext_input_events import ApinextInputEvents
 from si_test_idcevo.si_test_helpers.dmverity_helpers import adb_disable_verity
 from si_test_idcevo.si_test_helpers.file_path_helpers import create_custom_results_dir, deconflict_file_path
+from si_test_idcevo.si_test_helpers.framebuffer_capture import RAW_SCREENSHOT_CAPTURE, framebuffer_capture
 from tee.tools.diagnosis import DiagClient
 
 CHECK_LAUNCHER_ACTIVITY = "com.bmwgroup.idnext.launcher/.IdxMainActivity"
@@ -81,22 +82,60 @@ class IDCEvoApinextTargetHandler(ApinextInputEvents):
         """Setup vcar manager instance"""
         self.vcar_manager = TargetShareMTEE().vcar_manager
 
-    def take_apinext_target_screenshot(self, results_dir, file_name, display_id=None):
+    def take_apinext_target_screenshot(self, results_dir, file_name, display_id=None, background=False):
         """Take a screenshot using adb
+
+        With RAW_SCREENSHOT_CAPTURE=1 the raw framebuffer is pulled and encoded on the host, see
+        capture_apinext_target_frame. A screenshot identical to the previous one of the same display is not
+        encoded again, the previous screenshot is copied. If the raw capture fails, the screenshot is
+        taken as PNG.
         :param results_dir: path to results folder
         :type results_dir: str
         :param file_name: name for created file
         :type file_name: str
+        :param background: on raw capture mode, return before the file is written. Use it when the file is
+            only kept as an artifact.
+        :type background: bool
         :return: file_path: path to created file
         """
+        if RAW_SCREENSHOT_CAPTURE:
+            try:
+                frame = self.capture_apinext_target_frame(results_dir, file_name, display_id=display_id)
+                if not background:
+                    framebuffer_capture.wait_for_file(frame.source_path)
+                return str(frame.source_path)
+            except Exception as e:
+                logger.warning(f"Failed to take raw screenshot '{file_name}', taking it as PNG. Error: {e}")
+
         self.apinext_target.wait_for_boot_completed_flag()
-        file_name = str(file_name + ".png") if ".png" not in file_name else file_name
-        file_path = os.path.join(results_dir, file_name) if results_dir not in file_name else file_name
-        file_path = deconflict_file_path(file_path, extension=".png")
+        file_path = self._get_screenshot_file_path(results_dir, file_name)
         display_id = display_id if display_id else LIST_MAIN_DISPLAY_ID.get(self.mtee_target.options.target.lower())
         self.apinext_target.take_screenshot(file_path, display_id=display_id)
         return file_path
 
+    def capture_apinext_target_frame(self, results_dir, file_name, display_id=None):
+        """Take a screenshot as a raw framebuffer and return it in memory, while its PNG file is written
+        in the background. The target doesn't spend CPU compressing the screenshot.
+
+        :param results_dir: path to results folder
+        :type results_dir: str
+        :param file_name: name for created file
+        :type file_name: str
+        :return: ImageHandle of the screenshot. Its 'source_path' is the file where it is being written.
+        """
+        self.apinext_target.wait_for_boot_completed_flag()
+        file_path = self._get_screenshot_file_path(results_dir, file_name)
+        display_id = display_id if display_id else LIST_MAIN_DISPLAY_ID.get(self.mtee_target.options.target.lower())
+        return framebuffer_capture.capture(
+            file_path, display_id=display_id, serial=self.apinext_target.get_android_serial_number()
+        )
+
+    @staticmethod
+    def _get_screenshot_file_path(results_dir, file_name):
+        file_name = str(file_name + ".png") if ".png" not in file_name else file_name
+        file_path = os.path.join(results_dir, file_name) if results_dir not in file_name else file_name
+        return deconflict_file_path(file_path, extension=".png")
+
     def setup_android_serials_id(self):
         """If currently on a test rack get the HU and real phone android serial
         identifiers from the local config file"""
@@ -36,6 +36,7 @@ def install_coding_fa(test, vehicle_orders, enable_doip_protocol=True):
             test.vcar_manager.set_vpc(vpc_value)
             logger.info("VPC value set to %s", vpc_value)
             test.mtee_target.install_coding(enable_doip_protocol=enable_doip_protocol, vehicle_order=vehicle_order)
+            test.invalidate_target_facts()
         except Exception as e:
             logger.warning(f"Failed to install coding feature {vehicle_order}. Error: {e}")
             failed_coding_features.append(vehicle_order)
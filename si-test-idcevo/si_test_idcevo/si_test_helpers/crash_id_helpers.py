@@ -0,0 +1,160 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Crash IDs of ANRs, crashes and tombstones, computed concurrently and cached by artifact content
+
+The crash IDs are computed by the 'apinext-crash-parser.py' script, which runs for a few seconds per artifact.
+A stress run can leave hundreds of artifacts, so CrashIdEngine runs the parser on a pool of workers, each one
+on its own process, and caches its output by the content of the artifact: identical artifacts (e.g. a tombstone
+also copied into a crash directory) and artifacts already parsed on a previous run are only parsed once.
+
+    engine = CrashIdEngine(crash_parser_script, cache_path)
+    engine.compute([(anr_file, "ANR") for anr_file in anr_files])
+    engine.get(anr_file, "ANR")  # "<crash id>,<process>", or None if it can't be computed
+"""
+import json
+import logging
+import os
+import subprocess
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from si_test_idcevo.si_test_helpers.file_path_helpers import get_path_digest
+
+logger = logging.getLogger(__name__)
+
+CRASH_ID_WORKERS = int(os.getenv("CRASH_ID_WORKERS", str(os.cpu_count() or 1)))
+CRASH_ID_CACHE_FILE_NAME = "crash_id_cache.json"
+# Optional folder shared between runs. By default the cache is stored on the run crash artifacts folder.
+CRASH_ID_CACHE_DIR = os.getenv("CRASH_ID_CACHE_DIR")
+CRASH_PARSER_TIMEOUT = 300  # seconds
+# Files written by the post tests into the crash directories, not part of the artifact content
+CRASH_ID_FILE_SUFFIX = "mtee.crashid.txt"
+
+
+def get_crash_id_cache_path(crash_artifacts_dir):
+    """Returns the path of the crash ID cache file for a crash artifacts dir"""
+    return os.path.join(CRASH_ID_CACHE_DIR or crash_artifacts_dir, CRASH_ID_CACHE_FILE_NAME)
+
+
+def get_artifact_digest(crash_path):
+    """Returns the sha256 of a crash artifact: the content of a file, or the names and content of a directory
+
+    The crash ID files written next to the artifacts are ignored, so writing them doesn't change the digest.
+    """
+    return get_path_digest(crash_path, ignored_suffixes=(CRASH_ID_FILE_SUFFIX,))
+
+
+def run_crash_parser(crash_parser_script, crash_path, crash_type=None):
+    """Runs the crash parser on a crash artifact
+
+    :param str crash_parser_script: path of 'apinext-crash-parser.py'
+    :param str crash_path: path of the crash artifact (file or directory)
+    :param str crash_type: crash type (e.g. "ANR", "TOMBSTONE"), autodetected by the parser if not specified
+    :return: parser output "<crash id>,<process>", or None if the crash ID can't be computed
+    """
+    command = [crash_parser_script, "--crash-id", crash_path]
+    if crash_type:
+        command += ["--crash-type", crash_type]
+    try:
+        result = subprocess.run(command, capture_output=True, check=True, timeout=CRASH_PARSER_TIMEOUT)
+    except (OSError, subprocess.SubprocessError) as error:
+        logger.warning("Could not compute crash id from %s", crash_path)
+        logger.debug("Creating the crash ID failed with: %s", error)
+        logger.debug("Stderr: %s", getattr(error, "stderr", None))
+        return None
+    return str(result.stdout, "utf-8")
+
+
+class CrashIdEngine(object):
+    """Crash parser outputs, computed concurrently and cached by artifact content and crash type"""
+
+    def __init__(self, crash_parser_script, cache_path=None, workers=CRASH_ID_WORKERS):
+        """
+        :param str crash_parser_script: path of 'apinext-crash-parser.py'
+        :param str cache_path: json file where the outputs are kept between runs, not persisted if None
+        :param int workers: number of crash parser processes run at the same time
+        """
+        self.crash_parser_script = crash_parser_script
+        self.cache_path = cache_path
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._outputs = {}  # {(crash_path, crash_type): output}
+        # A new parser version may compute other IDs, so the cache is only valid for the same parser
+        self._parser_digest = get_path_digest(crash_parser_script) if os.path.isfile(crash_parser_script) else ""
+        self._cache = self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            logger.warning(f"Ignoring invalid crash ID cache '{self.cache_path}': {error}")
+            return {}
+        if cache.get("parser_digest") != self._parser_digest:
+            logger.info(f"Crash ID cache '{self.cache_path}' belongs to another crash parser, ignoring it")
+            return {}
+        return cache.get("outputs", {})
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temporary_path = self.cache_path + ".tmp"
+        with open(temporary_path, "w") as cache_file:
+            json.dump({"parser_digest": self._parser_digest, "outputs": self._cache}, cache_file, indent=4)
+        os.replace(temporary_path, self.cache_path)
+
+    def compute(self, artifacts):
+        """Computes the crash parser output of several artifacts, parsing each distinct content only once
+
+        :param list artifacts: list of (crash_path, crash_type) tuples, crash_type may be None
+        :return: dict with the output ("<crash id>,<process>" or None) of each (crash_path, crash_type)
+        """
+        pending = {}  # {cache_key: [(crash_path, crash_type), ...]}
+        for crash_path, crash_type in artifacts:
+            try:
+                cache_key = f"{get_artifact_digest(crash_path)}:{crash_type or ''}"
+            except OSError as error:
+                # Left to the crash parser, which reports why the artifact can't be parsed
+                logger.debug(f"Can't read crash artifact '{crash_path}': {error}")
+                cache_key = f"unreadable:{crash_path}:{crash_type or ''}"
+            if cache_key in self._cache:
+                self._outputs[(crash_path, crash_type)] = self._cache[cache_key]
+            else:
+                pending.setdefault(cache_key, []).append((crash_path, crash_type))
+
+        cached_amount = len(artifacts) - sum(len(duplicates) for duplicates in pending.values())
+        logger.info(
+            f"Computing the crash IDs of {len(pending)} distinct artifacts with {self.workers} workers, "
+            f"{cached_amount} of {len(artifacts)} found on the cache"
+        )
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crash_parser") as executor:
+                futures = {
+                    cache_key: executor.submit(run_crash_parser, self.crash_parser_script, *duplicates[0])
+                    for cache_key, duplicates in pending.items()
+                }
+            with self._lock:
+                for cache_key, future in futures.items():
+                    output = future.result()
+                    if output is not None and not cache_key.startswith("unreadable:"):
+                        # Failures are not cached, they are retried on the next run
+                        self._cache[cache_key] = output
+                    for artifact in pending[cache_key]:
+                        self._outputs[artifact] = output
+                self._save_cache()
+
+        return {artifact: self._outputs[artifact] for artifact in artifacts}
+
+    def get(self, crash_path, crash_type=None):
+        """Returns the crash parser output of an artifact, computing it if it wasn't computed yet
+
+        :return: parser output "<crash id>,<process>", or None if the crash ID can't be computed
+        """
+        if (crash_path, crash_type) not in self._outputs:
+            self.compute([(crash_path, crash_type)])
+        return self._outputs[(crash_path, crash_type)]
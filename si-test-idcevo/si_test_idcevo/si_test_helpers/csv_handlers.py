@@ -5,9 +5,19 @@ import logging
 import os
 import re
 
+from si_test_idcevo.si_test_helpers.lifecycle_workers import DLT_SCAN_WORKERS, map_lifecycles
+
 logger = logging.getLogger(__name__)
 
 
+def _csv_file_contains_string(search_args):
+    """Returns True if any row of 'csv_file' matches the 'string_to_search' regex"""
+    csv_file, string_to_search = search_args
+    string_to_search_regex = re.compile(string_to_search)
+    with open(csv_file) as file:
+        return any(string_to_search_regex.search(row) for row in file)
+
+
 class CSVHandler(object):
     def __init__(self, csv_file_name, csv_file_dir="") -> None:
         self.csv_file_name = csv_file_name
@@ -86,25 +96,28 @@ class CSVHandler(object):
 
         return files_path
 
-    def get_csv_files_after_given_string(self, csv_files_path, string_to_search):
+    def get_csv_files_after_given_string(self, csv_files_path, string_to_search, workers=None):
         """
         Get ordered list containing all csv files' path available inside of a specified directory.
         Remove CSV files that come before the file containing the "string_to_search".
         The first instance of "string_to_search" is the only one taken into account.
         If "string_to_search" can't be found, all files will be returned.
+        :param workers: number of processes used to search the lifecycles in parallel, defaults to DLT_SCAN_WORKERS
         """
         files_path = self.get_csv_files_path(dir=csv_files_path)
+        workers = DLT_SCAN_WORKERS if workers is None else workers
 
-        string_to_search_regex = re.compile(string_to_search)
         setup_done_file_index = None
-        for index, csv_file in enumerate(files_path):
-            with open(csv_file) as file:
-                for row in file:
-                    if string_to_search_regex.search(row):
-                        setup_done_file_index = index
-                        break
-            if setup_done_file_index is not None:
-                break
+        if workers > 1:
+            search_args = [(csv_file, string_to_search) for csv_file in files_path]
+            files_containing_string = map_lifecycles(_csv_file_contains_string, search_args, workers)
+            if any(files_containing_string):
+                setup_done_file_index = files_containing_string.index(True)
+        else:
+            for index, csv_file in enumerate(files_path):
+                if _csv_file_contains_string((csv_file, string_to_search)):
+                    setup_done_file_index = index
+                    break
 
         # If the 'string_to_search' was found, remove all files before the file containing it
         if setup_done_file_index is not None:
@@ -0,0 +1,264 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Helpers to handle recorded DLT files (.dlt) directly on the DLT storage format
+
+Only the python standard library is used, so this module can also be run on hosts without the DLT tools,
+e.g. to split the full DLT trace in the post-run playbooks:
+
+    python3 -m si_test_idcevo.si_test_helpers.dlt_file_helpers split <full_trace.dlt> --chunk-size 199 --compress
+"""
+import argparse
+import gzip
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Every message stored in a DLT file starts with a storage header:
+# pattern ("DLT\x01"), seconds (uint32), microseconds (int32) and ECU ID (4 chars), in little endian
+STORAGE_HEADER_PATTERN = b"DLT\x01"
+STORAGE_HEADER = struct.Struct("<4sIi4s")
+# The storage header is followed by the standard header, which contains the length of the message
+# (without the storage header): header type (uint8), message counter (uint8) and length (uint16), in big endian
+STANDARD_HEADER = struct.Struct(">BBH")
+# Optional fields of the standard header, present according to the header type flags
+HEADER_TYPE_UEH = 0x01  # use extended header
+HEADER_TYPE_WEID = 0x04  # with ECU ID
+HEADER_TYPE_WSID = 0x08  # with session ID
+HEADER_TYPE_WTMS = 0x10  # with timestamp (uint32, 0.1 milliseconds since the ECU startup)
+# Extended header: message info (uint8), number of arguments (uint8), application ID and context ID (4 chars)
+EXTENDED_HEADER = struct.Struct(">BB4s4s")
+
+DEFAULT_SPLIT_PREFIX = "split_dlt_file"
+DEFAULT_SPLIT_MANIFEST = "dlt_split_manifest.json"
+
+DltStorageMessage = namedtuple("DltStorageMessage", ["offset", "size", "timestamp", "ecu_id"])
+DltMessageHeaders = namedtuple("DltMessageHeaders", ["ecu_id", "tmsp", "apid", "ctid", "payload_offset"])
+
+
+def _decode_id(raw_id):
+    return raw_id.rstrip(b"\x00").decode("ascii", errors="replace")
+
+
+def iter_dlt_storage_messages(dlt_data, offset=0):
+    """Yields the position and storage header information of each message of DLT data
+
+    Corrupted data (e.g. a message cut at the end of a file) is skipped until the next storage header.
+    :param dlt_data: bytes-like object with the DLT file content (e.g. a mmap of the file)
+    :param int offset: offset of the first message to read
+    :return: generator of DltStorageMessage
+    """
+    header_size = STORAGE_HEADER.size + STANDARD_HEADER.size
+    data_size = len(dlt_data)
+    while offset + header_size <= data_size:
+        pattern, seconds, microseconds, ecu_id = STORAGE_HEADER.unpack_from(dlt_data, offset)
+        _, _, length = STANDARD_HEADER.unpack_from(dlt_data, offset + STORAGE_HEADER.size)
+        size = STORAGE_HEADER.size + length
+        if pattern != STORAGE_HEADER_PATTERN or length < STANDARD_HEADER.size or offset + size > data_size:
+            next_offset = dlt_data.find(STORAGE_HEADER_PATTERN, offset + 1)
+            logger.warning(f"Invalid DLT message at offset {offset}, skipping to offset {next_offset}")
+            if next_offset == -1:
+                return
+            offset = next_offset
+            continue
+
+        yield DltStorageMessage(offset, size, seconds + microseconds / 1000000, _decode_id(ecu_id))
+        offset += size
+
+
+def parse_dlt_message_headers(dlt_data, message):
+    """Parses the standard and extended headers of a message, without decoding its payload
+
+    Works for verbose and non-verbose messages. Fields not present on the message are returned as None.
+    :param dlt_data: bytes-like object with the DLT file content
+    :param DltStorageMessage message: message position, as yielded by iter_dlt_storage_messages
+    :return: DltMessageHeaders, where 'tmsp' is the ECU timestamp in seconds (same as python-dlt 'msg.tmsp')
+    """
+    offset = message.offset + STORAGE_HEADER.size
+    end = message.offset + message.size
+    header_type, _, _ = STANDARD_HEADER.unpack_from(dlt_data, offset)
+    offset += STANDARD_HEADER.size
+
+    ecu_id = message.ecu_id
+    tmsp = apid = ctid = None
+    if header_type & HEADER_TYPE_WEID and offset + 4 <= end:
+        ecu_id = _decode_id(struct.unpack_from("4s", dlt_data, offset)[0])
+        offset += 4
+    if header_type & HEADER_TYPE_WSID:
+        offset += 4
+    if header_type & HEADER_TYPE_WTMS and offset + 4 <= end:
+        tmsp = struct.unpack_from(">I", dlt_data, offset)[0] / 10000
+        offset += 4
+    if header_type & HEADER_TYPE_UEH and offset + EXTENDED_HEADER.size <= end:
+        _, _, raw_apid, raw_ctid = EXTENDED_HEADER.unpack_from(dlt_data, offset)
+        apid, ctid = _decode_id(raw_apid), _decode_id(raw_ctid)
+        offset += EXTENDED_HEADER.size
+
+    return DltMessageHeaders(ecu_id, tmsp, apid, ctid, min(offset, end))
+
+
+def write_dlt_messages(dlt_file, messages, output_file):
+    """Copies the given messages of a DLT file, as they are stored, to a new DLT file
+
+    Used to hand only a few selected messages (e.g. found with DltFileIndex) to the DLT tools,
+    instead of the full trace.
+    :param str dlt_file: path of the source DLT file
+    :param list messages: list of objects with 'offset' and 'size' attributes (e.g. DltStorageMessage)
+    :param str output_file: path of the DLT file to create
+    :return: number of messages written
+    """
+    with open(dlt_file, "rb") as source, open(output_file, "wb") as output:
+        for message in messages:
+            source.seek(message.offset)
+            output.write(source.read(message.size))
+    return len(messages)
+
+
+def format_dlt_storage_timestamp(timestamp):
+    """Formats a storage header timestamp as the time shown by 'dlt-convert', usable on file names
+
+    e.g. 1715336430.123456 -> '10_20_30_123456'
+    """
+    return datetime.fromtimestamp(timestamp).strftime("%H_%M_%S_%f")
+
+
+def compress_file(file_path):
+    """Compresses a file with gzip and removes the original one
+
+    :param str file_path: path of the file to compress
+    :return: path of the compressed file
+    """
+    compressed_file_path = file_path + ".gz"
+    with open(file_path, "rb") as file, gzip.open(compressed_file_path, "wb") as compressed_file:
+        shutil.copyfileobj(file, compressed_file)
+    os.remove(file_path)
+    return compressed_file_path
+
+
+def split_dlt_file(
+    dlt_file,
+    output_dir,
+    chunk_size,
+    prefix=DEFAULT_SPLIT_PREFIX,
+    manifest_name=DEFAULT_SPLIT_MANIFEST,
+    compress=False,
+    workers=None,
+):
+    """Splits a DLT file into chunks, in a single pass over the file
+
+    The file is only split on storage header boundaries, so no DLT message is cut in half. Each chunk is
+    named after the timestamp of its first message, and its first and last timestamp, ECU IDs and amount
+    of messages are written to a JSON manifest. Chunks are compressed in parallel, while the next ones are
+    still being split.
+
+    :param str dlt_file: path of the DLT file to split
+    :param str output_dir: directory where the chunks and the manifest are written
+    :param int chunk_size: maximum size of each chunk (bytes). Bigger messages are written to their own chunk.
+    :param str prefix: prefix of the chunks file name
+    :param str manifest_name: file name of the manifest
+    :param bool compress: compress the chunks with gzip
+    :param int workers: number of processes used to compress the chunks, defaults to the number of CPUs
+    :return: list with the manifest entry of each chunk
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = []
+    compress_futures = []
+
+    def write_chunk(dlt_data, chunk):
+        chunk_name = f"{prefix}_{format_dlt_storage_timestamp(chunk['first_timestamp'])}"
+        if any(entry["file"].startswith(chunk_name + ".") for entry in manifest):
+            chunk_name += f"_{len(manifest):03d}"
+        chunk_file = chunk_name + ".dlt"
+        chunk_start, chunk_end = chunk["offset"], chunk["offset"] + chunk["size"]
+        with open(os.path.join(output_dir, chunk_file), "wb") as chunk_out:
+            chunk_out.write(dlt_data[chunk_start:chunk_end])
+
+        chunk["ecu_ids"] = sorted(chunk["ecu_ids"])
+        manifest.append({"file": chunk_file + (".gz" if compress else ""), **chunk})
+        if compress:
+            compress_futures.append(executor.submit(compress_file, os.path.join(output_dir, chunk_file)))
+        logger.info(f"Chunk '{chunk_file}' written with {chunk['message_count']} messages")
+
+    # The chunks are only handed to worker processes when they are compressed
+    executor_context = ProcessPoolExecutor(max_workers=workers) if compress else nullcontext()
+    with executor_context as executor, open(dlt_file, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            logger.warning(f"DLT file '{dlt_file}' is empty, nothing to split")
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as dlt_data:
+                chunk = None
+                for message in iter_dlt_storage_messages(dlt_data):
+                    if chunk and message.offset + message.size - chunk["offset"] > chunk_size:
+                        write_chunk(dlt_data, chunk)
+                        chunk = None
+                    if not chunk:
+                        chunk = {
+                            "first_timestamp": message.timestamp,
+                            "last_timestamp": message.timestamp,
+                            "ecu_ids": set(),
+                            "message_count": 0,
+                            "offset": message.offset,
+                            "size": 0,
+                        }
+                    chunk["last_timestamp"] = message.timestamp
+                    chunk["ecu_ids"].add(message.ecu_id)
+                    chunk["message_count"] += 1
+                    chunk["size"] = message.offset + message.size - chunk["offset"]
+                if chunk:
+                    write_chunk(dlt_data, chunk)
+
+        for future in compress_futures:
+            future.result()
+
+    with open(os.path.join(output_dir, manifest_name), "w") as manifest_file:
+        json.dump({"source": os.path.abspath(dlt_file), "chunks": manifest}, manifest_file, indent=4)
+
+    return manifest
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description="Tools to handle recorded DLT files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = subparsers.add_parser("split", help="Split a DLT file on message boundaries")
+    split_parser.add_argument("dlt_file", help="DLT file to split")
+    split_parser.add_argument("--output-dir", default="dlt_split", help="Directory for the chunks and manifest")
+    split_parser.add_argument("--chunk-size", type=int, default=199, help="Maximum size of each chunk (MB)")
+    split_parser.add_argument("--prefix", default=DEFAULT_SPLIT_PREFIX, help="Prefix of the chunks file name")
+    split_parser.add_argument("--manifest", default=DEFAULT_SPLIT_MANIFEST, help="File name of the manifest")
+    split_parser.add_argument("--compress", action="store_true", help="Compress the chunks with gzip")
+    split_parser.add_argument("--workers", type=int, default=None, help="Processes used to compress the chunks")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    args = parse_arguments(sys.argv[1:] if args is None else args)
+
+    if args.command == "split":
+        manifest = split_dlt_file(
+            args.dlt_file,
+            args.output_dir,
+            args.chunk_size * 1024 * 1024,
+            prefix=args.prefix,
+            manifest_name=args.manifest,
+            compress=args.compress,
+            workers=args.workers,
+        )
+        logger.info(f"'{args.dlt_file}' split into {len(manifest)} chunks")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Seek index of recorded DLT files (.dlt), persisted next to the trace
+
+The index is a SQLite database stored as a sidecar of the DLT file (e.g. 'full_trace.dlt.idx.sqlite').
+It holds the byte offset of every message, bucketed by timestamp, apid/ctid and ECU ID, so post-tests can
+seek directly to the messages they need instead of loading and iterating the full trace. Only the headers
+are parsed, so verbose and non-verbose files are supported. The DLT file mtime and size are registered
+on the index and it is rebuilt automatically whenever one of those changes.
+
+Selected messages can be copied to a small DLT file with 'write_dlt_messages' and handed to the DLT tools,
+e.g. to decode only them with 'decode_dlt_file_with_fibex'.
+"""
+import logging
+import mmap
+import os
+import re
+import sqlite3
+
+from collections import namedtuple
+from si_test_idcevo.si_test_helpers.dlt_file_helpers import iter_dlt_storage_messages, parse_dlt_message_headers
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_SUFFIX = ".idx.sqlite"
+INDEX_SCHEMA_VERSION = 1
+INDEX_INSERT_BATCH_SIZE = 10000
+SQLITE_LOCK_TIMEOUT = 120  # seconds
+# Time fields which can be used on queries: ECU timestamp ('tmsp') or storage header timestamp ('timestamp')
+TIME_FIELDS = ("tmsp", "timestamp")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS source (dlt_file TEXT, mtime_ns INTEGER, size INTEGER)",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    " offset INTEGER PRIMARY KEY, size INTEGER, timestamp REAL, tmsp REAL, ecu_id TEXT, apid TEXT, ctid TEXT,"
+    " payload_offset INTEGER)",
+    "CREATE INDEX IF NOT EXISTS messages_by_filter ON messages (apid, ctid, tmsp)",
+    "CREATE INDEX IF NOT EXISTS messages_by_ecu ON messages (ecu_id, tmsp)",
+    "CREATE INDEX IF NOT EXISTS messages_by_tmsp ON messages (tmsp)",
+    "CREATE INDEX IF NOT EXISTS messages_by_timestamp ON messages (timestamp)",
+)
+_ENTRY_COLUMNS = "offset, size, timestamp, tmsp, ecu_id, apid, ctid, payload_offset"
+
+DltIndexEntry = namedtuple(
+    "DltIndexEntry", ["offset", "size", "timestamp", "tmsp", "ecu_id", "apid", "ctid", "payload_offset"]
+)
+
+# Indexes already opened during this run, keyed by DLT file path
+_OPENED_INDEXES = {}
+
+
+class DltFileIndex(object):
+    """SQLite seek index of a DLT file, keyed by offset, timestamp, apid/ctid and ECU ID"""
+
+    def __init__(self, dlt_file):
+        """
+        :param str dlt_file: path of the DLT file to index. The index is stored next to it.
+        """
+        self.dlt_file = os.path.abspath(dlt_file)
+        self.index_path = self.dlt_file + INDEX_FILE_SUFFIX
+        self._connection = sqlite3.connect(self.index_path, timeout=SQLITE_LOCK_TIMEOUT)
+        self._create_schema()
+        self._file = None
+        self._dlt_data = b""
+        self._map_dlt_file()
+        self.update()
+
+    def close(self):
+        """Closes the DLT file and the connection to the index database"""
+        self._unmap_dlt_file()
+        self._connection.close()
+
+    def _map_dlt_file(self):
+        """(Re)maps the DLT file in memory, so the payloads can be searched without reading the file"""
+        self._unmap_dlt_file()
+        self._file = open(self.dlt_file, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._dlt_data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap_dlt_file(self):
+        if isinstance(self._dlt_data, mmap.mmap):
+            self._dlt_data.close()
+        self._dlt_data = b""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _create_schema(self):
+        """Creates the index tables, dropping any index created with a different schema version"""
+        user_version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if user_version != INDEX_SCHEMA_VERSION:
+            with self._connection:
+                self._connection.execute("DROP TABLE IF EXISTS source")
+                self._connection.execute("DROP TABLE IF EXISTS messages")
+            self._connection.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+        with self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def _iter_index_rows(self):
+        for message in iter_dlt_storage_messages(self._dlt_data):
+            headers = parse_dlt_message_headers(self._dlt_data, message)
+            yield (
+                message.offset,
+                message.size,
+                message.timestamp,
+                headers.tmsp,
+                headers.ecu_id,
+                headers.apid,
+                headers.ctid,
+                headers.payload_offset,
+            )
+
+    def update(self):
+        """(Re)builds the index if the DLT file was not indexed yet, or if its mtime or size changed
+
+        :return: True if the index was (re)built, False if it was already up to date
+        """
+        stat = os.stat(self.dlt_file)
+        indexed = self._connection.execute("SELECT mtime_ns, size FROM source").fetchone()
+        if indexed == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        logger.info(f"Indexing DLT file '{self.dlt_file}'")
+        self._map_dlt_file()
+        with self._connection:
+            self._connection.execute("DELETE FROM messages")
+            self._connection.execute("DELETE FROM source")
+            rows = []
+            for row in self._iter_index_rows():
+                rows.append(row)
+                if len(rows) >= INDEX_INSERT_BATCH_SIZE:
+                    self._connection.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    rows = []
+            self._connection.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._connection.execute(
+                "INSERT INTO source VALUES (?, ?, ?)", (self.dlt_file, stat.st_mtime_ns, stat.st_size)
+            )
+        logger.info(f"Indexed {self.message_count} messages from '{self.dlt_file}'")
+        return True
+
+    @property
+    def message_count(self):
+        return self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def find(
+        self, apid=None, ctid=None, ecu_id=None, start=None, end=None, after_offset=None, limit=None, time_field="tmsp"
+    ):
+        """Returns the indexed messages matching all the given conditions, sorted by offset
+
+        e.g. all the messages of ('NSM', 'NSMC') between 10 and 20 seconds after the ECU startup:
+            dlt_index.find(apid="NSM", ctid="NSMC", start=10, end=20)
+        :param str apid: optional application ID
+        :param str ctid: optional context ID
+        :param str ecu_id: optional ECU ID
+        :param float start: optional lower bound (inclusive) of the time field
+        :param float end: optional upper bound (inclusive) of the time field
+        :param int after_offset: optional offset (inclusive) from where the messages are returned
+        :param int limit: optional maximum number of messages to return
+        :param str time_field: time field used on 'start' and 'end', one of TIME_FIELDS
+        :return: list of DltIndexEntry
+        """
+        if time_field not in TIME_FIELDS:
+            raise ValueError(f"Invalid time field '{time_field}', expected one of {TIME_FIELDS}")
+
+        conditions, arguments = [], []
+        for column, value in (("apid", apid), ("ctid", ctid), ("ecu_id", ecu_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                arguments.append(value)
+        if start is not None:
+            conditions.append(f"{time_field} >= ?")
+            arguments.append(start)
+        if end is not None:
+            conditions.append(f"{time_field} <= ?")
+            arguments.append(end)
+        if after_offset is not None:
+            conditions.append("offset >= ?")
+            arguments.append(after_offset)
+
+        query = f"SELECT {_ENTRY_COLUMNS} FROM messages"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY offset"
+        if limit is not None:
+            query += " LIMIT ?"
+            arguments.append(limit)
+        return [DltIndexEntry(*row) for row in self._connection.execute(query, arguments)]
+
+    def get_message_at(self, offset):
+        """Returns the indexed message containing the given byte offset, or None if there is none"""
+        row = self._connection.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM messages WHERE offset <= ? ORDER BY offset DESC LIMIT 1", (offset,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = DltIndexEntry(*row)
+        return entry if offset < entry.offset + entry.size else None
+
+    def iter_payload_matches(self, payload_pattern, after_offset=0, apid=None, ctid=None, ecu_id=None):
+        """Yields the messages whose raw payload matches a pattern, seeking from match to match
+
+        The pattern is searched on the raw file data, so no message is decoded. String arguments of
+        verbose messages are stored as plain text, so they can be matched directly (e.g. b"SoC reached sleep").
+        Each match is then confirmed on the payload of the message where it was found.
+        :param payload_pattern: regex pattern (str or bytes) to search on the raw payload
+        :param int after_offset: offset (inclusive) from where the messages are searched
+        :param str apid: optional application ID of the messages
+        :param str ctid: optional context ID of the messages
+        :param str ecu_id: optional ECU ID of the messages
+        :return: generator of DltIndexEntry, sorted by offset
+        """
+        if isinstance(payload_pattern, str):
+            payload_pattern = payload_pattern.encode()
+        regex = re.compile(payload_pattern)
+        filters = {"apid": apid, "ctid": ctid, "ecu_id": ecu_id}
+
+        position = after_offset
+        while True:
+            match = regex.search(self._dlt_data, position)
+            if not match:
+                return
+            entry = self.get_message_at(match.start())
+            if entry is None or entry.offset < after_offset:
+                position = match.start() + 1
+                continue
+            if all(value is None or getattr(entry, name) == value for name, value in filters.items()):
+                if regex.search(self._dlt_data, entry.payload_offset, entry.offset + entry.size):
+                    yield entry
+            position = entry.offset + entry.size
+
+    def find_first(self, payload_pattern, after_offset=0, apid=None, ctid=None, ecu_id=None):
+        """Returns the first message whose raw payload matches a pattern, see 'iter_payload_matches'
+
+        :return: DltIndexEntry, or None if no message matches
+        """
+        return next(self.iter_payload_matches(payload_pattern, after_offset, apid, ctid, ecu_id), None)
+
+    def search_payloads(self, payload_patterns, after_offset=0, apid=None, ctid=None, ecu_id=None):
+        """Returns the messages whose raw payload matches any of the given patterns, see 'iter_payload_matches'
+
+        :param list payload_patterns: list of regex patterns (str or bytes)
+        :return: list of DltIndexEntry, sorted by offset and without duplicates
+        """
+        entries = {}
+        for payload_pattern in payload_patterns:
+            for entry in self.iter_payload_matches(payload_pattern, after_offset, apid, ctid, ecu_id):
+                entries[entry.offset] = entry
+        return [entries[offset] for offset in sorted(entries)]
+
+
+def get_dlt_file_index(dlt_file):
+    """Returns the run-wide index of a DLT file, building or refreshing its sidecar when needed
+
+    :param str dlt_file: path of the DLT file
+    :return: DltFileIndex instance
+    """
+    dlt_file = os.path.abspath(dlt_file)
+    if dlt_file not in _OPENED_INDEXES:
+        logger.info(f"Opening DLT file index: '{dlt_file + INDEX_FILE_SUFFIX}'")
+        _OPENED_INDEXES[dlt_file] = DltFileIndex(dlt_file)
+    else:
+        _OPENED_INDEXES[dlt_file].update()
+    return _OPENED_INDEXES[dlt_file]
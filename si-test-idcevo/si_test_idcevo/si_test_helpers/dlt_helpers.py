@@ -1,12 +1,12 @@
 # Copyright (C) 2024. BMW CTW PT. All rights reserved.
 """DLT component related helpers"""
-import csv
 import logging
 import os
 import re
 
 from collections import defaultdict
 from mtee.testing.tools import assert_equal, assert_false, assert_true
+from si_test_idcevo.si_test_helpers.dlt_msgs_index import get_dlt_msgs_index
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +29,10 @@ def seek_android_dlt_msg_with_conditions(
     failing_lifecycles, late_lifecycles = [], []
     pwf_states_with_android_msgs = ["FAHREN", "DIAGNOSE", "WOHNEN"]  # 0-FAHREN 1-DIAGNOSE 2-WOHNEN
     minimum_lyfecycle_duration = 30  # seconds
+    dlt_msgs_index = get_dlt_msgs_index(dlt_log_extract_file_paths)
     for dlt_log_extract_file_path in dlt_log_extract_file_paths:
         lifecycle_no = os.path.basename(os.path.dirname(dlt_log_extract_file_path))
-        with open(dlt_log_extract_file_path, "r") as dlt_log_extract:
-            csv_data = csv.DictReader(dlt_log_extract)
-            read_data = [entry for entry in csv_data]
+        read_data = dlt_msgs_index.read_rows(dlt_log_extract_file_path)
         match = []
         if not read_data:
             logger.warning(f"In LC '{lifecycle_no}' there where no messages of interest captured")
@@ -1,20 +1,41 @@
 # Copyright (C) 2023. BMW CTW PT. All rights reserved.
 """Helper class to parse messages from DLT log."""
 
-import csv
 import logging
 import os
 import re
+import tempfile
 import time
 
+from collections import defaultdict
 from dlt.dlt_broker import DLTBroker
 from dlt_non_verbose.dlt_non_verbose import DltNonVerbose
 from mtee.testing.tools import assert_equal
 from pydlt import DltFileWriter
+from si_test_idcevo.si_test_helpers.dlt_file_helpers import write_dlt_messages
+from si_test_idcevo.si_test_helpers.dlt_msgs_index import (
+    DLTMsgsIndex,
+    get_dlt_msgs_index,
+    get_lifecycle_from_csv_path,
+)
+from si_test_idcevo.si_test_helpers.lifecycle_workers import DLT_SCAN_WORKERS, map_lifecycles
 
 logger = logging.getLogger(__name__)
 
 
+def _scan_lifecycle_dlt_logs(scan_args):
+    """Worker of DLTLogsPatternMatcher.scan, scans a single 'dlt_msgs_of_interest.csv' file"""
+    dlt_log_verification, lifecycles_dir, csv_file = scan_args
+    # Each worker opens its own connection, SQLite connections can't be shared across processes
+    dlt_msgs_index = DLTMsgsIndex(lifecycles_dir, os.path.basename(csv_file))
+    try:
+        matcher = DLTLogsPatternMatcher(dlt_log_verification, dlt_msgs_index, [csv_file], workers=1)
+        matcher.scan()
+        return matcher._logs_found
+    finally:
+        dlt_msgs_index.close()
+
+
 def generate_new_dlt_file_with_upcoming_messages(target, filename="new_dlt_trace.dlt", timeout=20):
     """Generate a new dlt file with upcoming msg within the next "timeout" seconds
 
@@ -38,7 +59,7 @@ def generate_new_dlt_file_with_upcoming_messages(target, filename="new_dlt_trace
     broker.stop()
 
 
-def decode_dlt_file_with_fibex(fibexfile, dlt_file, decoded_dlt_file=None, ecuid=None):
+def decode_dlt_file_with_fibex(fibexfile, dlt_file, decoded_dlt_file=None, ecuid=None, messages=None):
     """Decode messages from dlt file given an fibex file
 
     To decode the messages the Fibex file need to be provided. The messages decoded will be
@@ -46,6 +67,7 @@ def decode_dlt_file_with_fibex(fibexfile, dlt_file, decoded_dlt_file=None, ecuid
 
     **Important**
     Be careful not to try to decode the full dlt trace, this is intended to decode small dlt files.
+    To decode only a few messages of a big trace, select them with DltFileIndex and pass them on 'messages'.
 
     :param fibexfile: Path to the fibex file
     :type fibexfile: Path
@@ -55,10 +77,18 @@ def decode_dlt_file_with_fibex(fibexfile, dlt_file, decoded_dlt_file=None, ecuid
     :type decoded_dlt_file: Path, optional
     :param ecuid: Filter dlt msgs by ecuid, defaults to None
     :type ecuid: Str, optional
+    :param messages: Decode only these messages of the dlt file (e.g. DltIndexEntry list), defaults to None
+    :type messages: List, optional
 
     :return: List of the decoded messages
     :rtype: List
     """
+    if messages is not None:
+        with tempfile.TemporaryDirectory() as selected_msgs_dir:
+            selected_msgs_file = os.path.join(selected_msgs_dir, "selected_msgs.dlt")
+            write_dlt_messages(dlt_file, messages, selected_msgs_file)
+            return decode_dlt_file_with_fibex(fibexfile, selected_msgs_file, decoded_dlt_file, ecuid)
+
     non_verbose_dlt = DltNonVerbose()
     non_verbose_dlt.parse_fibex_file(fibexfile)
 
@@ -114,12 +144,64 @@ def validate_expected_dlt_payloads_in_dlt_trace(
     )
 
 
-class DLTLogsHandler(object):
-    def __init__(self, logger, files_path):
-        self.logger = logger
-        self.files_path = files_path
+class DLTLogsPatternMatcher(object):
+    """Answers all the searches of a DLT_LOG_VERIFICATION config with a single scan of the DLT messages of interest
+
+    Every pattern of the config is compiled once and bucketed by its (apid, ctid) filter. Each bucket has a
+    combined alternation regex used as prefilter, so payloads not matching any pattern of the bucket are
+    discarded with a single search. The results of every search are kept in memory after the scan.
+    """
 
-    def add_dlt_msg_to_dict(self, row, logs_found, csv_file):
+    # Bucket of the filters with an empty apid or ctid, which match every DLT message
+    WILDCARD = (None, None)
+
+    def __init__(self, dlt_log_verification, dlt_msgs_index, files_path, workers=None):
+        """
+        :param dlt_log_verification: dict with the searches to perform, with the format of DLT_LOG_VERIFICATION
+        :param dlt_msgs_index: DLTMsgsIndex of the 'dlt_msgs_of_interest.csv' files, or None if there are none
+        :param files_path: list of 'dlt_msgs_of_interest.csv' files path to scan
+        :param workers: number of processes used to scan the lifecycles, defaults to DLT_SCAN_WORKERS
+        """
+        self.dlt_log_verification = dlt_log_verification
+        self.dlt_msgs_index = dlt_msgs_index
+        self.files_path = files_path
+        self.workers = DLT_SCAN_WORKERS if workers is None else workers
+
+        self._compiled_patterns = {}
+        buckets = defaultdict(list)
+        for search_name, settings in dlt_log_verification.items():
+            for filter in range(len(settings["apid"])):
+                apid, ctid = settings["apid"][filter], settings["ctid"][filter]
+                bucket_key = (apid, ctid) if apid and ctid else self.WILDCARD
+                for pattern in settings["pattern"][filter]:
+                    buckets[bucket_key].append((search_name, self._compile(pattern)))
+        self._buckets = {key: (self._build_prefilter(entries), entries) for key, entries in buckets.items()}
+
+        self._logs_found = None
+        self._logs_found_sorted = {}
+
+    def _compile(self, pattern):
+        if pattern not in self._compiled_patterns:
+            self._compiled_patterns[pattern] = re.compile(pattern)
+        return self._compiled_patterns[pattern]
+
+    def _build_prefilter(self, entries):
+        """Combines all the patterns of a bucket into a single alternation regex
+
+        Patterns using backreferences can't be safely combined, in that case no prefilter is used.
+        :param entries: list of (search name, compiled pattern) tuples of the bucket
+        :return: compiled alternation regex, or None if the bucket does not need/support a prefilter
+        """
+        patterns = sorted({regex.pattern for _, regex in entries})
+        if len(patterns) < 2 or any(re.search(r"\\[1-9]|\(\?P=", pattern) for pattern in patterns):
+            return None
+        try:
+            return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+        except re.error as error:
+            logger.debug(f"Unable to combine patterns {patterns} into a prefilter: {error}")
+            return None
+
+    def _add_dlt_msg_to_dict(self, row, logs_found, csv_file):
         """
         Adds a specific DLT message payload and respective lifecycle to dict 'logs_found'.
         :param row: dlt message.
@@ -127,71 +209,124 @@ class DLTLogsHandler(object):
             dict key: DLT message payload
             dict item: list containg the lifecycles in which the message payload was found.
         :param csv_file: "dlt_msgs_of_interest.csv" file path.
-        :return: adds DLT message payload and lifecycle to 'logs_found' dict.
         """
-
-        if row["payload"] not in logs_found:
-            logs_found[row["payload"]] = []
-
-        # lifecycle folder is located on the penultimate position ([-2]) of the file path
-        # (e.g. [..., 'extracted_files', 'Lifecycles', '02', 'dlt_msgs_of_interest.csv'])
-        current_lifecycle = csv_file.split(os.sep)[-2]
-
-        if current_lifecycle not in logs_found[row["payload"]]:
-            logs_found[row["payload"]].append(current_lifecycle)
-
-        return logs_found
-
-    def parse_dlt_logs(self, settings, detailed_payload=False):
-        """
-        Used to parse DLT log messages.
-        :param settings: dict containing configurations needed for each SearchDLTLogs test.
-        It corresponds to the items format of DLT_LOG_VERIFICATION dict.
-        :param detailed_payload: when enabled, it returns the full payloads found in the DLT logs.
-        :return: dict with dlt logs found.
-            dict key: regex pattern (str).
-            dict item: list containing the lifecyles in which the regex pattern was found.
-        """
-
-        logs_found = {}
-        for csv_file in self.files_path:
-            with open(csv_file) as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    for filter in range(len(settings["apid"])):
-                        if (
-                            (row["apid"] == settings["apid"][filter])
-                            and (row["ctid"] == settings["ctid"][filter])
-                            or not (settings["apid"][filter] and settings["ctid"][filter])
-                        ):
-                            for pattern in settings["pattern"][filter]:
-                                if re.search(re.compile(pattern), row["payload"]):
-                                    logs_found = self.add_dlt_msg_to_dict(row, logs_found, csv_file)
-        if detailed_payload:
-            return logs_found
-
-        return self.process_dlt_logs_found(settings["pattern"], logs_found)
-
-    def process_dlt_logs_found(self, pattern_list, logs_found):
+        lifecycles_found = logs_found.setdefault(row["payload"], [])
+        current_lifecycle = get_lifecycle_from_csv_path(csv_file)
+        if current_lifecycle not in lifecycles_found:
+            lifecycles_found.append(current_lifecycle)
+
+    def scan(self):
+        """Scans the DLT messages of interest once, searching for all the patterns of the config"""
+        self._logs_found = {search_name: {} for search_name in self.dlt_log_verification}
+        self._logs_found_sorted = {}
+
+        if self.workers > 1 and self.dlt_msgs_index and len(self.files_path) > 1:
+            self._scan_in_parallel()
+            return
+
+        # Only ask the index for the rows matching the (apid, ctid) filters, unless one of them is a wildcard
+        index_filters = None if self.WILDCARD in self._buckets else list(self._buckets)
+        rows = self.dlt_msgs_index.iter_rows(self.files_path, filters=index_filters) if self.dlt_msgs_index else []
+        wildcard_bucket = self._buckets.get(self.WILDCARD)
+
+        for csv_file, row in rows:
+            payload = row["payload"]
+            for bucket in (self._buckets.get((row["apid"], row["ctid"])), wildcard_bucket):
+                if not bucket:
+                    continue
+                prefilter, entries = bucket
+                if prefilter and not prefilter.search(payload):
+                    continue
+                for search_name, regex in entries:
+                    if regex.search(payload):
+                        self._add_dlt_msg_to_dict(row, self._logs_found[search_name], csv_file)
+
+    def _scan_in_parallel(self):
+        """Scans each lifecycle in a separate process and merges the results in the lifecycles order"""
+        scan_args = [
+            (self.dlt_log_verification, self.dlt_msgs_index.lifecycles_dir, csv_file) for csv_file in self.files_path
+        ]
+        for lifecycle_logs_found in map_lifecycles(_scan_lifecycle_dlt_logs, scan_args, self.workers):
+            for search_name, logs_found in lifecycle_logs_found.items():
+                for payload, lifecycles in logs_found.items():
+                    lifecycles_found = self._logs_found[search_name].setdefault(payload, [])
+                    lifecycles_found.extend(lifecycle for lifecycle in lifecycles if lifecycle not in lifecycles_found)
+
+    def _process_dlt_logs_found(self, pattern_list, logs_found):
         """
         Verifies if target DLT logs were found in all lifecycles.
         :param pattern_list: list containing the target regex patterns
         :param logs_found: dict containing the target DLT logs found:
             dict key: DLT message payload
             dict item: list containg the lifecycles in which the message payload was found.
-        :return: adds DLT message payload and lifecycle to 'logs_found' dict.
+        :return: dict with the sorted lifecycles in which each regex pattern was found.
         """
         logs_found_sorted = {}
-        for list in range(len(pattern_list)):
-            for pattern in pattern_list[list]:
+        for patterns in pattern_list:
+            for pattern in patterns:
+                regex = self._compile(pattern)
                 matching_items = []
                 for pattern_found, list_lifecycles_found in logs_found.items():
-                    if re.search(pattern, pattern_found):
-                        for lifecycle in list_lifecycles_found:
-                            matching_items.append(lifecycle)
+                    if regex.search(pattern_found):
+                        matching_items.extend(list_lifecycles_found)
                         logs_found_sorted[pattern] = sorted(set(matching_items))
 
                 if pattern not in logs_found_sorted:
                     logs_found_sorted[pattern] = []
 
         return logs_found_sorted
+
+    def get_logs_found(self, search_name, detailed_payload=False):
+        """
+        Returns the result of one of the searches of the config. The scan is done on the first call.
+        :param search_name: key of the search in the DLT_LOG_VERIFICATION config
+        :param detailed_payload: when enabled, it returns the full payloads found in the DLT logs.
+        :return: dict with dlt logs found.
+            dict key: regex pattern (str), or DLT message payload if 'detailed_payload' is enabled.
+            dict item: list containing the lifecyles in which the regex pattern/payload was found.
+        """
+        if self._logs_found is None:
+            self.scan()
+
+        if detailed_payload:
+            return self._logs_found[search_name]
+
+        if search_name not in self._logs_found_sorted:
+            self._logs_found_sorted[search_name] = self._process_dlt_logs_found(
+                self.dlt_log_verification[search_name]["pattern"], self._logs_found[search_name]
+            )
+        return self._logs_found_sorted[search_name]
+
+
+class DLTLogsHandler(object):
+    def __init__(self, logger, files_path, workers=None):
+        """
+        :param logger: logger to use
+        :param files_path: list of 'dlt_msgs_of_interest.csv' files path
+        :param workers: number of processes used to scan the lifecycles in parallel, defaults to DLT_SCAN_WORKERS
+        """
+        self.logger = logger
+        self.files_path = files_path
+        self.workers = workers
+        self.dlt_msgs_index = get_dlt_msgs_index(files_path)
+
+    def get_pattern_matcher(self, dlt_log_verification):
+        """
+        Returns a matcher that answers all the searches of 'dlt_log_verification' with a single scan of the logs.
+        :param dlt_log_verification: dict with the searches to perform, with the format of DLT_LOG_VERIFICATION
+        :return: DLTLogsPatternMatcher instance
+        """
+        return DLTLogsPatternMatcher(dlt_log_verification, self.dlt_msgs_index, self.files_path, self.workers)
+
+    def parse_dlt_logs(self, settings, detailed_payload=False):
+        """
+        Used to parse DLT log messages.
+        :param settings: dict containing configurations needed for each SearchDLTLogs test.
+        It corresponds to the items format of DLT_LOG_VERIFICATION dict.
+        :param detailed_payload: when enabled, it returns the full payloads found in the DLT logs.
+        :return: dict with dlt logs found.
+            dict key: regex pattern (str).
+            dict item: list containing the lifecyles in which the regex pattern was found.
+        """
+        search_name = "parse_dlt_logs"
+        return self.get_pattern_matcher({search_name: settings}).get_logs_found(search_name, detailed_payload)
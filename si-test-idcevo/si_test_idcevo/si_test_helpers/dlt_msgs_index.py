@@ -0,0 +1,189 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Run-wide index of the 'dlt_msgs_of_interest.csv' files extracted per lifecycle.
+
+The index is a SQLite database stored next to the lifecycle folders (e.g.
+'extracted_files/Lifecycles/dlt_msgs_of_interest_index.sqlite'). It is built the first time a post-test
+asks for it and shared by all the following post-tests of the run, so every csv file is parsed only once.
+Each indexed csv file is registered with its mtime and size, and it is re-indexed automatically
+whenever one of those changes.
+"""
+import csv
+import json
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_SUFFIX = "_index.sqlite"
+INDEX_SCHEMA_VERSION = 1
+SQLITE_LOCK_TIMEOUT = 120  # seconds
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sources ("
+    " csv_file TEXT PRIMARY KEY, lifecycle TEXT, mtime_ns INTEGER, size INTEGER)",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    " csv_file TEXT, lifecycle TEXT, line INTEGER, timestamp REAL, apid TEXT, ctid TEXT, payload TEXT, row TEXT)",
+    "CREATE INDEX IF NOT EXISTS messages_by_source ON messages (csv_file, line)",
+    "CREATE INDEX IF NOT EXISTS messages_by_filter ON messages (lifecycle, apid, ctid, timestamp)",
+)
+
+# Indexes already opened during this run, keyed by index file path
+_OPENED_INDEXES = {}
+
+
+def get_lifecycle_from_csv_path(csv_file):
+    """Returns the lifecycle of a 'dlt_msgs_of_interest.csv' file
+
+    The lifecycle folder is located on the penultimate position ([-2]) of the file path
+    (e.g. [..., 'extracted_files', 'Lifecycles', '02', 'dlt_msgs_of_interest.csv'])
+    """
+    return csv_file.split(os.sep)[-2]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DLTMsgsIndex(object):
+    """SQLite index of the DLT messages of interest, keyed by lifecycle, apid, ctid and timestamp"""
+
+    def __init__(self, lifecycles_dir, csv_file_name):
+        """
+        :param str lifecycles_dir: path of the directory containing the lifecycle folders
+        :param str csv_file_name: name of the csv files to index (e.g. 'dlt_msgs_of_interest.csv')
+        """
+        self.lifecycles_dir = os.path.abspath(lifecycles_dir)
+        self.csv_file_name = csv_file_name
+        self.index_path = os.path.join(self.lifecycles_dir, os.path.splitext(csv_file_name)[0] + INDEX_FILE_SUFFIX)
+        # Lifecycles may be indexed concurrently by several processes, wait for the lock instead of failing
+        self._connection = sqlite3.connect(self.index_path, timeout=SQLITE_LOCK_TIMEOUT)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._create_schema()
+
+    def close(self):
+        """Closes the connection to the index database"""
+        self._connection.close()
+
+    def _create_schema(self):
+        """Creates the index tables, dropping any index created with a different schema version"""
+        user_version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if user_version != INDEX_SCHEMA_VERSION:
+            with self._connection:
+                self._connection.execute("DROP TABLE IF EXISTS sources")
+                self._connection.execute("DROP TABLE IF EXISTS messages")
+            self._connection.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+        with self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def _source_key(self, csv_file):
+        return os.path.relpath(os.path.abspath(csv_file), self.lifecycles_dir)
+
+    def _index_csv_file(self, source_key, csv_file, stat):
+        """(Re)indexes a single csv file, replacing any row previously indexed for it"""
+        lifecycle = get_lifecycle_from_csv_path(os.path.abspath(csv_file))
+        with open(csv_file) as f:
+            reader = csv.DictReader(f)
+            messages = [
+                (
+                    source_key,
+                    lifecycle,
+                    line,
+                    _to_float(row.get("timestamp")),
+                    row.get("apid"),
+                    row.get("ctid"),
+                    row.get("payload"),
+                    json.dumps(row),
+                )
+                for line, row in enumerate(reader)
+            ]
+
+        with self._connection:
+            self._connection.execute("DELETE FROM messages WHERE csv_file = ?", (source_key,))
+            self._connection.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", messages)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                (source_key, lifecycle, stat.st_mtime_ns, stat.st_size),
+            )
+        logger.debug(f"Indexed {len(messages)} messages from '{csv_file}'")
+
+    def update(self, files_path):
+        """Makes sure all the given csv files are indexed and up to date
+
+        Files not indexed yet, or whose mtime or size changed since they were indexed, are (re)parsed.
+        :param list files_path: list of csv files path
+        :return: list with the index keys of the given files
+        """
+        source_keys = []
+        for csv_file in files_path:
+            source_key = self._source_key(csv_file)
+            stat = os.stat(csv_file)
+            indexed = self._connection.execute(
+                "SELECT mtime_ns, size FROM sources WHERE csv_file = ?", (source_key,)
+            ).fetchone()
+            if indexed != (stat.st_mtime_ns, stat.st_size):
+                self._index_csv_file(source_key, csv_file, stat)
+            source_keys.append(source_key)
+        return source_keys
+
+    def iter_rows(self, files_path, filters=None, start=None, end=None):
+        """Yields the indexed rows of the given csv files, in the same order as reading them with csv.DictReader
+
+        :param list files_path: list of csv files path
+        :param list filters: optional list of (apid, ctid) tuples. A row is returned if it matches any of them.
+        :param float start: optional lower bound (inclusive) of the message timestamp
+        :param float end: optional upper bound (inclusive) of the message timestamp
+        :return: generator of (csv_file, row) tuples, where row is a dict with the csv columns
+        """
+        conditions, arguments = [], []
+        if filters:
+            conditions.append("(" + " OR ".join(["(apid = ? AND ctid = ?)"] * len(filters)) + ")")
+            for apid, ctid in filters:
+                arguments.extend([apid, ctid])
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            arguments.append(start)
+        if end is not None:
+            conditions.append("timestamp <= ?")
+            arguments.append(end)
+        query = "SELECT row FROM messages WHERE csv_file = ?"
+        if conditions:
+            query += " AND " + " AND ".join(conditions)
+        query += " ORDER BY line"
+
+        for csv_file, source_key in zip(files_path, self.update(files_path)):
+            for (row,) in self._connection.execute(query, [source_key] + arguments):
+                yield csv_file, json.loads(row)
+
+    def read_rows(self, csv_file):
+        """Returns the list of rows of a single csv file, the same as list(csv.DictReader(file))"""
+        return [row for _, row in self.iter_rows([csv_file])]
+
+
+def get_dlt_msgs_index(files_path):
+    """Returns the run-wide index for the given 'dlt_msgs_of_interest.csv' files
+
+    All the files are expected to be inside the lifecycle folders of the same directory
+    and to share the same file name. The index is opened once per run and reused afterwards.
+    :param list files_path: list of csv files path, as returned by CSVHandler.get_csv_files_path
+    :return: DLTMsgsIndex instance, or None if no files were given
+    """
+    if not files_path:
+        return None
+
+    lifecycle_dirs = sorted({os.path.dirname(os.path.abspath(csv_file)) for csv_file in files_path})
+    if len(lifecycle_dirs) > 1:
+        lifecycles_dir = os.path.commonpath(lifecycle_dirs)
+    else:
+        lifecycles_dir = os.path.dirname(lifecycle_dirs[0])
+    csv_file_name = os.path.basename(files_path[0])
+
+    index_path = os.path.join(lifecycles_dir, os.path.splitext(csv_file_name)[0] + INDEX_FILE_SUFFIX)
+    if index_path not in _OPENED_INDEXES:
+        logger.info(f"Opening DLT messages index: '{index_path}'")
+        _OPENED_INDEXES[index_path] = DLTMsgsIndex(lifecycles_dir, csv_file_name)
+    return _OPENED_INDEXES[index_path]
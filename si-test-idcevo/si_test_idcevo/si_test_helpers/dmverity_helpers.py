@@ -5,6 +5,7 @@ import re
 from mtee.testing.support.target_share import TargetShare
 from mtee.testing.tools import assert_false, assert_process_returncode, run_command
 from nose.tools import assert_in
+from si_test_idcevo.si_test_helpers.adb_shell_pool import ADBD_RESTART_COMMANDS, reset_adb_shell_pools
 
 logger = logging.getLogger(__name__)
 
@@ -128,6 +129,10 @@ def run_command_on_host(cmd, exp_result=None, timeout=60, shell=False):
     """
     result = run_command(cmd, timeout=timeout, shell=shell)
     logger.info("Execute command: %s, stdout: %s, stderr: %s" % (cmd, result.stdout, result.stderr))
+    adb_args = cmd.split() if isinstance(cmd, str) else cmd
+    if len(adb_args) > 1 and adb_args[0] == "adb" and adb_args[1] in ADBD_RESTART_COMMANDS:
+        # adbd was restarted, the persistent adb shell sessions are closed
+        reset_adb_shell_pools()
     if exp_result:
         if result.stdout:
             for expected in exp_result:
@@ -1,5 +1,6 @@
 # Copyright (C) 2023. BMW CTW PT. All rights reserved.
 
+import hashlib
 import logging
 import os
 import re
@@ -85,6 +86,34 @@ def verify_file_in_target_with_timeout(mtee_target, folder_path, folder_name_reg
     return None, None
 
 
+def get_path_digest(path, ignored_suffixes=()):
+    """Returns the sha256 of a file content, or of the relative names and content of the files of a directory
+
+    :param str path: path of the file or directory
+    :param tuple ignored_suffixes: suffixes of the directory files left out of the digest
+    :return str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for folder, folder_names, file_names in os.walk(path):
+            folder_names.sort()
+            for file_name in sorted(file_names):
+                if ignored_suffixes and file_name.endswith(tuple(ignored_suffixes)):
+                    continue
+                file_path = os.path.join(folder, file_name)
+                digest.update(os.path.relpath(file_path, path).encode() + b"\0")
+                _update_file_digest(digest, file_path)
+    else:
+        _update_file_digest(digest, path)
+    return digest.hexdigest()
+
+
+def _update_file_digest(digest, file_path):
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+
+
 def verify_file_in_host_with_timeout(filename, sleep_time=60, steps=2):
     """Check the file is inside host with TimeoutCondition
     :param str filename: filename to check in host
@@ -0,0 +1,296 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Screenshots pulled as raw framebuffers, encoded to PNG on the host in the background
+
+'screencap -p' compresses the multi-megapixel displays to PNG on the target, which costs target CPU on every
+screenshot and perturbs the performance tests. Without '-p', screencap streams the raw framebuffer, which is
+decoded on the host into an ImageHandle and returned right away, while a thread pool writes the PNG file.
+A frame identical to the previous one of the same display is not encoded again: the previous file is copied.
+
+The raw capture is enabled on the screenshot helpers with RAW_SCREENSHOT_CAPTURE=1.
+
+'capture_displays' captures several displays at the same time and checks in memory if they are black, only
+writing the black frames (and optionally the others, in the background):
+
+    captures = capture_displays(LIST_HUD_DISPLAY_ID, results_dir, file_suffix="_after_str")
+    black_displays = [capture.name for capture in captures.values() if capture.is_black]
+"""
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import subprocess
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from PIL import Image
+import numpy as np
+from si_test_idcevo.si_test_helpers.image_handle import ImageHandle
+
+logger = logging.getLogger(__name__)
+
+# Set RAW_SCREENSHOT_CAPTURE=1 to take the adb screenshots as raw framebuffers, encoded on the host
+RAW_SCREENSHOT_CAPTURE = int(os.getenv("RAW_SCREENSHOT_CAPTURE", "0"))
+SCREENSHOT_ENCODE_WORKERS = int(os.getenv("SCREENSHOT_ENCODE_WORKERS", "2"))
+SCREENCAP_TIMEOUT = 30  # seconds
+# Only one pixel every BLANK_CHECK_STRIDE rows and columns is checked first, the full frame is only checked when
+# all those pixels are black
+BLANK_CHECK_STRIDE = 8
+
+# Raw screencap output: width, height and pixel format (uint32, little endian). Since Android 9 the header also
+# has the color space (uint32). The pixels follow, 4 bytes each.
+SCREENCAP_RAW_HEADER = struct.Struct("<III")
+SCREENCAP_COLOR_SPACE_SIZE = 4
+SCREENCAP_BYTES_PER_PIXEL = 4
+# android.graphics.PixelFormat values of the 32 bits formats, with the index of the R, G and B channels
+SCREENCAP_PIXEL_FORMATS = {
+    1: (0, 1, 2),  # RGBA_8888
+    2: (0, 1, 2),  # RGBX_8888
+    5: (2, 1, 0),  # BGRA_8888
+}
+
+CapturedFrame = namedtuple("CapturedFrame", ["digest", "file_path"])
+# Capture of a display by 'capture_displays'. 'file_path' is None when the frame was not written.
+DisplayCapture = namedtuple("DisplayCapture", ["name", "display_id", "frame", "is_black", "file_path"])
+
+
+def _screencap_command(display_id=None, serial=None, png=False):
+    command = ["adb"] + (["-s", serial] if serial else []) + ["exec-out", "screencap"]
+    if png:
+        command.append("-p")
+    if display_id:
+        command += ["-d", str(display_id)]
+    return command
+
+
+def pull_raw_framebuffer(display_id=None, serial=None, timeout=SCREENCAP_TIMEOUT):
+    """Returns the raw framebuffer of an android display, as streamed by 'adb exec-out screencap'
+
+    :param display_id: physical display ID, defaults to the android default display
+    :param str serial: android serial of the device, ANDROID_SERIAL (or the only device) is used if None
+    :param int timeout: timeout (seconds) of the adb command
+    :return: bytes with the raw screencap output
+    """
+    command = _screencap_command(display_id, serial)
+    return subprocess.run(command, check=True, stdout=subprocess.PIPE, timeout=timeout).stdout
+
+
+def decode_raw_screencap(raw_screencap, name="screenshot"):
+    """Decodes the raw screencap output into an ImageHandle, without copying the pixels
+
+    :param bytes raw_screencap: output of 'screencap' without '-p'
+    :param str name: name of the returned image
+    :return: ImageHandle with the RGB channels of the framebuffer
+    :raises RuntimeError: if the output is not a raw framebuffer with a supported pixel format
+    """
+    if len(raw_screencap) < SCREENCAP_RAW_HEADER.size:
+        raise RuntimeError(f"Invalid raw screencap output with {len(raw_screencap)} bytes")
+    width, height, pixel_format = SCREENCAP_RAW_HEADER.unpack_from(raw_screencap)
+    pixels_size = width * height * SCREENCAP_BYTES_PER_PIXEL
+    header_size = len(raw_screencap) - pixels_size
+    if header_size not in (SCREENCAP_RAW_HEADER.size, SCREENCAP_RAW_HEADER.size + SCREENCAP_COLOR_SPACE_SIZE):
+        raise RuntimeError(f"Raw screencap output has {len(raw_screencap)} bytes, not a {width}x{height} frame")
+    if pixel_format not in SCREENCAP_PIXEL_FORMATS:
+        raise RuntimeError(f"Unsupported screencap pixel format: {pixel_format}")
+
+    pixels = np.frombuffer(raw_screencap, dtype=np.uint8, count=pixels_size, offset=header_size)
+    channels = list(SCREENCAP_PIXEL_FORMATS[pixel_format])
+    if channels == [0, 1, 2]:
+        array = pixels.reshape(height, width, SCREENCAP_BYTES_PER_PIXEL)[:, :, :3]
+    else:
+        array = pixels.reshape(height, width, SCREENCAP_BYTES_PER_PIXEL)[:, :, channels]
+    return ImageHandle(array, name=name)
+
+
+def pull_display_frame(display_id=None, name="screenshot", serial=None):
+    """Returns a frame of an android display as an ImageHandle, pulled as a raw framebuffer
+
+    Displays with a pixel format not supported by 'decode_raw_screencap' are pulled as PNG.
+    """
+    try:
+        return decode_raw_screencap(pull_raw_framebuffer(display_id, serial=serial), name=name)
+    except RuntimeError as error:
+        logger.debug(f"Raw capture of display '{display_id}' failed, pulling it as PNG: {error}")
+    command = _screencap_command(display_id, serial, png=True)
+    png = subprocess.run(command, check=True, stdout=subprocess.PIPE, timeout=SCREENCAP_TIMEOUT).stdout
+    with Image.open(BytesIO(png)) as image:
+        return ImageHandle(np.array(image.convert("RGB")), name=name)
+
+
+def is_black_frame(array, stride=BLANK_CHECK_STRIDE):
+    """Returns True if all the pixels of an image are black
+
+    Non black frames usually have content all over the display, so a strided view of the pixels (no copy) is
+    checked first. The full frame is only checked when the strided pixels are all black, so the result is exact.
+
+    :param array: (height, width, channels) uint8 array with the pixels
+    :param int stride: step between the rows and columns checked first
+    """
+    if array[::stride, ::stride].any():
+        return False
+    return not array.any()
+
+
+class FramebufferCapture(object):
+    """Raw framebuffer screenshots, with the PNG files written by a background thread pool"""
+
+    def __init__(self, workers=SCREENSHOT_ENCODE_WORKERS):
+        """
+        :param int workers: number of threads encoding the PNG files
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot_encoder")
+        self._lock = Lock()
+        self._last_frames = {}
+        self._pending_writes = {}
+
+    def capture(self, file_path, display_id=None, skip_identical=True, serial=None):
+        """Captures a display and returns the frame right away, while its PNG file is written in the background
+
+        :param file_path: path of the PNG file to write
+        :param display_id: physical display ID, defaults to the android default display
+        :param str serial: android serial of the device, ANDROID_SERIAL (or the only device) is used if None
+        :param bool skip_identical: don't encode the frame if it is identical to the previous frame of the display,
+            the file of the previous frame is copied instead
+        :return: ImageHandle of the frame. Its 'source_path' is the file where the frame is (being) written,
+            use 'wait_for_file' before reading it.
+        """
+        file_path = Path(file_path)
+        raw_screencap = pull_raw_framebuffer(display_id, serial=serial)
+        digest = hashlib.blake2b(raw_screencap, digest_size=16).hexdigest()
+        frame = decode_raw_screencap(raw_screencap, name=file_path.stem)
+
+        with self._lock:
+            previous_frame = self._last_frames.get((serial, display_id))
+            if skip_identical and previous_frame and previous_frame.digest == digest:
+                previous_path = previous_frame.file_path
+                # A pending file is reserved on disk, and removed if its write fails
+                if previous_path.exists():
+                    logger.info(f"Screenshot '{file_path}' is identical to '{previous_path}', copying it")
+                    file_path.touch()
+                    self._pending_writes[file_path] = self._executor.submit(
+                        self._copy_frame, self._pending_writes.get(previous_path), previous_path, file_path
+                    )
+                    return ImageHandle(frame.array, name=file_path.stem, source_path=file_path)
+
+            # Forget the files already written, only the failed ones are kept to report them
+            for written_path in [path for path, write in self._pending_writes.items() if self._is_written(write)]:
+                del self._pending_writes[written_path]
+            self._last_frames[(serial, display_id)] = CapturedFrame(digest, file_path)
+            self._submit_write(frame, file_path)
+        return ImageHandle(frame.array, name=file_path.stem, source_path=file_path)
+
+    def _submit_write(self, frame, file_path):
+        # Reserve the file name right away, so the next screenshots don't pick the same one
+        file_path.touch()
+        self._pending_writes[file_path] = self._executor.submit(self._write_frame, frame, file_path)
+
+    def write_in_background(self, frame, file_path):
+        """Writes a frame to a PNG file on the background thread pool, see 'wait_for_file' and 'flush'"""
+        with self._lock:
+            self._submit_write(frame, Path(file_path))
+
+    @staticmethod
+    def _is_written(pending_write):
+        return pending_write.done() and not pending_write.exception()
+
+    @staticmethod
+    def _write_frame(frame, file_path):
+        """Writes a frame to a temporary file renamed when complete, so no one reads a partial PNG
+
+        On failure, the temporary file and the empty file reserving the name are removed.
+        """
+        temporary_path = file_path.with_name(f".{file_path.name}.tmp")
+        try:
+            frame.save(temporary_path, format="PNG")
+            os.replace(temporary_path, file_path)
+        except Exception:
+            temporary_path.unlink(missing_ok=True)
+            file_path.unlink(missing_ok=True)
+            raise
+        logger.debug(f"Screenshot written to '{file_path}'")
+
+    @staticmethod
+    def _copy_frame(previous_write, previous_path, file_path):
+        """Copies the file of the previous frame to the file of an identical one, once the previous one is written
+
+        Not a hard link, so a test rewriting one of the screenshots doesn't change the other.
+
+        The previous write was submitted before, so it already runs (or ran) on the pool and this can't deadlock.
+        """
+        temporary_path = file_path.with_name(f".{file_path.name}.tmp")
+        try:
+            if previous_write:
+                previous_write.result()
+            shutil.copyfile(previous_path, temporary_path)
+            os.replace(temporary_path, file_path)
+        except Exception:
+            temporary_path.unlink(missing_ok=True)
+            file_path.unlink(missing_ok=True)
+            raise
+        logger.debug(f"Screenshot '{file_path}' copied from '{previous_path}'")
+
+    def wait_for_file(self, file_path):
+        """Waits for the PNG file of a captured frame to be written
+
+        :raises: the error raised while writing the file, if any
+        """
+        with self._lock:
+            pending_write = self._pending_writes.get(Path(file_path))
+        if pending_write:
+            pending_write.result()
+            with self._lock:
+                self._pending_writes.pop(Path(file_path), None)
+
+    def flush(self):
+        """Waits for all the pending PNG files to be written, logging the ones which failed"""
+        with self._lock:
+            pending_writes = dict(self._pending_writes)
+            self._pending_writes.clear()
+        for file_path, pending_write in pending_writes.items():
+            try:
+                pending_write.result()
+            except Exception as error:
+                logger.warning(f"Failed to write screenshot '{file_path}': {error}")
+
+
+framebuffer_capture = FramebufferCapture()
+
+
+def capture_displays(displays, results_dir, file_suffix="", persist_all=False, workers=None, serial=None):
+    """Captures several android displays at the same time and checks if each frame is black
+
+    The frames are checked in memory. The black frames are written right away, to be reported, the others only
+    with 'persist_all', in the background (see 'framebuffer_capture.flush').
+
+    :param dict displays: physical display ID of each display name, e.g. LIST_HUD_DISPLAY_ID
+    :param results_dir: folder where the frames are written, as "<display name><file_suffix>.png"
+    :param str file_suffix: suffix of the file names
+    :param bool persist_all: also write the frames which are not black
+    :param int workers: number of displays captured at the same time, all of them by default
+    :param str serial: android serial of the device, ANDROID_SERIAL (or the only device) is used if None
+    :return: dict with the DisplayCapture of each display name, in the order of 'displays'
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers or len(displays) or 1, thread_name_prefix="display_capture") as pool:
+        frames = {
+            name: pool.submit(pull_display_frame, display_id, name=f"{name}{file_suffix}", serial=serial)
+            for name, display_id in displays.items()
+        }
+
+    captures = {}
+    for name, display_id in displays.items():
+        frame = frames[name].result()
+        is_black = is_black_frame(frame.array)
+        file_path = Path(results_dir, f"{frame.name}.png")
+        if is_black:
+            logger.info(f"Display '{name}' is black, frame written to '{file_path}'")
+            frame.save(file_path, format="PNG")
+        elif persist_all:
+            framebuffer_capture.write_in_background(frame, file_path)
+        else:
+            file_path = None
+        captures[name] = DisplayCapture(name, display_id, frame, is_black, file_path)
+    return captures
@@ -1,14 +1,22 @@
 # Copyright (C) 2023. CTW PT. All rights reserved.
 
 import logging
+import re
 
+from collections import defaultdict
 from mtee.metric import MetricLogger
 from mtee.testing.support.target_share import TargetShare
+from mtee.testing.tools import TimeoutCondition
 
 target = TargetShare().target
 metric_logger = MetricLogger()
 logger = logging.getLogger(__name__)
 
+# Maximum time to wait from reboot until all KPIs are collected
+KPI_COLLECTION_GRACE_PERIOD = 120  # (seconds)
+# Time waited for new DLT messages on each collection poll
+KPI_COLLECTION_POLL_INTERVAL = 1  # (seconds)
+
 
 def get_target_branches_and_thresholds(desired_kpi_name, kpi_thresholds):
     """Get all branches configured in the respective kpi thresholds
@@ -44,9 +52,15 @@ def get_specific_kpi_threshold(desired_kpi_name, kpi_thresholds, desired_branch=
     return kpi_thresholds[desired_branch][desired_kpi_name]
 
 
-def process_kpi_value(kpi_value, config, csv_hanlder, kpi_thresholds):
-    """Process each KPI, logging it to ECU log and to a CSV file
-    inputs: KPI value, KPI name, KPI configuration parameters
+def record_kpi_value(kpi_value, config, csv_hanlder, kpi_thresholds):
+    """Writes a KPI to the CSV file and builds its MetricLogger payload, without publishing it
+
+    Shared by the live KPI tests and the offline KPI replay, so both produce the same CSV rows and payloads.
+    :param kpi_value: value of the KPI
+    :param dict config: KPI configuration, with at least its "metric" name
+    :param CSVHandler csv_hanlder: handler of the CSV file where the KPI is written
+    :param kpi_thresholds: Config Dict with the respective ECU thresholds. Check kpi_threshold_config.py
+    :return: dict with the MetricLogger payload of the KPI
     """
     # Add threshold in case it exists
     kpi_threshold_value = get_specific_kpi_threshold(config["metric"], kpi_thresholds)
@@ -55,23 +69,221 @@ def process_kpi_value(kpi_value, config, csv_hanlder, kpi_thresholds):
     if kpi_threshold_value != 0:
         # At this point, if a kpi_threshold_value exists, we need to check that this KPI threshold
         # is also configured for other branches of the target
-        target.options.target,
         branches_and_threshold = get_target_branches_and_thresholds(config["metric"], kpi_thresholds)
-        logger.debug(
-            f"KPI threshold values ('{config['metric']}') for each '{target.options.target}'"
-            f" branch: '{branches_and_threshold}'"
-        )
+        logger.debug(f"KPI threshold values ('{config['metric']}') for each branch: '{branches_and_threshold}'")
         if len(branches_and_threshold) != 0:
             for branch, threshold_value in branches_and_threshold.items():
                 metric_threshold[f"metric_threshold_{branch}"] = str(threshold_value)
 
-    metric_logger.publish(
-        {
-            "name": "generic_kpi",
-            "kpi_name": config["metric"],
-            "time_value": kpi_value,
-            **metric_threshold,
-        }
-    )
-
     csv_hanlder.csv_metric_logger(f"{config['metric']}", kpi_value, kpi_threshold_value)
+
+    return {
+        "name": "generic_kpi",
+        "kpi_name": config["metric"],
+        "time_value": kpi_value,
+        **metric_threshold,
+    }
+
+
+def process_kpi_value(kpi_value, config, csv_hanlder, kpi_thresholds):
+    """Process each KPI, logging it to ECU log and to a CSV file
+    inputs: KPI value, KPI name, KPI configuration parameters
+    """
+    logger.debug(f"Processing KPI '{config['metric']}' of target '{target.options.target}'")
+    metric_logger.publish(record_kpi_value(kpi_value, config, csv_hanlder, kpi_thresholds))
+
+
+class StreamingKPICollector(object):
+    """Extracts the KPIs of a DLT KPI config while the DLT messages arrive
+
+    The KPIs are indexed by (apid, ctid), so each message is only matched against the KPIs of its own filter.
+    Each KPI is extracted from its first matching message, and each multi marker KPI is computed as soon as both
+    of its markers are available. The collection stops as soon as every expected KPI is present.
+
+    Usage:
+        collector = StreamingKPICollector(GENERIC_DLT_KPI_CONFIG, GENERIC_MULTI_MARKERS_KPI_CONFIG)
+        with DLTContext(broker, filters=collector.dlt_filters) as trace:
+            target.reboot()
+            collector.collect(trace)
+    """
+
+    def __init__(self, kpi_config, multi_marker_kpi_config=None, on_kpi_collected=None):
+        """
+        :param dict kpi_config: KPIs to collect, with the format of GENERIC_DLT_KPI_CONFIG
+        :param dict multi_marker_kpi_config: multi marker KPIs, with the format of GENERIC_MULTI_MARKERS_KPI_CONFIG.
+            The multi marker KPIs whose markers are not on 'kpi_config' are dropped, they could never be computed
+        :param on_kpi_collected: optional callback called with (name, value, config) for each KPI when collected
+        """
+        self.kpi_config = kpi_config
+        self.multi_marker_kpi_config = {}
+        for name, config in (multi_marker_kpi_config or {}).items():
+            if config["kpi_1"] in kpi_config and config["kpi_2"] in kpi_config:
+                self.multi_marker_kpi_config[name] = config
+            else:
+                logger.warning(
+                    f"Skipping multi marker KPI '{name}', its markers '{config['kpi_1']}' and '{config['kpi_2']}' "
+                    "are not both on the KPI config"
+                )
+        self.on_kpi_collected = on_kpi_collected
+
+        self.kpis_by_filter = defaultdict(list)
+        for name, config in kpi_config.items():
+            self.kpis_by_filter[(config["apid"], config["ctid"])].append((name, config))
+
+        self.processed_kpis = {}  # {name_kpi: kpi_value, ...}
+        self.processed_multi_marker_kpis = {}  # {name_kpi: kpi_value, ...}
+
+    @property
+    def dlt_filters(self):
+        """List of (apid, ctid) filters to use on the DLTContext"""
+        return list(self.kpis_by_filter.keys())
+
+    @property
+    def kpi_filters(self):
+        """List of filters to use on DLTContext.wait_for_multi_filters"""
+        return [
+            {"apid": config["apid"], "ctid": config["ctid"], "payload_decoded": config["pattern"]}
+            for config in self.kpi_config.values()
+        ]
+
+    @property
+    def missing_kpis(self):
+        return [name for name in self.kpi_config if name not in self.processed_kpis]
+
+    @property
+    def missing_multi_marker_kpis(self):
+        return [name for name in self.multi_marker_kpi_config if name not in self.processed_multi_marker_kpis]
+
+    def is_complete(self):
+        """Returns True when every expected KPI and multi marker KPI was collected"""
+        return not self.missing_kpis and not self.missing_multi_marker_kpis
+
+    def _kpi_collected(self, name, kpi_value, config):
+        if self.on_kpi_collected:
+            self.on_kpi_collected(name, kpi_value, config)
+
+    def _process_multi_marker_kpis(self, kpi_name):
+        """Computes the multi marker KPIs which have 'kpi_name' as marker, if both markers are available"""
+        for name, config in self.multi_marker_kpi_config.items():
+            if name in self.processed_multi_marker_kpis or kpi_name not in (config["kpi_1"], config["kpi_2"]):
+                continue
+            if config["kpi_1"] in self.processed_kpis and config["kpi_2"] in self.processed_kpis:
+                tmsp_diff = self.processed_kpis[config["kpi_2"]] - self.processed_kpis[config["kpi_1"]]
+                self.processed_multi_marker_kpis[name] = tmsp_diff
+                self._kpi_collected(name, tmsp_diff, {"metric": config["metric"]})
+
+    def process_message(self, msg):
+        """Extracts the KPIs not collected yet from a DLT message
+
+        :param msg: DLT message
+        :return: list with the name of the KPIs collected from the message
+        """
+        collected = []
+        for name, config in self.kpis_by_filter.get((msg.apid, msg.ctid), []):
+            if name in self.processed_kpis:
+                # Only the first occurrence of each metric is to be processed
+                continue
+
+            match = config["pattern"].search(msg.payload_decoded)
+            if not match:
+                continue
+
+            if config["type"] == "msg_tmsp":
+                kpi_value = msg.tmsp
+            elif config["type"] == "regex_group":
+                kpi_value = float(match.group(1))
+            else:
+                continue
+
+            self.processed_kpis[name] = kpi_value
+            self._kpi_collected(name, kpi_value, config)
+            self._process_multi_marker_kpis(name)
+            collected.append(name)
+        return collected
+
+    def collect(self, trace, grace_period=KPI_COLLECTION_GRACE_PERIOD, poll_interval=KPI_COLLECTION_POLL_INTERVAL):
+        """Processes the DLT messages of 'trace' until all KPIs are collected or the grace period has passed
+
+        :param DLTContext trace: trace receiving the DLT messages, opened with the 'dlt_filters' of the collector
+        :param grace_period: maximum time to wait for all KPIs (seconds)
+        :param poll_interval: time to wait for new DLT messages on each poll (seconds)
+        :return: dict with the processed KPIs
+        """
+        timer = TimeoutCondition(grace_period)
+        while timer and not self.is_complete():
+            dlt_msgs = trace.wait_for_multi_filters(
+                filters=self.kpi_filters,
+                drop=True,
+                count=0,
+                timeout=poll_interval,
+            )
+            for msg in dlt_msgs:
+                self.process_message(msg)
+
+        if self.is_complete():
+            logger.info(f"All KPIs collected after {timer.time_elapsed:.1f} seconds")
+        else:
+            logger.info(f"KPIs still missing after {grace_period} seconds: {self.missing_kpis}")
+        return self.processed_kpis
+
+
+class BootMarkersKPICollector(object):
+    """Extracts the boot performance KPIs of the DLTBootchart markers (dlt_filter_idcevo.json)
+
+    Unlike StreamingKPICollector, the last occurrence of each marker is kept: the boot KPIs are printed once per
+    core, and the last ones to be printed ("Core 7") contain all the KPIs to collect.
+    """
+
+    def __init__(self, markers, apid="BOOT", ctid="PERF"):
+        """
+        :param list markers: markers of the DLT filter file, with "Name", "apid", "ctid" and "RegExp" keys
+        :param str apid: DLT APP_ID of the boot KPIs
+        :param str ctid: DLT CONTEXT_ID of the boot KPIs
+        """
+        self.apid = apid
+        self.ctid = ctid
+        self.kpi_filters = [
+            {
+                "apid": marker["apid"],
+                "ctid": marker["ctid"],
+                "payload_decoded": re.compile(marker["RegExp"]),
+                "name": marker["Name"].replace(" ", "_"),
+            }
+            for marker in markers
+            if marker["apid"] == apid and marker["ctid"] == ctid
+        ]
+        self.processed_kpis = {}  # {name_kpi: kpi_value, ...}
+
+    @property
+    def dlt_filters(self):
+        """List of (apid, ctid) filters to use on the DLTContext"""
+        return [(self.apid, self.ctid)]
+
+    @property
+    def missing_kpis(self):
+        return [kpi_filter["name"] for kpi_filter in self.kpi_filters if kpi_filter["name"] not in self.processed_kpis]
+
+    def is_complete(self):
+        """Always False, as a later message can still update the collected KPIs"""
+        return False
+
+    def process_message(self, msg):
+        """Extracts the KPIs of a DLT message, overwriting the ones collected from previous messages
+
+        :param msg: DLT message
+        :return: list with the name of the KPIs collected from the message
+        """
+        collected = []
+        if (msg.apid, msg.ctid) != (self.apid, self.ctid):
+            return collected
+        for kpi_filter in self.kpi_filters:
+            if match := kpi_filter["payload_decoded"].search(msg.payload_decoded):
+                if kpi_filter["name"]:
+                    self.processed_kpis[kpi_filter["name"]] = float(match.group(1))
+                    collected.append(kpi_filter["name"])
+        return collected
+
+    @property
+    def metric_payload(self):
+        """MetricLogger payload with all the collected boot KPIs"""
+        return {"name": "boot_kpis", **self.processed_kpis}
@@ -0,0 +1,388 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Offline replay of the DLT KPIs over recorded DLT files
+
+The KPIs of GENERIC_DLT_KPI_CONFIG, of the boot KPI markers and of custom_str_kpis.json are collected live, inside
+a DLTContext, while the target reboots. To evaluate a changed regex or threshold, the same collectors are replayed
+over recorded DLT files instead (the full trace, its chunks or the lifecycle splits). The files are read in a single
+streaming pass, split into lifecycles where the ECU timestamp restarts, and each lifecycle gets the same CSV rows
+and MetricLogger payloads as a live run, on its own 'lifecycle_<number>' folder:
+
+    python3 -m si_test_idcevo.si_test_helpers.kpi_replay generic <trace.dlt|folder> ... --target idcevo
+    python3 -m si_test_idcevo.si_test_helpers.kpi_replay boot <trace.dlt|folder> ... --markers dlt_filter_idcevo.json
+    python3 -m si_test_idcevo.si_test_helpers.kpi_replay str <trace.dlt|folder> ... --str-kpis custom_str_kpis.json
+
+Lifecycles are only detected on the messages matching the KPI filters, so a lifecycle without any of those
+messages is not reported. Use '--lifecycle-per-file' when the files are already split per lifecycle.
+"""
+import argparse
+import csv
+import gzip
+import importlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from dlt import dlt
+from si_test_idcevo.si_test_config.kpi_threshold_config import ECU_SPECIFIC_KPI
+from si_test_idcevo.si_test_helpers.csv_handlers import CSVHandler
+from si_test_idcevo.si_test_helpers.kpi_handlers import (
+    BootMarkersKPICollector,
+    StreamingKPICollector,
+    metric_logger,
+    record_kpi_value,
+)
+
+logger = logging.getLogger(__name__)
+
+DLT_FILE_EXTENSIONS = (".dlt", ".dlt.gz")
+KPI_REPLAY_SUMMARY_FILE = "kpi_replay_summary.json"
+METRIC_PAYLOADS_FILE = "metric_payloads.json"
+STR_KPIS_FILE_NAME = "str_kpis_results.csv"
+# An ECU timestamp lower than the highest one of the lifecycle by more than this starts a new lifecycle.
+# Messages are not always stored in order, so small steps back are expected within a lifecycle.
+LIFECYCLE_RESTART_TOLERANCE = 5  # (seconds)
+
+
+def find_dlt_files(paths):
+    """Returns the DLT files of a list of files and folders, searched recursively and sorted by path
+
+    :param list paths: paths of DLT files (.dlt or .dlt.gz) or of folders containing them
+    :return: list with the DLT file paths, in the order they should be replayed
+    """
+    dlt_files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            dlt_files.append(path)
+            continue
+        folder_files = []
+        for folder, _, file_names in os.walk(path):
+            folder_files += [os.path.join(folder, name) for name in file_names if name.endswith(DLT_FILE_EXTENSIONS)]
+        dlt_files += sorted(folder_files)
+    return dlt_files
+
+
+def _load_dlt_file(dlt_file, filters, temporary_dir):
+    """Returns the messages of a DLT file, decompressing it first when needed"""
+    if dlt_file.endswith(".gz"):
+        decompressed_file = os.path.join(temporary_dir, os.path.basename(dlt_file)[: -len(".gz")])
+        with gzip.open(dlt_file, "rb") as compressed_file, open(decompressed_file, "wb") as file:
+            shutil.copyfileobj(compressed_file, file)
+        dlt_file = decompressed_file
+    return dlt.load(dlt_file, filters=filters)
+
+
+def iter_lifecycle_messages(
+    dlt_files, filters=None, lifecycle_per_file=False, restart_tolerance=LIFECYCLE_RESTART_TOLERANCE
+):
+    """Yields the messages of recorded DLT files, with the number of the lifecycle they belong to
+
+    A new lifecycle starts when the ECU timestamp of a message drops below the highest one seen on the lifecycle
+    for the same ECU, i.e. when the ECU restarted.
+    :param list dlt_files: paths of the DLT files, in the order they were recorded
+    :param list filters: optional list of (apid, ctid) filters of the messages to read
+    :param bool lifecycle_per_file: start a new lifecycle on each file, instead of detecting the restarts
+    :param restart_tolerance: drop of the ECU timestamp (seconds) tolerated within a lifecycle
+    :return: generator of (lifecycle number, DLT message), with lifecycles numbered from 1
+    """
+    lifecycle = 0
+    highest_tmsps = {}
+    with tempfile.TemporaryDirectory(prefix="kpi_replay_") as temporary_dir:
+        for dlt_file in dlt_files:
+            logger.info(f"Replaying DLT file '{dlt_file}'")
+            if lifecycle_per_file:
+                lifecycle += 1
+            for msg in _load_dlt_file(dlt_file, filters, temporary_dir):
+                ecu_id = getattr(msg, "ecuid", None)
+                if not lifecycle_per_file:
+                    if not lifecycle or msg.tmsp < highest_tmsps.get(ecu_id, 0) - restart_tolerance:
+                        lifecycle += 1
+                        highest_tmsps.clear()
+                highest_tmsps[ecu_id] = max(msg.tmsp, highest_tmsps.get(ecu_id, 0))
+                yield lifecycle, msg
+
+
+def replay_kpis(dlt_files, dlt_filters, create_collector, repeat=False, **lifecycle_kwargs):
+    """Replays KPI collectors over recorded DLT files, in a single pass over the files
+
+    A new collector is created for each lifecycle. Once complete, the rest of the lifecycle is skipped or, with
+    'repeat', a new collector is created for the next cycle of the same lifecycle (e.g. the next STR cycle).
+    :param list dlt_files: paths of the DLT files, in the order they were recorded
+    :param list dlt_filters: (apid, ctid) filters of the messages needed by the collectors
+    :param create_collector: function called with (lifecycle, cycle) numbers, returning a new collector
+        (e.g. StreamingKPICollector)
+    :param bool repeat: collect the KPIs again after each complete collection of the same lifecycle
+    :param lifecycle_kwargs: extra arguments of 'iter_lifecycle_messages'
+    :return: generator of (lifecycle number, cycle number, collector), for each finished collection
+    """
+    current_lifecycle = None
+    collector = None
+    cycle = 0
+    lifecycle_done = False
+    for lifecycle, msg in iter_lifecycle_messages(dlt_files, dlt_filters, **lifecycle_kwargs):
+        if lifecycle != current_lifecycle:
+            if collector:
+                yield current_lifecycle, cycle, collector
+            current_lifecycle, collector, cycle, lifecycle_done = lifecycle, None, 0, False
+        if lifecycle_done:
+            continue
+        if not collector:
+            cycle += 1
+            collector = create_collector(lifecycle, cycle)
+
+        collector.process_message(msg)
+        if collector.is_complete():
+            yield lifecycle, cycle, collector
+            collector = None
+            lifecycle_done = not repeat
+    if collector:
+        yield current_lifecycle, cycle, collector
+
+
+def load_kpi_config(target, config_name="GENERIC_DLT_KPI_CONFIG"):
+    """Returns a KPI config of a target, as deployed to the tests as 'kpi_metrics_config.py'
+
+    :param str target: target name, e.g. "idcevo"
+    :param str config_name: name of the config on '<target>_kpi_metrics_config.py'
+    :return: tuple with the KPI config dict, the multi marker KPI config dict and the metrics file name
+    """
+    config_module = importlib.import_module(f"si_test_idcevo.si_test_config.{target}_kpi_metrics_config")
+    multi_marker_kpi_config = {}
+    if config_name == "GENERIC_DLT_KPI_CONFIG":
+        multi_marker_kpi_config = config_module.GENERIC_MULTI_MARKERS_KPI_CONFIG
+    return getattr(config_module, config_name), multi_marker_kpi_config, config_module.METRICS_FILE_NAME
+
+
+def load_str_kpi_config(str_kpis_file):
+    """Converts the STR KPIs of 'custom_str_kpis.json' to the format of GENERIC_DLT_KPI_CONFIG
+
+    :param str str_kpis_file: path of the STR KPIs json file
+    :return: dict with the KPI config, where the KPI names are also the metric names
+    """
+    with open(str_kpis_file) as file:
+        str_kpis = json.load(file)
+    return {
+        name: {
+            "pattern": re.compile(config["regex_pattern_payload"]),
+            "type": config["type"],
+            "metric": name,
+            "apid": config["apid_ctid"][0],
+            "ctid": config["apid_ctid"][1],
+        }
+        for name, config in str_kpis.items()
+    }
+
+
+def get_lifecycle_dir(output_dir, lifecycle, cycle=None):
+    """Returns the output folder of a lifecycle, or of one of its cycles"""
+    lifecycle_dir = os.path.join(output_dir, f"lifecycle_{lifecycle:03d}")
+    if cycle is not None:
+        lifecycle_dir = os.path.join(lifecycle_dir, f"cycle_{cycle:03d}")
+    os.makedirs(lifecycle_dir, exist_ok=True)
+    return lifecycle_dir
+
+
+def _write_metric_payloads(output_dir, metric_payloads, publish=False):
+    with open(os.path.join(output_dir, METRIC_PAYLOADS_FILE), "w") as file:
+        json.dump(metric_payloads, file, indent=4)
+    if publish:
+        for metric_payload in metric_payloads:
+            metric_logger.publish(metric_payload)
+
+
+def replay_generic_kpis(
+    dlt_files,
+    output_dir,
+    kpi_config,
+    multi_marker_kpi_config,
+    metrics_file_name,
+    kpi_thresholds,
+    publish=False,
+    **lifecycle_kwargs,
+):
+    """Replays StreamingKPICollector over recorded DLT files, as done live by generic_dlt_kpi_tests.py
+
+    :param list dlt_files: paths of the DLT files, in the order they were recorded
+    :param str output_dir: folder where the CSV file and MetricLogger payloads of each lifecycle are written
+    :param dict kpi_config: KPIs to collect, with the format of GENERIC_DLT_KPI_CONFIG
+    :param dict multi_marker_kpi_config: multi marker KPIs, with the format of GENERIC_MULTI_MARKERS_KPI_CONFIG
+    :param str metrics_file_name: name of the CSV file, e.g. 'generic_dlt_kpis.csv'
+    :param kpi_thresholds: Config Dict with the respective ECU thresholds. Check kpi_threshold_config.py
+    :param bool publish: also publish the payloads with the MetricLogger
+    :param lifecycle_kwargs: extra arguments of 'iter_lifecycle_messages'
+    :return: list with the summary of each lifecycle
+    """
+    metric_payloads = {}
+
+    def create_collector(lifecycle, cycle):
+        csv_handler = CSVHandler(metrics_file_name, get_lifecycle_dir(output_dir, lifecycle))
+        metric_payloads[lifecycle] = []
+        return StreamingKPICollector(
+            kpi_config,
+            multi_marker_kpi_config,
+            on_kpi_collected=lambda name, kpi_value, config: metric_payloads[lifecycle].append(
+                record_kpi_value(kpi_value, config, csv_handler, kpi_thresholds)
+            ),
+        )
+
+    summary = []
+    dlt_filters = StreamingKPICollector(kpi_config, multi_marker_kpi_config).dlt_filters
+    for lifecycle, _, collector in replay_kpis(dlt_files, dlt_filters, create_collector, **lifecycle_kwargs):
+        _write_metric_payloads(get_lifecycle_dir(output_dir, lifecycle), metric_payloads.pop(lifecycle), publish)
+        summary.append(
+            {
+                "lifecycle": lifecycle,
+                "kpis": collector.processed_kpis,
+                "multi_marker_kpis": collector.processed_multi_marker_kpis,
+                "missing_kpis": collector.missing_kpis,
+                "missing_multi_marker_kpis": collector.missing_multi_marker_kpis,
+            }
+        )
+    return summary
+
+
+def replay_boot_kpis(dlt_files, output_dir, markers, publish=False, **lifecycle_kwargs):
+    """Replays BootMarkersKPICollector over recorded DLT files, as done live by boot_kpis_tests.py
+
+    :param list dlt_files: paths of the DLT files, in the order they were recorded
+    :param str output_dir: folder where the MetricLogger payload of each lifecycle is written
+    :param list markers: markers of the DLT filter file (dlt_filter_idcevo.json)
+    :param bool publish: also publish the payloads with the MetricLogger
+    :param lifecycle_kwargs: extra arguments of 'iter_lifecycle_messages'
+    :return: list with the summary of each lifecycle
+    """
+    summary = []
+    dlt_filters = BootMarkersKPICollector(markers).dlt_filters
+
+    def create_collector(lifecycle, cycle):
+        return BootMarkersKPICollector(markers)
+
+    for lifecycle, _, collector in replay_kpis(dlt_files, dlt_filters, create_collector, **lifecycle_kwargs):
+        _write_metric_payloads(get_lifecycle_dir(output_dir, lifecycle), [collector.metric_payload], publish)
+        summary.append(
+            {"lifecycle": lifecycle, "kpis": collector.processed_kpis, "missing_kpis": collector.missing_kpis}
+        )
+    return summary
+
+
+def replay_str_kpis(dlt_files, output_dir, str_kpi_config, **lifecycle_kwargs):
+    """Replays the STR KPI markers over recorded DLT files, once per STR cycle
+
+    Each cycle ends when all its markers were found, so the markers of the following resume start a new cycle.
+    The raw marker timestamps of each cycle are written to its 'str_kpis_results.csv'. They are not published:
+    the resumed KPIs of 'generic_kpi_resumed' are computed from them with the 'formula_type' of each KPI, which
+    is not applied here.
+    :param list dlt_files: paths of the DLT files, in the order they were recorded
+    :param str output_dir: folder where the CSV file of each cycle is written
+    :param dict str_kpi_config: STR KPIs, see load_str_kpi_config
+    :param lifecycle_kwargs: extra arguments of 'iter_lifecycle_messages'
+    :return: list with the summary of each cycle
+    """
+    summary = []
+    dlt_filters = StreamingKPICollector(str_kpi_config).dlt_filters
+
+    def create_collector(lifecycle, cycle):
+        return StreamingKPICollector(str_kpi_config)
+
+    for lifecycle, cycle, collector in replay_kpis(
+        dlt_files, dlt_filters, create_collector, repeat=True, **lifecycle_kwargs
+    ):
+        cycle_dir = get_lifecycle_dir(output_dir, lifecycle, cycle)
+        with open(os.path.join(cycle_dir, STR_KPIS_FILE_NAME), "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["kpi", "value"])
+            writer.writerows(collector.processed_kpis.items())
+        summary.append(
+            {
+                "lifecycle": lifecycle,
+                "cycle": cycle,
+                "kpis": collector.processed_kpis,
+                "missing_kpis": collector.missing_kpis,
+            }
+        )
+    return summary
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description="Replay the DLT KPIs over recorded DLT files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument("dlt_paths", nargs="+", help="DLT files (.dlt or .dlt.gz) or folders with them")
+    common_parser.add_argument("--output-dir", default="kpi_replay", help="Directory for the per lifecycle outputs")
+    common_parser.add_argument(
+        "--lifecycle-per-file", action="store_true", help="Each DLT file is a lifecycle, e.g. lifecycle splits"
+    )
+    common_parser.add_argument(
+        "--restart-tolerance",
+        type=float,
+        default=LIFECYCLE_RESTART_TOLERANCE,
+        help="Drop of the ECU timestamp (seconds) tolerated within a lifecycle",
+    )
+
+    generic_parser = subparsers.add_parser("generic", parents=[common_parser], help="Replay generic DLT KPIs")
+    generic_parser.add_argument("--target", default="idcevo", help="Target of the KPI config and thresholds")
+    generic_parser.add_argument(
+        "--kpi-config", default="GENERIC_DLT_KPI_CONFIG", help="KPI config name, e.g. MULTIPLE_REBOOTS_DLT_KPI_CONFIG"
+    )
+    generic_parser.add_argument("--skip-kpi", action="append", default=[], help="KPI to skip, can be repeated")
+    generic_parser.add_argument("--publish", action="store_true", help="Also publish the payloads on MetricLogger")
+
+    boot_parser = subparsers.add_parser("boot", parents=[common_parser], help="Replay boot KPI markers")
+    boot_parser.add_argument("--markers", required=True, help="DLTBootchart filter file, dlt_filter_idcevo.json")
+    boot_parser.add_argument("--publish", action="store_true", help="Also publish the payloads on MetricLogger")
+
+    str_parser = subparsers.add_parser("str", parents=[common_parser], help="Replay STR KPI markers")
+    str_parser.add_argument("--str-kpis", required=True, help="STR KPIs file, custom_str_kpis.json")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    args = parse_arguments(sys.argv[1:] if args is None else args)
+
+    dlt_files = find_dlt_files(args.dlt_paths)
+    lifecycle_kwargs = {"lifecycle_per_file": args.lifecycle_per_file, "restart_tolerance": args.restart_tolerance}
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.command == "generic":
+        kpi_config, multi_marker_kpi_config, metrics_file_name = load_kpi_config(args.target, args.kpi_config)
+        kpi_config = {name: config for name, config in kpi_config.items() if name not in args.skip_kpi}
+        multi_marker_kpi_config = {
+            name: config
+            for name, config in multi_marker_kpi_config.items()
+            if name not in args.skip_kpi and config["kpi_1"] in kpi_config and config["kpi_2"] in kpi_config
+        }
+        kpi_thresholds = ECU_SPECIFIC_KPI.get(args.target, ECU_SPECIFIC_KPI["default_target"])
+        summary = replay_generic_kpis(
+            dlt_files,
+            args.output_dir,
+            kpi_config,
+            multi_marker_kpi_config,
+            metrics_file_name,
+            kpi_thresholds,
+            publish=args.publish,
+            **lifecycle_kwargs,
+        )
+    elif args.command == "boot":
+        with open(args.markers) as markers_file:
+            markers = json.load(markers_file)["config"]["markers"]
+        summary = replay_boot_kpis(dlt_files, args.output_dir, markers, publish=args.publish, **lifecycle_kwargs)
+    else:
+        str_kpi_config = load_str_kpi_config(args.str_kpis)
+        summary = replay_str_kpis(dlt_files, args.output_dir, str_kpi_config, **lifecycle_kwargs)
+
+    with open(os.path.join(args.output_dir, KPI_REPLAY_SUMMARY_FILE), "w") as summary_file:
+        json.dump(summary, summary_file, indent=4)
+    incomplete = [entry for entry in summary if entry["missing_kpis"] or entry.get("missing_multi_marker_kpis")]
+    logger.info(f"KPIs replayed over {len(summary)} lifecycles, {len(incomplete)} with missing KPIs")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
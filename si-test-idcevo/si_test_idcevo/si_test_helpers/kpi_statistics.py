@@ -0,0 +1,179 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Running statistics of KPIs collected over several reboots, and a sequential stop rule
+
+Instead of always performing the configured amount of reboots, the reboots can be stopped as soon as every KPI
+is known precisely enough: the confidence interval of its mean is tighter than a tolerance, or is clearly above
+or below its ECU_SPECIFIC_KPI threshold. Stable KPIs then need a few reboots, while noisy ones keep sampling up
+to their configured amount of reboots.
+
+    sampler = SequentialKPISampler(kpi_budgets, kpi_thresholds={"Kernel start": 0.45})
+    for reboot in range(1, max_reboots + 1):
+        ...
+        sampler.add_samples(processed_kpis)
+        if sampler.should_stop():
+            break
+    sampler.statistics()
+"""
+import logging
+import math
+import os
+
+from statistics import NormalDist, fmean, stdev
+
+logger = logging.getLogger(__name__)
+
+# Set KPI_ADAPTIVE_REBOOTS=1 to stop the multiple reboots KPI collection once all KPIs are known precisely enough
+KPI_ADAPTIVE_REBOOTS = int(os.getenv("KPI_ADAPTIVE_REBOOTS", "0"))
+# Maximum half width of the confidence interval, relative to the mean, for a KPI to be considered known
+KPI_CI_TOLERANCE = float(os.getenv("KPI_CI_TOLERANCE", "0.05"))
+KPI_CI_CONFIDENCE = float(os.getenv("KPI_CI_CONFIDENCE", "0.95"))
+# Minimum samples of a KPI before it can stop being sampled, the interval of very few samples isn't reliable.
+# At least 2 samples are needed to estimate the interval.
+KPI_MIN_SAMPLES = max(int(os.getenv("KPI_MIN_SAMPLES", "5")), 2)
+
+KPI_STATUS_SAMPLING = "sampling"
+KPI_STATUS_CONVERGED = "converged"
+KPI_STATUS_ABOVE_THRESHOLD = "above_threshold"
+KPI_STATUS_BELOW_THRESHOLD = "below_threshold"
+KPI_STATUS_BUDGET_REACHED = "budget_reached"
+
+
+def student_t_quantile(probability, degrees_of_freedom):
+    """Returns the quantile of the Student's t distribution, using the Cornish-Fisher expansion
+
+    Accurate to about 1% from 3 degrees of freedom on, which is enough to size confidence intervals.
+    """
+    z = NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    return (
+        z
+        + (z**3 + z) / (4 * v)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+    )
+
+
+def percentile(sorted_values, percent):
+    """Returns a percentile of sorted values, interpolated linearly (same as numpy.percentile)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * percent / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class KPISamples(object):
+    """Values of a KPI collected over several reboots"""
+
+    def __init__(self, confidence=KPI_CI_CONFIDENCE):
+        """
+        :param float confidence: confidence level of the interval of the mean, e.g. 0.95
+        """
+        self.confidence = confidence
+        self.values = []
+
+    def add(self, value):
+        self.values.append(value)
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return fmean(self.values) if self.values else None
+
+    def confidence_interval(self):
+        """Returns the (low, high) confidence interval of the mean, or None with less than 2 values"""
+        if self.count < 2:
+            return None
+        quantile = student_t_quantile((1 + self.confidence) / 2, self.count - 1)
+        half_width = quantile * stdev(self.values) / math.sqrt(self.count)
+        return self.mean - half_width, self.mean + half_width
+
+    def to_dict(self):
+        """Returns the statistics of the KPI, as written to the reports and published on MetricLogger"""
+        sorted_values = sorted(self.values)
+        interval = self.confidence_interval()
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": percentile(sorted_values, 50),
+            "p90": percentile(sorted_values, 90),
+            "p99": percentile(sorted_values, 99),
+            "ci_low": interval[0] if interval else None,
+            "ci_high": interval[1] if interval else None,
+            "confidence": self.confidence,
+        }
+
+
+class SequentialKPISampler(object):
+    """Decides, after each reboot, if more samples are needed for any KPI"""
+
+    def __init__(
+        self,
+        kpi_budgets,
+        kpi_thresholds=None,
+        tolerance=KPI_CI_TOLERANCE,
+        confidence=KPI_CI_CONFIDENCE,
+        min_samples=KPI_MIN_SAMPLES,
+    ):
+        """
+        :param dict kpi_budgets: maximum amount of reboots of each KPI, e.g. the "reboots" of
+            MULTIPLE_REBOOTS_DLT_KPI_CONFIG
+        :param dict kpi_thresholds: threshold of each KPI. KPIs without threshold (or with 0) only stop on tolerance.
+        :param float tolerance: maximum half width of the confidence interval, relative to the mean
+        :param float confidence: confidence level of the intervals, e.g. 0.95
+        :param int min_samples: minimum samples of a KPI before it can stop being sampled
+        """
+        self.kpi_budgets = {name: int(budget) for name, budget in kpi_budgets.items()}
+        self.kpi_thresholds = kpi_thresholds or {}
+        self.tolerance = tolerance
+        self.min_samples = min_samples
+        self.reboots = 0
+        self.samples = {name: KPISamples(confidence) for name in kpi_budgets}
+
+    def add_samples(self, processed_kpis):
+        """Adds the KPIs collected on a reboot
+
+        :param dict processed_kpis: {kpi_name: kpi_value} collected on the reboot, missing KPIs are not sampled
+        """
+        self.reboots += 1
+        for name, value in processed_kpis.items():
+            if name in self.samples:
+                self.samples[name].add(value)
+
+    def kpi_status(self, name):
+        """Returns the sampling status of a KPI, one of the KPI_STATUS_* values"""
+        samples = self.samples[name]
+        if self.reboots >= self.kpi_budgets[name]:
+            return KPI_STATUS_BUDGET_REACHED
+        if samples.count < self.min_samples:
+            return KPI_STATUS_SAMPLING
+
+        low, high = samples.confidence_interval()
+        threshold = self.kpi_thresholds.get(name)
+        if threshold:
+            if low > threshold:
+                return KPI_STATUS_ABOVE_THRESHOLD
+            if high < threshold:
+                return KPI_STATUS_BELOW_THRESHOLD
+        if (high - low) / 2 <= self.tolerance * abs(samples.mean):
+            return KPI_STATUS_CONVERGED
+        return KPI_STATUS_SAMPLING
+
+    def should_stop(self):
+        """Returns True when no KPI needs more samples"""
+        pending_kpis = [name for name in self.samples if self.kpi_status(name) == KPI_STATUS_SAMPLING]
+        if pending_kpis:
+            logger.debug(f"KPIs still sampling after {self.reboots} reboots: {pending_kpis}")
+            return False
+        logger.info(f"All KPIs known precisely enough after {self.reboots} reboots")
+        return True
+
+    def statistics(self):
+        """Returns the statistics and the sampling status of each KPI"""
+        return {
+            name: {**samples.to_dict(), "status": self.kpi_status(name), "threshold": self.kpi_thresholds.get(name)}
+            for name, samples in self.samples.items()
+        }
@@ -0,0 +1,39 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Parallel processing of independent per-lifecycle items (DLT csv files, lifecycle folders, ...)
+
+Kept free of the DLT dependencies, so generic helpers like CSVHandler can use it.
+
+    results = map_lifecycles(scan_function, csv_files, workers=4)
+"""
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes used to scan the lifecycles in parallel. Parallel scanning is opt-in,
+# by default (0 or 1) the lifecycles are scanned sequentially in the current process.
+DLT_SCAN_WORKERS = int(os.getenv("DLT_SCAN_WORKERS", "0"))
+
+
+def map_lifecycles(function, items, workers=None):
+    """Applies 'function' to a list of independent per-lifecycle items
+
+    When more than one worker is requested, the items are sharded across a ProcessPoolExecutor.
+    The results are always returned in the same order as 'items', so merging them gives the same
+    output as the serial path. 'function' must be a module level function, so it can be pickled.
+
+    :param function: function to apply to each item
+    :param list items: list of items, usually one per lifecycle
+    :param int workers: number of worker processes, defaults to DLT_SCAN_WORKERS
+    :return: list with the result of each item
+    """
+    workers = DLT_SCAN_WORKERS if workers is None else workers
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+
+    workers = min(workers, len(items))
+    logger.info(f"Scanning {len(items)} lifecycles with {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
@@ -3,6 +3,7 @@ import os
 import tarfile
 
 from mtee.testing.tools import assert_false, assert_true
+from si_test_idcevo.si_test_helpers.remote_probe import RemoteProbe
 
 
 class LinuxCommandsHandler(object):
@@ -16,7 +17,7 @@ class LinuxCommandsHandler(object):
     def search_features_in_kernel_configuration(self, features_list: list) -> list:
         """
         Search for specific features in a kernel configuration file.
-        The following linux command will be executed for each pattern:
+        The following linux command will be executed for each pattern, all in a single RemoteProbe call:
         e.g: "zcat /proc/config.gz | grep -q <pattern>"
 
         :param features_list: features list to be search in kernel config file.
@@ -28,10 +29,14 @@ class LinuxCommandsHandler(object):
         return_list = []
 
         self.logger.info(f"Checking list: {features_list}")
+        probe = RemoteProbe(self.target)
+        for feature in dict.fromkeys(features_list):
+            probe.add_command(feature, f'zcat /proc/config.gz | grep -q "{feature}"')
+        probe_results = probe.run()
+
         for feature in features_list:
-            return_stdout, _, return_code = self.target.execute_command(f'zcat /proc/config.gz | grep -q "{feature}"')
-            self.logger.debug(f"return_stdout: {return_stdout} for pattern: {feature}")
-            if return_code != 0:
+            self.logger.debug(f"return_stdout: {probe_results[feature].stdout} for pattern: {feature}")
+            if probe_results[feature].returncode != 0:
                 return_list.append(feature)
 
         return return_list
@@ -0,0 +1,111 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Pool of OCR workers, to recognize several regions and page segmentation modes concurrently"""
+import hashlib
+import logging
+import os
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mtee.testing.tools import OcrMode, image_to_text
+from si_test_idcevo.si_test_helpers.image_handle import ImageHandle
+
+logger = logging.getLogger(__name__)
+
+# Number of OCR jobs run at the same time, each one on its own tesseract process
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# Number of OCR results kept, to answer identical jobs (same pixels, language, mode and options) without OCR
+OCR_RESULT_CACHE_SIZE = 512
+
+
+class OcrService(object):
+    """Pool of OCR workers, each job runs on its own tesseract process
+
+    Jobs are submitted one by one ('submit') or in batches ('submit_batch') and their text is returned as
+    futures. Identical jobs, i.e. the same pixels recognized with the same language, mode and options, are
+    only recognized once: they share the future of the first one.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, cache_size=OCR_RESULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr_worker")
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, image, region=None, lang="eng", pagesegmode=OcrMode.PAGE_SEGMENTATION_WITHOUT_OSD, **options):
+        """Submits an OCR job
+
+        :param image: Path of the image file, or its ImageHandle.
+        :param region: Optional box (left, upper, right, lower) to recognize, cropped in memory.
+        :param lang: Language which tesseract should consider when extracting the text.
+        :param pagesegmode: Page segmentation mode to control layout analysis.
+        :param options: Extra image_to_text options (brightness, contrast, monochrome, invert, resize_height
+            and resize_width).
+        :return: Future with the extracted text.
+        """
+        if region or isinstance(image, ImageHandle):
+            image = ImageHandle.open(image)
+            if region:
+                image = image.crop(region)
+                image.save_artifact()
+            content_digest = hashlib.blake2b(image.array.tobytes(), digest_size=16)
+            content_digest.update(repr(image.array.shape).encode())
+        else:
+            if not os.path.exists(image) or os.stat(image).st_size == 0:
+                raise RuntimeError(f"Image file size is 0 or file not found at: {image}")
+            content_digest = hashlib.blake2b(Path(image).read_bytes(), digest_size=16)
+
+        key = (content_digest.hexdigest(), lang, pagesegmode, tuple(sorted(options.items())))
+        with self._lock:
+            if key in self._results and not self._is_failed(self._results[key]):
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+            future = self._executor.submit(self._recognize, image, lang, pagesegmode, options)
+            self._results[key] = future
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return future
+
+    def submit_batch(self, jobs):
+        """Submits several OCR jobs at once, e.g. all the regions and page segmentation modes of a check
+
+        :param jobs: List of dicts with the 'submit' arguments, e.g. {"image": path, "region": box, "pagesegmode": 7}.
+        :return: List with a future per job, in the same order as the jobs.
+        """
+        # Decode each image file only once for all its regions
+        images = {}
+        futures = []
+        for job in jobs:
+            job = dict(job)
+            if job.get("region") and not isinstance(job["image"], ImageHandle):
+                if job["image"] not in images:
+                    images[job["image"]] = ImageHandle.open(job["image"])
+                job["image"] = images[job["image"]]
+            futures.append(self.submit(**job))
+        return futures
+
+    @staticmethod
+    def _is_failed(future):
+        return future.cancelled() or (future.done() and future.exception() is not None)
+
+    @staticmethod
+    def _recognize(image, lang, pagesegmode, options):
+        if isinstance(image, ImageHandle):
+            # The OCR engine only reads files, so the image is handed to it through an uncompressed temporary file
+            with image.temporary_file() as image_path:
+                return image_to_text(image_path, lang=lang, pagesegmode=pagesegmode, **options)
+        return image_to_text(image, lang=lang, pagesegmode=pagesegmode, **options)
+
+    def clear(self):
+        """Removes all the OCR results kept"""
+        with self._lock:
+            self._results.clear()
+
+
+ocr_service = OcrService()
@@ -12,7 +12,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.support.wait import WebDriverWait
 from si_test_idcevo import APPIUM_ELEMENT_TIMEOUT
-from si_test_idcevo.si_test_helpers.screenshot_utils import crop_image
+from si_test_idcevo.si_test_helpers.adb_shell_pool import execute_adb_shell_command
+from si_test_idcevo.si_test_helpers.image_handle import ImageHandle
 
 # Declaring Element namedtuple() to be used on Page selectors
 Element = namedtuple("Element", ["strategy", "selector"])
@@ -282,8 +283,8 @@ class BasePage:
         """Validate if expected list of activities are running (currently resumed/ in foreground)"""
         # Verify through adb if Launcher is running
         list_activities = list_activities if list_activities else [cls.get_activity_name()]
-        dumpsys_activities = cls.apinext_target.execute_command(
-            ["dumpsys activity activities | grep -E 'ResumedActivity'"]
+        dumpsys_activities = execute_adb_shell_command(
+            cls.apinext_target, ["dumpsys activity activities | grep -E 'ResumedActivity'"]
         )
         logger.info(f"Found the following activities: '{dumpsys_activities}', expected: '{list_activities}'")
         return any(str(activity) in dumpsys_activities for activity in list_activities)
@@ -339,23 +340,12 @@ class BasePage:
             True if background changed between the screenshots
             False if background did not change between the screenshots
         """
-        path_to_cropped_images = os.path.join(os.path.dirname(screenshot_before), "cropped_images")
-        os.makedirs(path_to_cropped_images, exist_ok=True)
-
-        before_filename = os.path.basename(screenshot_before)
-        after_filename = os.path.basename(screenshot_after)
+        # Only the cropped regions are kept in the cache, each screenshot is decoded at most once per session
+        background_before = ImageHandle.open_cached(screenshot_before, region=region)
+        background_after = ImageHandle.open_cached(screenshot_after, region=region)
 
-        before_filename_with_cropped = (
-            os.path.splitext(before_filename)[0] + "_cropped" + os.path.splitext(before_filename)[1]
-        )
-        after_filename_with_cropped = (
-            os.path.splitext(after_filename)[0] + "_cropped" + os.path.splitext(after_filename)[1]
-        )
-
-        background_before = os.path.join(path_to_cropped_images, before_filename_with_cropped)
-        background_after = os.path.join(path_to_cropped_images, after_filename_with_cropped)
-
-        crop_image(screenshot_before, region, background_before)
-        crop_image(screenshot_after, region, background_after)
+        path_to_cropped_images = os.path.join(os.path.dirname(screenshot_before), "cropped_images")
+        cropped_before = background_before.save(os.path.join(path_to_cropped_images, f"{background_before.name}.png"))
+        cropped_after = background_after.save(os.path.join(path_to_cropped_images, f"{background_after.name}.png"))
 
-        return not compare_images(background_after, background_before, concat=True, acceptable_fuzz_percent=5)
+        return not compare_images(cropped_after, cropped_before, concat=True, acceptable_fuzz_percent=5)
@@ -1,5 +1,7 @@
 # Copyright (C) 2023. BMW CTW PT. All rights reserved.
 import glob
+import hashlib
+import json
 import logging
 import lxml.etree as ET  # noqa: N812
 import os  # noqa: AZ100
@@ -12,10 +14,16 @@ from esys import EsysError
 from mtee.testing.test_environment import TEST_ENVIRONMENT as TE
 from mtee.testing.tools import assert_false, assert_process_returncode, assert_true, run_command
 from mtee_idcevo.pre_test_validator import PreTestVerification
-from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
+from si_test_idcevo.si_test_helpers.file_path_helpers import get_path_digest
+from si_test_idcevo.si_test_helpers.readiness_waits import APPLICATION_TARGET_REACHED, get_dlt_broker, wait_until
+from si_test_idcevo.si_test_helpers.reboot_handlers import (
+    is_application_mode as is_target_in_application_mode,
+    wait_for_application_target,
+)
+from si_test_idcevo.si_test_helpers.target_facts_cache import invalidate_target_facts
 from tee.target_common import VehicleCondition
+from tee.tools.diagnosis import DiagClient
 from tee.tools.secure_modes import SecureECUMode
-from validation_utils.utils import TimeoutCondition
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +52,15 @@ MANDATORY_SWES_B506 = ["0000BBBA"]
 
 CERTIFICATE = "/opt/esysdata/persistency_backup/Esys_NCD_key.p12"
 
+# Generated TALs are cached by the content of their inputs, set TAL_CACHE=0 to always run esys-commander.
+# By default the cache is stored on the esys data folder.
+TAL_CACHE = int(os.getenv("TAL_CACHE", "1"))
+TAL_CACHE_DIR = os.getenv("TAL_CACHE_DIR")
+TAL_CACHE_FOLDER_NAME = "TAL_cache"
+
+# Digests of the PDX containers already hashed: {(path, size, mtime): digest}
+_pdx_digests = {}
+
 
 def process_svk(svk, logger):
     """Parses SVK and returns a dict with SVK content
@@ -107,6 +124,7 @@ def perform_uds_pdx_flash(test_result_dir, vin, generation, vehicle_order, targe
         assert_process_returncode(0, result, "PDX flash failed. See logs for details.")
         logger.info("Full PDX flash is finished.")
     finally:
+        invalidate_target_facts(vin)
         # remove PSDZdata folder from results
         result = run_command(["rm", "-rf", os.path.join(test_result_dir, "psdzdata")])
         logger.debug("Cleanup psdz data results: %s", result)
@@ -185,14 +203,93 @@ def perform_mirror_pdx_flash(
         assert_process_returncode(0, result, "PDX flash failed. See logs for details.")
         logger.info("Full PDX flash via mirror protocol is finished.")
     finally:
+        invalidate_target_facts(vin)
         # remove PSDZdata folder from results
         result = run_command(["rm", "-rf", os.path.join(test_result_dir, "psdzdata")])
         logger.debug("Cleanup psdz data results: %s", result)
 
 
+def _get_pdx_digest(pdx_path):
+    """Returns the digest of a PDX container, only hashed again if its size or modification time changed"""
+    stat = os.stat(pdx_path)
+    key = (os.path.realpath(pdx_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _pdx_digests:
+        _pdx_digests[key] = get_path_digest(pdx_path)
+    return _pdx_digests[key]
+
+
+def get_tal_cache_key(target, pdx_path, svk_file_path, tal_filter_path=None):
+    """Returns the cache key of a TAL: the digest of the files and target options it is generated from
+
+    esys-commander reads the SVT-IST from the target, so the SVK currently installed on the target is part of the
+    key too: a TAL generated before flashing or coding the target is not used afterwards.
+
+    :param target (TargetShare): mtee_target
+    :param pdx_path (Path, str): Path to pdx container
+    :param svk_file_path (Path, str): Path to svk file
+    :param tal_filter_path (Path, str): Path to TAL filter if applicable, defaults to None
+    :return: sha256 hex digest
+    """
+    current_svk = DiagClient(target.diagnostic_address, target.ecu_diagnostic_id).read_svk()
+    esys_commander = shutil.which("esys-commander")
+    esys_properties = target.options.esys_properties
+    direct_connection = not target.has_capability(TE.test_bench.rack)
+    tal_inputs = {
+        "pdx": _get_pdx_digest(pdx_path),
+        "svk": get_path_digest(svk_file_path),
+        "current_svk": hashlib.sha256(str(current_svk).upper().encode()).hexdigest(),
+        "tal_filter": get_path_digest(tal_filter_path) if tal_filter_path else None,
+        # Another esys-commander version may generate another TAL
+        "esys_commander": get_path_digest(esys_commander) if esys_commander else None,
+        "esys_properties": get_path_digest(esys_properties) if os.path.isfile(esys_properties) else None,
+        "target_type": target.options.target_type,
+        "vehicle_type": target.options.vehicle_type,
+        "vin": target.options.vin,
+        "diag_address": str(target.ecu_diagnostic_id),
+        "generation": getattr(target, "generation", None),
+        "istep_shipment": getattr(target, "_coding_istep_shipment", None),
+        # Same connection and certificate options as the esys-commander command of generate_tal
+        "gateway_ip": target._oabr_ipv4 if direct_connection else None,
+        "certificate": get_path_digest(CERTIFICATE) if Path(CERTIFICATE).exists() else None,
+    }
+    return hashlib.sha256(json.dumps(tal_inputs, sort_keys=True).encode()).hexdigest()
+
+
+def get_tal_cache_dir(target):
+    return TAL_CACHE_DIR or os.path.join(target.options.esys_data_dir, TAL_CACHE_FOLDER_NAME)
+
+
+def get_cached_tal(cache_dir, cache_key):
+    """Returns the path of the cached TAL of a cache key, or None if it isn't cached"""
+    cached_tal_files = glob.glob(os.path.join(cache_dir, cache_key, "TAL*.xml"))
+    return cached_tal_files[0] if cached_tal_files else None
+
+
+def store_tal_in_cache(cache_dir, cache_key, tal_file_path):
+    """Copies a generated TAL to the cache, the cache entry only appears once the TAL is fully copied
+
+    :return: Path to the cached TAL file
+    """
+    entry_dir = os.path.join(cache_dir, cache_key)
+    temporary_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(temporary_dir, ignore_errors=True)
+    os.makedirs(temporary_dir)
+    shutil.copy(tal_file_path, temporary_dir)
+    try:
+        os.replace(temporary_dir, entry_dir)
+    except OSError:
+        # Already cached by another run meanwhile
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+    return get_cached_tal(cache_dir, cache_key)
+
+
 def generate_tal(target, tal_filter_path=None, timeout=360, tal_log_dir=None, pdx_path=None, svk_file_path=None):
     """Generate TAL file using esys-comander
 
+    The generated TALs are cached by the content of the PDX, SVK and TAL filter, by the SVK installed on the target
+    and by the target options used to generate them. When the same TAL was already generated, the cached TAL is
+    copied to the esys log folder without running esys. If the installed SVK can't be read, the TAL is generated.
+
     :param target (TargetShare): mtee_target
     :param tal_filter_path (Path, str): Path to TAL filter if applicable, defaults to None
     :param timeout (int): Timeout for TAL generation command, defaults to 360
@@ -223,6 +320,22 @@ def generate_tal(target, tal_filter_path=None, timeout=360, tal_log_dir=None, pd
     # Store all files in the esys log folder
     shutil.copy(svk_file_path, esys_log_folder)
 
+    tal_cache_key = None
+    if TAL_CACHE:
+        tal_cache_dir = get_tal_cache_dir(target)
+        try:
+            tal_cache_key = get_tal_cache_key(target, pdx_path, svk_file_path, tal_filter_path)
+        except Exception as error:
+            logger.warning(f"Could not compute the TAL cache key, generating the TAL without cache: {error}")
+    if tal_cache_key:
+        cached_tal_file_path = get_cached_tal(tal_cache_dir, tal_cache_key)
+        if cached_tal_file_path:
+            logger.info(f"TAL cache hit, using the TAL generated before: {cached_tal_file_path}")
+            if tal_filter_path:
+                shutil.copy(tal_filter_path, os.path.join(esys_log_folder, "backup_tal_filter.xml"))
+            return shutil.copy(cached_tal_file_path, esys_log_folder)
+        logger.info(f"TAL cache miss for key {tal_cache_key}, generating the TAL")
+
     generate_tal_command = [
         "esys-commander",
         "--svt-path",
@@ -284,18 +397,25 @@ def generate_tal(target, tal_filter_path=None, timeout=360, tal_log_dir=None, pd
     except Exception:
         raise AssertionError("Can't found generated TAL file in :{}.".format(os.path.join(esys_log_folder)))
 
+    if tal_cache_key:
+        try:
+            logger.debug(
+                f"TAL file cached: {store_tal_in_cache(tal_cache_dir, tal_cache_key, generated_tal_file_path)}"
+            )
+        except OSError as error:
+            logger.warning(f"Could not store the TAL file on the cache '{tal_cache_dir}': {error}")
+
     return generated_tal_file_path
 
 
 def is_application_mode(test, timeout):
-    command = ["systemctl", "is-active", "application.target"]
-    timer = TimeoutCondition(timeout)
-    while timer:
-        return_stdout, _, return_code = test.mtee_target.execute_command(command)
-        if return_code == 0 and return_stdout == "active":
-            return True
-    else:
-        return False
+    return wait_until(
+        lambda: is_target_in_application_mode(test.mtee_target),
+        timeout,
+        name="application_target_after_flashing",
+        dlt_broker=get_dlt_broker(test.mtee_target),
+        marker=APPLICATION_TARGET_REACHED,
+    )
 
 
 def pdx_teardown(test, pdx_utils, test_name="default"):
@@ -0,0 +1,145 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Readiness waits woken up by DLT markers, with adaptive backoff polling
+
+Waiting for a target state (e.g. application.target active) used to be a loop running a remote command every
+few seconds, adding up to a full poll interval of latency to every wait. 'wait_until' checks the state right
+away and then waits for the DLT marker announcing the state change (e.g. the NSC/COCO unit result of
+application.target), checking the state again as soon as the marker arrives. While no marker arrives, and when
+no DLT broker is available, the state is polled with an increasing interval, so short waits stay short and long
+waits don't flood the target with commands.
+
+The time each wait took is published on MetricLogger as "readiness_wait", to follow the time-to-ready.
+"""
+import logging
+import re
+import time
+
+from collections import namedtuple
+from contextlib import nullcontext
+from mtee.metric import MetricLogger
+from mtee.testing.connectors.connector_dlt import DLTContext
+from validation_utils.utils import TimeoutCondition
+
+logger = logging.getLogger(__name__)
+metric_logger = MetricLogger()
+
+# DLT messages announcing a state change: (apid, ctid) filters and payload regex
+DLTMarker = namedtuple("DLTMarker", ["filters", "pattern"])
+
+APPLICATION_TARGET_REACHED = DLTMarker(
+    filters=[("NSC", "COCO")], pattern=r"unitResult <unit,result>: application\.target , done"
+)
+APPLICATION_TARGET_LEFT = DLTMarker(
+    filters=[("NSG", "LCMG"), ("NSG", "NSG"), ("NSC", "COCO")],
+    pattern=(
+        r".*NodeState: NsmNodeState_Shutdown.*|Going to suspend to ram.*|Start for unit.*suspend\.target|"
+        r"Start for unit.*shutdown\.target"
+    ),
+)
+
+# Adaptive polling intervals (seconds): the first check is done right away, then the interval grows up to
+# the maximum. With a DLT marker the maximum is longer, as the marker wakes up the wait on the state change.
+POLL_INITIAL_INTERVAL = 0.5
+POLL_MAX_INTERVAL = 5
+POLL_MAX_INTERVAL_WITH_MARKER = 10
+POLL_BACKOFF_FACTOR = 2
+
+
+def get_dlt_broker(mtee_target):
+    """Returns the DLT broker of the target, or None if the target has no DLT connection"""
+    try:
+        return mtee_target.connectors.dlt.broker
+    except AttributeError:
+        return None
+
+
+def _wait_for_marker(trace, marker, timeout):
+    """Waits up to 'timeout' for a message matching the marker, returns True if one arrived"""
+    dlt_msgs = trace.wait_for(
+        attrs=dict(payload_decoded=re.compile(marker.pattern)),
+        count=1,
+        drop=True,
+        timeout=timeout,
+        raise_on_timeout=False,
+    )
+    return bool(dlt_msgs)
+
+
+def wait_until(
+    condition,
+    timeout,
+    name="readiness",
+    dlt_broker=None,
+    marker=None,
+    initial_interval=POLL_INITIAL_INTERVAL,
+    max_interval=None,
+    publish_metric=True,
+):
+    """Waits until 'condition' returns True, woken up by a DLT marker or by adaptive backoff polling
+
+    :param condition: function without arguments returning True when the awaited state is reached
+    :param timeout: maximum time to wait (seconds)
+    :param str name: name of the wait, used on the logs and on the published metric
+    :param dlt_broker: DLT broker of the target, see get_dlt_broker. Without it, the state is only polled.
+    :param DLTMarker marker: DLT messages announcing the state change
+    :param initial_interval: first polling interval (seconds), doubled after each check
+    :param max_interval: maximum polling interval (seconds), defaults to POLL_MAX_INTERVAL, or to
+        POLL_MAX_INTERVAL_WITH_MARKER when waiting for a DLT marker
+    :param bool publish_metric: publish the time the wait took on MetricLogger
+    :return: True if the condition was reached within the timeout, False otherwise
+    """
+    use_marker = dlt_broker is not None and marker is not None
+    if max_interval is None:
+        max_interval = POLL_MAX_INTERVAL_WITH_MARKER if use_marker else POLL_MAX_INTERVAL
+    source = "dlt" if use_marker else "polling"
+
+    timer = TimeoutCondition(timeout)
+    interval = initial_interval
+    checks = 0
+    reached = False
+    trace_context = DLTContext(dlt_broker, filters=marker.filters) if use_marker else nullcontext()
+    with trace_context as trace:
+        while True:
+            checks += 1
+            if condition():
+                reached = True
+                break
+            remaining = timeout - timer.time_elapsed
+            if remaining <= 0:
+                break
+            wait_time = min(interval, remaining)
+            if not use_marker:
+                time.sleep(wait_time)
+            elif _wait_for_marker(trace, marker, wait_time):
+                logger.debug(f"DLT marker of '{name}' received, checking the state")
+            interval = min(interval * POLL_BACKOFF_FACTOR, max_interval)
+
+    time_elapsed = timer.time_elapsed
+    result = "reached" if reached else "timed out"
+    logger.info(f"Wait for '{name}' {result} after {time_elapsed:.1f}s ({checks} checks)")
+    if publish_metric:
+        metric_logger.publish(
+            {
+                "name": "readiness_wait",
+                "wait_name": name,
+                "time_to_ready": time_elapsed,
+                "reached": reached,
+                "source": source,
+                "checks": checks,
+            }
+        )
+    return reached
+
+
+def wait_while(condition, duration, name="stability", **wait_kwargs):
+    """Checks that 'condition' stays True during 'duration', woken up by a DLT marker or by adaptive polling
+
+    :param condition: function without arguments returning True while the state holds
+    :param duration: time during which the state must hold (seconds)
+    :param str name: name of the wait, used on the logs
+    :param wait_kwargs: extra arguments of 'wait_until', e.g. the DLT marker announcing that the state is left
+    :return: True if the state held during the whole duration, False otherwise
+    """
+    state_left = wait_until(lambda: not condition(), duration, name=name, publish_metric=False, **wait_kwargs)
+    # The last check may have happened before the end of the duration, confirm the state at the end
+    return not state_left and condition()
@@ -5,9 +5,15 @@ import time
 import sh
 
 from si_test_idcevo.si_test_helpers.android_helpers import ensure_launcher_page
+from si_test_idcevo.si_test_helpers.readiness_waits import (
+    APPLICATION_TARGET_LEFT,
+    APPLICATION_TARGET_REACHED,
+    get_dlt_broker,
+    wait_until,
+    wait_while,
+)
 from tee.target_common import NsmRestartReasons  # noqa: AZ100
 from tee.tools.lifecycle import LifecycleFunctions
-from validation_utils.utils import TimeoutCondition
 
 lf = LifecycleFunctions()
 logger = logging.getLogger(__name__)
@@ -74,23 +80,29 @@ def is_application_mode(mtee_target):
 
 
 def wait_for_application_target(mtee_target, timeout=130):
-    """Wait for application target to be active with timeout (defaults to 130s)"""
-    timeout_condition = TimeoutCondition(timeout)
-    while timeout_condition:
-        if is_application_mode(mtee_target):
-            return True
-        time.sleep(5)
-    return False
+    """Wait for application target to be active with timeout (defaults to 130s)
+
+    The target is checked again as soon as the application.target unit result shows up on DLT.
+    """
+    return wait_until(
+        lambda: is_application_mode(mtee_target),
+        timeout,
+        name="application_target",
+        dlt_broker=get_dlt_broker(mtee_target),
+        marker=APPLICATION_TARGET_REACHED,
+    )
 
 
 def ensure_application_target_for_specific_timeout(mtee_target, timeout=30):
     """Ensure target is in application mode throughout timeout condition (defaults to 30)"""
-    timeout_condition = TimeoutCondition(timeout)
-    while timeout_condition:
-        if not is_application_mode(mtee_target):
-            return False
-        time.sleep(3)
-    return True
+    return wait_while(
+        lambda: is_application_mode(mtee_target),
+        timeout,
+        name="application_target_stability",
+        dlt_broker=get_dlt_broker(mtee_target),
+        marker=APPLICATION_TARGET_LEFT,
+        max_interval=3,
+    )
 
 
 def wakeup_from_sleep_and_restore_vehicle_state(test):
@@ -0,0 +1,162 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Seeded and stratified scheduling of the reboots of the randomized mode switching robustness tests
+
+Each reboot requests a boot mode after a waiting time. Instead of drawing both uniformly, the scheduler splits
+them in cells: the transition from the current boot mode to the requested one, and the waiting time bucket.
+The next reboot is drawn among the least covered cells reachable from the current boot mode, so every cell is
+covered before any is repeated, and the waiting time is drawn within the bucket of the cell.
+
+    scheduler = RebootScheduler(["APP", "BOL"], seed=REBOOT_SCHEDULER_SEED)
+    step = scheduler.next_step(current_boot_mode)
+    step.mode, step.waiting_time
+
+The draws of each step only depend on the seed, the step number and the coverage, so a run with the same seed
+schedules the same reboots as long as the target reaches the same boot modes. To re-run the exact sequence of
+a previous run, e.g. to reproduce a failure, set REBOOT_SCHEDULER_REPLAY to its report (or report journal).
+"""
+import json
+import logging
+import os
+import random
+
+from collections import namedtuple
+
+from si_test_idcevo.si_test_helpers.report_helpers import REPORT_JOURNAL_SUFFIX, ReportJournal
+
+logger = logging.getLogger(__name__)
+
+# Seed of the reboot draws, a random one is used (and reported) if not set
+REBOOT_SCHEDULER_SEED = os.getenv("REBOOT_SCHEDULER_SEED")
+# Report (.json) or report journal (.journal.jsonl) of a previous run, to replay its reboots
+REBOOT_SCHEDULER_REPLAY = os.getenv("REBOOT_SCHEDULER_REPLAY")
+# Waiting time buckets before each reboot, (min, max) in seconds, both included
+WAIT_TIME_BUCKETS = ((0, 29), (30, 89), (90, 179), (180, 300))
+# Boot mode before the first reboot, or after a failed one
+UNKNOWN_BOOT_MODE = ""
+
+RebootStep = namedtuple("RebootStep", ["step", "mode", "waiting_time", "wait_bucket", "seed"])
+
+
+def get_wait_bucket(waiting_time, wait_time_buckets=WAIT_TIME_BUCKETS):
+    """Returns the index of the bucket of a waiting time, or None if it isn't in any bucket"""
+    for index, (min_time, max_time) in enumerate(wait_time_buckets):
+        if min_time <= waiting_time <= max_time:
+            return index
+    return None
+
+
+def load_replay_steps(report_path):
+    """Returns the reboots of a previous run, to replay them
+
+    :param str report_path: report (.json) or report journal (.journal.jsonl) of the run
+    :return: list of (mode, waiting_time) tuples, in the order they were done
+    """
+    if str(report_path).endswith(REPORT_JOURNAL_SUFFIX):
+        cycles = {
+            record["cycle"]: record["summary"]
+            for record in ReportJournal(report_path).read_records()
+            if record.get("type") == "cycle"
+        }
+    else:
+        with open(report_path) as report_file:
+            cycles = {int(cycle): summary for cycle, summary in json.load(report_file)["boot_cycle_summary"].items()}
+    return [(cycles[cycle]["expected_boot_mode"], cycles[cycle]["waiting_time"]) for cycle in sorted(cycles)]
+
+
+class RebootScheduler(object):
+    """Draws the boot mode and the waiting time of each reboot, covering all transitions and waiting times"""
+
+    def __init__(self, modes, wait_time_buckets=WAIT_TIME_BUCKETS, seed=None, replay_steps=None):
+        """
+        :param list modes: boot modes which can be requested, e.g. ["APP", "BOL"]
+        :param wait_time_buckets: waiting time buckets, (min, max) in seconds
+        :param seed: seed of the draws (int), a random one is used if None
+        :param list replay_steps: (mode, waiting_time) of the reboots to replay, see load_replay_steps.
+            The draws are not used when replaying.
+        """
+        self.modes = list(modes)
+        self.wait_time_buckets = wait_time_buckets
+        self.seed = int(seed) if seed is not None else random.randrange(2**32)
+        self.replay_steps = replay_steps
+        self.steps = 0
+        # Amount of reboots requested on each cell: {(previous mode, requested mode, wait bucket): count}
+        self.coverage = {
+            (previous_mode, mode, bucket): 0
+            for previous_mode in self.modes
+            for mode in self.modes
+            for bucket in range(len(self.wait_time_buckets))
+        }
+        if self.is_replay:
+            logger.info(f"Replaying a sequence of {len(self.replay_steps)} reboots")
+        else:
+            logger.info(f"Scheduling the reboots with seed {self.seed}")
+
+    @property
+    def is_replay(self):
+        return self.replay_steps is not None
+
+    def is_last_step(self):
+        """Returns True if the next step is the last one to replay"""
+        return self.is_replay and self.steps + 1 >= len(self.replay_steps)
+
+    def is_replay_done(self):
+        """Returns True if all the steps were replayed, e.g. by the run resumed, or if there are none to replay"""
+        return self.is_replay and self.steps >= len(self.replay_steps)
+
+    def _count_step(self, previous_mode, mode, wait_bucket):
+        cell = (previous_mode, mode, wait_bucket)
+        if cell in self.coverage:
+            self.coverage[cell] += 1
+        self.steps += 1
+
+    def _cell_usage(self, previous_mode, mode, wait_bucket):
+        """Amount of reboots of a cell, summed over all previous modes when the current one is unknown"""
+        if previous_mode in self.modes:
+            return self.coverage[(previous_mode, mode, wait_bucket)]
+        return sum(self.coverage[(known_mode, mode, wait_bucket)] for known_mode in self.modes)
+
+    def next_step(self, previous_mode=UNKNOWN_BOOT_MODE):
+        """Draws the next reboot among the least covered cells reachable from the current boot mode
+
+        :param str previous_mode: boot mode of the target before the reboot, UNKNOWN_BOOT_MODE if not known
+        :return: RebootStep with the requested mode and the waiting time before the reboot
+        :raises RuntimeError: if all the steps to replay were already done
+        """
+        step = self.steps + 1
+        if self.is_replay_done():
+            raise RuntimeError(f"All the {len(self.replay_steps)} reboots to replay were already done")
+        if self.is_replay:
+            mode, waiting_time = self.replay_steps[self.steps]
+            wait_bucket = get_wait_bucket(waiting_time, self.wait_time_buckets)
+        else:
+            # A generator per step, so a resumed run draws the same steps as the interrupted one
+            generator = random.Random(f"{self.seed}-{step}")
+            cells = [(mode, bucket) for mode in self.modes for bucket in range(len(self.wait_time_buckets))]
+            usages = {cell: self._cell_usage(previous_mode, *cell) for cell in cells}
+            least_usage = min(usages.values())
+            mode, wait_bucket = generator.choice([cell for cell in cells if usages[cell] == least_usage])
+            waiting_time = generator.randint(*self.wait_time_buckets[wait_bucket])
+
+        self._count_step(previous_mode, mode, wait_bucket)
+        return RebootStep(step, mode, waiting_time, wait_bucket, self.seed)
+
+    def restore(self, cycle_summaries):
+        """Counts the reboots done by a resumed run
+
+        :param cycle_summaries: cycle summaries of the run, with their "previous_boot_mode",
+            "expected_boot_mode" and "waiting_time"
+        """
+        for cycle_summary in cycle_summaries:
+            self._count_step(
+                cycle_summary.get("previous_boot_mode", UNKNOWN_BOOT_MODE),
+                cycle_summary["expected_boot_mode"],
+                get_wait_bucket(cycle_summary["waiting_time"], self.wait_time_buckets),
+            )
+
+    def coverage_summary(self):
+        """Returns the amount of reboots of each cell, e.g. {"APP_to_BOL_30-89s": 2}"""
+        summary = {}
+        for (previous_mode, mode, bucket), count in self.coverage.items():
+            min_time, max_time = self.wait_time_buckets[bucket]
+            summary[f"{previous_mode}_to_{mode}_{min_time}-{max_time}s"] = count
+        return summary
@@ -0,0 +1,113 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Batch several reads/commands on the target into a single shell invocation
+
+Each SSH or adb call costs a full round trip, which adds up quickly when reading sysfs/procfs one file at a time.
+RemoteProbe runs all the queued reads and commands in one shell invocation and splits the output back per item,
+using unique begin/end markers. The return code of each item is kept.
+
+    probe = RemoteProbe(test.mtee_target)
+    probe.add_read("governor", "/sys/module/cpufreq/parameters/default_governor")
+    probe.add_command("kernel", "uname -r")
+    results = probe.run()
+    results["governor"].stdout, results["governor"].returncode
+"""
+import logging
+import re
+import uuid
+
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ProbeResult = namedtuple("ProbeResult", ["stdout", "returncode"])
+
+
+class RemoteProbeError(RuntimeError):
+    """Raised when the output of a probe can not be split per item"""
+
+
+class RemoteProbe(object):
+    """Queue of reads and commands to run on the target in a single shell invocation"""
+
+    def __init__(self, target, **execute_kwargs):
+        """
+        :param target: target used to run the commands, e.g. mtee_target or apinext_target.
+            Any object with an 'execute_command(command, **kwargs)' method returning the command stdout
+            as a '.stdout' attribute (str or bytes) is supported.
+        :param execute_kwargs: extra arguments passed to target.execute_command, e.g. privileged=True
+        """
+        self.target = target
+        self.execute_kwargs = execute_kwargs
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def add_command(self, key, command):
+        """Queues a shell command. Its stdout and return code are returned under 'key'.
+
+        :param str key: key of the command result
+        :param str command: shell command to run
+        :return: the RemoteProbe, so calls can be chained
+        """
+        if key in self._items:
+            raise ValueError(f"Probe item '{key}' already exists")
+        self._items[key] = command
+        return self
+
+    def add_read(self, key, path):
+        """Queues the read of a file (e.g. from sysfs or procfs). Its content is returned under 'key'.
+
+        :param str key: key of the read result
+        :param str path: path of the file to read on the target. Shell wildcards are expanded.
+        :return: the RemoteProbe, so calls can be chained
+        """
+        return self.add_command(key, f"cat {path}")
+
+    def build_script(self, marker):
+        """Builds the shell script running all the queued items, each one framed by begin/end marker lines
+
+        A newline is always written before the end marker, so the item output doesn't need to end with one.
+        """
+        script = []
+        for index, command in enumerate(self._items.values()):
+            script.append(
+                f'echo "{marker}:begin:{index}"; ( {command} ); rc=$?; echo; echo "{marker}:end:{index}:$rc"'
+            )
+        return "; ".join(script)
+
+    def parse_output(self, output, marker):
+        """Splits the output of the script built by 'build_script' per item
+
+        :param str output: stdout of the script
+        :param str marker: marker used to build the script
+        :return: dict with a ProbeResult per item key
+        :raises RemoteProbeError: if the output of an item was not found (e.g. the shell was killed)
+        """
+        frame_regex = re.compile(
+            rf"^{marker}:begin:(\d+)\n(.*?)\n{marker}:end:\1:(\d+)$", flags=re.MULTILINE | re.DOTALL
+        )
+        frames = {int(index): (stdout, int(returncode)) for index, stdout, returncode in frame_regex.findall(output)}
+
+        results = {}
+        for index, key in enumerate(self._items):
+            if index not in frames:
+                raise RemoteProbeError(f"Output of probe item '{key}' not found on the probe output:\n{output}")
+            results[key] = ProbeResult(*frames[index])
+        return results
+
+    def run(self):
+        """Runs all the queued items in a single shell invocation
+
+        :return: dict with a ProbeResult(stdout, returncode) per item key, in the order they were added
+        """
+        if not self._items:
+            return {}
+
+        marker = f"PROBE_{uuid.uuid4().hex}"
+        logger.debug(f"Running {len(self)} probe items in a single command: {list(self._items)}")
+        result = self.target.execute_command(self.build_script(marker), **self.execute_kwargs)
+        output = result.stdout
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", errors="replace")
+        return self.parse_output(output.replace("\r\n", "\n"), marker)
@@ -1,28 +1,109 @@
 import json
 import logging
+import os
+import time
 
 from collections import defaultdict
 from pathlib import Path
 
 from mtee.metric import MetricLogger
 from mtee.testing.support.target_share import TargetShare
+from si_test_idcevo.si_test_helpers.kpi_statistics import percentile
 from si_test_idcevo.si_test_helpers.str_helpers import MAX_SUCCESSIVE_STR_CYCLES_BEFORE_COLD_BOOT
 
 target = TargetShare().target
 logger = logging.getLogger(__name__)
 metric_logger = MetricLogger()
 
+# Each cycle summary is appended to a JSON lines journal next to the report, so the results of a long run
+# survive a crash of the worker. Set REPORT_JOURNAL=0 to disable the journal.
+REPORT_JOURNAL = int(os.getenv("REPORT_JOURNAL", "1"))
+# Records written between two fsyncs of the journal, 0 to leave the flushing to the OS
+REPORT_JOURNAL_FSYNC_INTERVAL = int(os.getenv("REPORT_JOURNAL_FSYNC_INTERVAL", "1"))
+# Set REPORT_JOURNAL_RESUME=1 to continue a run from the cycles found on its journal, instead of starting over.
+# Only the tests whose cycle loop continues from 'last_cycle' pass it to their reporter, see GenericReporter 'resume'.
+REPORT_JOURNAL_RESUME = int(os.getenv("REPORT_JOURNAL_RESUME", "0"))
+REPORT_JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+class ReportJournal(object):
+    """Append-only JSON lines file, with one record per line"""
+
+    def __init__(self, path, fsync_interval=REPORT_JOURNAL_FSYNC_INTERVAL):
+        """
+        :param Path path: path of the journal file
+        :param int fsync_interval: records written between two fsyncs, 0 to never fsync
+        """
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._unsynced_records = 0
+
+    def read_records(self):
+        """Returns the records of the journal, ignoring the last line if it was cut by a crash
+
+        :return: list of records (dict), empty if the journal doesn't exist
+        """
+        records = []
+        try:
+            with self.path.open() as journal_file:
+                for line_number, line in enumerate(journal_file, start=1):
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"Ignoring the journal '{self.path}' from line {line_number}, it is incomplete")
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+
+    def open(self, records=()):
+        """Opens the journal for appending, rewritten with only the given records"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        with temporary_path.open("w") as journal_file:
+            for record in records:
+                journal_file.write(json.dumps(record) + "\n")
+        os.replace(temporary_path, self.path)
+        self._file = self.path.open("a")
+
+    def append(self, record):
+        if self._file is None:
+            self._file = self.path.open("a")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._unsynced_records += 1
+        if self.fsync_interval and self._unsynced_records >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._unsynced_records = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        if self.fsync_interval:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        self._unsynced_records = 0
+
 
 class GenericReporter:
-    """Generic template to add test report"""
+    """Generic template to add test report
+
+    The cycle summaries are appended to a journal as they are added, and the running summary counters of the
+    subclasses are updated on each cycle, see '_update_running_summary'. A partially finished run can then be
+    resumed, or its report rebuilt, from the journal.
+    """
 
     REPORT_DIR = Path(target.options.result_dir) / "reports"
     HUMAN_READABLE_SUMMARY_KEYS = {
         "is_passed": "Test case passed",
         "total_execution_time": "Total execution time",
     }
+    CYCLE_SUMMARY_KEY = "boot_cycle_summary"
 
-    def __init__(self, test_name, report_filename=None, description=""):
+    def __init__(self, test_name, report_filename=None, description="", resume=False):
         """
         Init the reporter
 
@@ -30,20 +111,72 @@ class GenericReporter:
         :param Optional[str] report_filename: the report filename.
             The default value is "{test_name}_robustness_report.json"
         :param Optional[str] description: description of the report test"
+        :param bool resume: load the cycles of a previous run of the test from the journal, see 'resume'.
+            Only for tests which continue their cycles from 'last_cycle', e.g. with resume=REPORT_JOURNAL_RESUME
         """
         self.test_name = test_name
         self.description = description
         self.report_path = self.REPORT_DIR / (report_filename or f"{self.test_name}_report.json")
+        self.start_time = time.time()
+        self.last_cycle = 0
 
         self._report = {
             "test_name": self.test_name,
             "description": self.description,
             "summary": {},
-            "boot_cycle_summary": {},
+            self.CYCLE_SUMMARY_KEY: {},
         }
 
+        self.journal = None
+        if REPORT_JOURNAL:
+            self.journal = ReportJournal(self.report_path.with_name(self.report_path.stem + REPORT_JOURNAL_SUFFIX))
+            if not (resume and self.resume()):
+                self.journal.open([self._journal_header()])
+
+    def _journal_header(self):
+        return {
+            "type": "header",
+            "test_name": self.test_name,
+            "description": self.description,
+            "start_time": self.start_time,
+        }
+
+    def resume(self):
+        """
+        Loads the cycle summaries of a previous run of the test from the journal, updating the running summary.
+        The next cycles are appended to the same journal. The report of a run which crashed is rebuilt by resuming
+        it, and then adding the report summary.
+
+        :return: True if the run was resumed, False if the journal has no run of this test
+        """
+        records = self.journal.read_records()
+        if not records or records[0].get("type") != "header" or records[0].get("test_name") != self.test_name:
+            logger.info(f"No run of '{self.test_name}' to resume on the journal '{self.journal.path}'")
+            return False
+
+        cycle_records = [record for record in records if record.get("type") == "cycle"]
+        for record in cycle_records:
+            self._store_cycle_summary(record["cycle"], record["summary"])
+        self.start_time = records[0]["start_time"]
+        self.journal.open([records[0], *cycle_records])
+        logger.info(f"Resumed '{self.test_name}' after cycle {self.last_cycle} from the journal '{self.journal.path}'")
+        return True
+
+    def _store_cycle_summary(self, cycle_num, cycle_summary):
+        self._report[self.CYCLE_SUMMARY_KEY][cycle_num] = cycle_summary
+        self._update_running_summary(cycle_num, cycle_summary)
+        self.last_cycle = max(self.last_cycle, cycle_num)
+
+    def _update_running_summary(self, cycle_num, cycle_summary):
+        """Updates the summary counters of the report with a new cycle summary, implemented by the subclasses"""
+
     def _add_boot_cycle_summary(self, cycle_num, boot_summary):
-        self._report["boot_cycle_summary"][cycle_num] = boot_summary
+        self._store_cycle_summary(cycle_num, boot_summary)
+        if self.journal:
+            self.journal.append({"type": "cycle", "cycle": cycle_num, "summary": boot_summary})
+
+    def get_cycle_summary(self, cycle_num):
+        return self._report[self.CYCLE_SUMMARY_KEY].get(cycle_num, {})
 
     def _generate_summary(self, summary):
         self._report["summary"] = summary
@@ -63,17 +196,33 @@ class GenericReporter:
         self._generate_summary(summary)
         self._print_summary()
 
-        # Write the report with json format
-        with self.report_path.open("w") as report_out:
+        # Write the report with json format, replacing the previous one only once it is complete
+        temporary_path = self.report_path.with_name(self.report_path.name + ".tmp")
+        with temporary_path.open("w") as report_out:
             json.dump(self._report, report_out, indent=4)
+        os.replace(temporary_path, self.report_path)
+
+        if self.journal:
+            self.journal.append({"type": "summary", "summary": summary})
+            self.journal.close()
 
 
 class RobustnessLifecycleReporter(GenericReporter):
-    def __init__(self, test_name, report_filename=None, description=""):
+    def __init__(self, test_name, report_filename=None, description="", **kwargs):
 
         self.num_reboot = 0
         self.num_reboot_failed = 0
         self.total_execution_time = 0
+        self.seed = None
+        self.transition_coverage = {}
+        self.reboot_stats = {
+            "app_to_app": 0,
+            "app_to_bolo": 0,
+            "bolo_to_app": 0,
+            "bolo_to_bolo": 0,
+            "unknown_to_app": 0,
+            "unknown_to_bolo": 0,
+        }
 
         self.REPORT_DIR = Path(target.options.result_dir) / "robustness_switch_modes_tests"
         self.HUMAN_READABLE_SUMMARY_KEYS = {
@@ -87,59 +236,65 @@ class RobustnessLifecycleReporter(GenericReporter):
             "bolo_to_bolo": "Number of reboots from BOLO to BOLO",
             "unknown_to_app": "Number of reboots from UNKNOWN(previous reboot failed) to APP",
             "unknown_to_bolo": "Number of reboots from UNKNOWN(previous reboot failed) to BOLO",
+            "seed": "Seed of the reboot scheduler",
+            "transition_coverage": "Number of reboots requested per mode transition and waiting time",
         }
-        super().__init__(test_name, report_filename, description)
+        super().__init__(test_name, report_filename, description, **kwargs)
+
+    def _update_running_summary(self, cycle_num, cycle_summary):
+        """Counts the reboot, its failure and the mode switch it did"""
+        self.num_reboot += 1
+        if not cycle_summary.get("reboot_success"):
+            self.num_reboot_failed += 1
+
+        mode_names = {"APP": "app", "BOL": "bolo"}
+        previous_boot_mode = cycle_summary.get("previous_boot_mode", "")
+        previous_mode_name = mode_names.get(previous_boot_mode) if previous_boot_mode else "unknown"
+        mode_name = mode_names.get(cycle_summary.get("boot_mode", ""))
+        if previous_mode_name and mode_name:
+            self.reboot_stats[f"{previous_mode_name}_to_{mode_name}"] += 1
 
     def add_report_summary(self):
         """
-        Add summary to the report and calculate the reboot statistics
+        Add summary to the report with the reboot statistics
         """
-        reboot_stats = {
-            "app_to_app": 0,
-            "app_to_bolo": 0,
-            "bolo_to_app": 0,
-            "bolo_to_bolo": 0,
-            "unknown_to_app": 0,
-            "unknown_to_bolo": 0,
-        }
-        for _, value in self._report["boot_cycle_summary"].items():
-            previous_boot_mode = value.get("previous_boot_mode", "")
-            boot_mode = value.get("boot_mode", "")
-            if previous_boot_mode == "APP" and boot_mode == "APP":
-                reboot_stats["app_to_app"] += 1
-            elif previous_boot_mode == "APP" and boot_mode == "BOL":
-                reboot_stats["app_to_bolo"] += 1
-            elif previous_boot_mode == "BOL" and boot_mode == "APP":
-                reboot_stats["bolo_to_app"] += 1
-            elif previous_boot_mode == "BOL" and boot_mode == "BOL":
-                reboot_stats["bolo_to_bolo"] += 1
-            elif previous_boot_mode == "" and boot_mode == "APP":
-                reboot_stats["unknown_to_app"] += 1
-            elif previous_boot_mode == "" and boot_mode == "BOL":
-                reboot_stats["unknown_to_bolo"] += 1
-
         self.report(
             summary={
                 "is_passed": not self.num_reboot_failed,
                 "number_of_reboots": self.num_reboot,
                 "total_execution_time": self.total_execution_time,
                 "reboot_failed": self.num_reboot_failed,
-                **reboot_stats,
+                **self.reboot_stats,
+                "seed": self.seed,
+                "transition_coverage": self.transition_coverage,
             }
         )
 
 
 class MultipleRebootsKPIsReporter(GenericReporter):
-    def __init__(self, test_name, report_filename=None, description=""):
+    def __init__(self, test_name, report_filename=None, description="", **kwargs):
 
         self.reboots_amount = 0
         self.individual_KPIs_to_collect = 0
         self.values_collected_amount = 0
         self.values_not_collected_amount = 0
-        self.missing_kpis = defaultdict(list)
+        self.missing_kpis = {}
+        self.reboots_performed = 0
+        self.stopped_early = False
+        self.kpi_statistics = {}
 
         self.REPORT_DIR = Path(target.options.result_dir) / "multiple_reboots_kpi_tests"
-        super().__init__(test_name, report_filename, description)
+        super().__init__(test_name, report_filename, description, **kwargs)
+
+    def _update_running_summary(self, cycle_num, cycle_summary):
+        """Counts the reboot and the KPIs found and missing on it"""
+        self.reboots_performed += 1
+        for name, status in cycle_summary.items():
+            if status == "Found":
+                self.values_collected_amount += 1
+            else:
+                self.values_not_collected_amount += 1
+                self.missing_kpis.setdefault(name, []).append(cycle_num)
 
     def add_report_summary(self):
 
@@ -150,6 +305,9 @@ class MultipleRebootsKPIsReporter(GenericReporter):
                 "values_collected_amount": self.values_collected_amount,
                 "values_not_collected_amount": self.values_not_collected_amount,
                 "Missing_KPIs_in_these_reboots": self.missing_kpis,
+                "reboots_performed": self.reboots_performed,
+                "stopped_early": self.stopped_early,
+                "KPIs_statistics": self.kpi_statistics,
             }
         )
 
@@ -158,7 +316,9 @@ class IterativeSTRReporter(GenericReporter):
     """This class is used to gather STR statistics from '[SIT_Automated] STR Iterative Test'
     and report them in .json format"""
 
-    def __init__(self, test_name, report_filename=None, description="", str_cycles=1):
+    CYCLE_SUMMARY_KEY = "str_cycle_summary"
+
+    def __init__(self, test_name, report_filename=None, description="", str_cycles=1, **kwargs):
         self.str_cycles = str_cycles
         self.num_str_pre_check_failed = 0
         self.num_str_post_check_failed = 0
@@ -175,6 +335,8 @@ class IterativeSTRReporter(GenericReporter):
             "number_of_str_cycles_failed": 0,
             "total_number_of_str_cycles": self.str_cycles,
         }
+        # Latencies of each STR phase over all cycles, from the target timestamps: {phase: [latency, ...]}
+        self.phase_latencies = defaultdict(list)
 
         self.HUMAN_READABLE_SUMMARY_KEYS = {
             "is_test_success": "Test case passed",
@@ -186,12 +348,10 @@ class IterativeSTRReporter(GenericReporter):
             "average_time_to_exit_str_in_seconds": "Average time it took for the ECU to exit STR, in seconds",
             "number_of_str_cycles_failed": "Number of STR cycles failed",
             "number_of_str_post_check_validations_failed": "Number of STR post-check validations failed",
+            "phase_latencies_in_seconds": "Latency of each STR phase over all cycles (p50, p95, max), in seconds",
         }
 
-        super().__init__(test_name, report_filename, description)
-
-        self._report.pop("boot_cycle_summary")
-        self._report["str_cycle_summary"] = {}
+        super().__init__(test_name, report_filename, description, **kwargs)
 
     def add_report_summary(self):
         """
@@ -206,6 +366,7 @@ class IterativeSTRReporter(GenericReporter):
             - number_of_str_cycles_failed: Number of STR cycles failed
             - number_of_str_pre_check_validations_failed: Number of STR pre check validations failed
             - number_of_str_post_check_validations_failed: Number of STR post check validations failed
+            - phase_latencies_in_seconds: p50, p95 and max latency of each STR phase, over all the cycles
         """
         # This statement ensures we don't get a division by 0 when all the STR cycles failed
         if not self.time_metrics["number_of_str_cycles_failed"] == self.str_cycles:
@@ -232,6 +393,7 @@ class IterativeSTRReporter(GenericReporter):
             "number_of_str_cycles_failed": self.time_metrics["number_of_str_cycles_failed"],
             "number_of_str_pre_check_validations_failed": self.num_str_pre_check_failed,
             "number_of_str_post_check_validations_failed": self.num_str_post_check_failed,
+            "phase_latencies_in_seconds": self.get_phase_latencies_summary(),
         }
         # This call generates the .json file with all content present in _report variable
         self.report(self._report["summary"])
@@ -245,6 +407,28 @@ class IterativeSTRReporter(GenericReporter):
                     "value": value,
                 }
             )
+        for phase, latencies in self._report["summary"]["phase_latencies_in_seconds"].items():
+            for statistic in ("p50", "p95", "max"):
+                metric_logger.publish(
+                    {
+                        "name": self.test_name,
+                        "metric": f"{phase}_latency_{statistic}_in_seconds",
+                        "value": latencies[statistic],
+                    }
+                )
+
+    def get_phase_latencies_summary(self):
+        """Returns the amount of cycles, the p50, p95 and max latency of each STR phase detected"""
+        summary = {}
+        for phase, latencies in self.phase_latencies.items():
+            sorted_latencies = sorted(latencies)
+            summary[phase] = {
+                "count": len(sorted_latencies),
+                "p50": percentile(sorted_latencies, 50),
+                "p95": percentile(sorted_latencies, 95),
+                "max": sorted_latencies[-1],
+            }
+        return summary
 
     def add_str_cycle_summary(
         self,
@@ -257,6 +441,7 @@ class IterativeSTRReporter(GenericReporter):
         time_to_enter_str,
         time_to_exit_str,
         expect_cold_boot,
+        phase_timeline=None,
     ):
         """
         This method is called after each single STR cycle and gathers cycle's statistics and metrics,
@@ -269,11 +454,13 @@ class IterativeSTRReporter(GenericReporter):
             - str_cycle_duration_in_seconds: Time spent by the target in suspended state
             - time_it_took_to_enter_str_in_seconds: Time it took for the target to suspend after switching to PARKEN
             - time_it_took_to_exit_str_in_seconds: Time it took for the target to resume after switching to WOHNEN
-        """
+            - phase_timeline: Target and host timestamps of each STR phase detected, and the phase latencies
 
+        The cycle summary is appended to the report journal, see GenericReporter.
+        """
         # This handles the case when a cold boot was expected during the STR cycle
         if expect_cold_boot:
-            self._report["str_cycle_summary"][str_cycle] = {
+            cycle_summary = {
                 "is_cold_boot_success": str_success,
                 "message": (
                     f"As this was the {MAX_SUCCESSIVE_STR_CYCLES_BEFORE_COLD_BOOT}th consecutive iteration, "
@@ -281,12 +468,10 @@ class IterativeSTRReporter(GenericReporter):
                 ),
                 "error_message": error_msg,
             }
-            if not str_success:
-                self.time_metrics["number_of_str_cycles_failed"] += 1
 
         # When all steps and verifications of the STR cycle were successful
         elif str_pre_check_success and str_success and str_post_check_success:
-            self._report["str_cycle_summary"][str_cycle] = {
+            cycle_summary = {
                 "is_str_success": str_success,
                 "is_str_pre_check_success": str_pre_check_success,
                 "is_str_post_check_success": str_post_check_success,
@@ -295,9 +480,49 @@ class IterativeSTRReporter(GenericReporter):
                 "time_it_took_to_enter_str_in_seconds": time_to_enter_str,
                 "time_it_took_to_exit_str_in_seconds": time_to_exit_str,
             }
+
+        # When the iteration failed during the pre check verifications, the STR routine or the post check
+        else:
+            cycle_summary = {
+                "is_str_success": str_success,
+                "is_str_pre_check_success": str_pre_check_success,
+                "is_str_post_check_success": str_post_check_success,
+                "error_message": error_msg,
+            }
+
+        if phase_timeline:
+            cycle_summary["phase_timeline"] = phase_timeline
+
+        self._add_boot_cycle_summary(str_cycle, cycle_summary)
+
+    def _update_running_summary(self, cycle_num, cycle_summary):
+        """
+        Updates the STR statistics with a cycle summary.
+
+        The latencies of the phase timeline are aggregated over all cycles, including the failed ones, as the
+        phases detected before a failure are still meaningful.
+        """
+        phase_timeline = cycle_summary.get("phase_timeline")
+        if phase_timeline:
+            for phase, latency in phase_timeline["latencies_in_seconds"].items():
+                self.phase_latencies[phase].append(latency)
+
+        # When a cold boot was expected during the STR cycle
+        if "is_cold_boot_success" in cycle_summary:
+            if not cycle_summary["is_cold_boot_success"]:
+                self.time_metrics["number_of_str_cycles_failed"] += 1
+
+        # When all steps and verifications of the STR cycle were successful
+        elif (
+            cycle_summary["is_str_pre_check_success"]
+            and cycle_summary["is_str_success"]
+            and cycle_summary["is_str_post_check_success"]
+        ):
+            time_to_enter_str = cycle_summary["time_it_took_to_enter_str_in_seconds"]
+            time_to_exit_str = cycle_summary["time_it_took_to_exit_str_in_seconds"]
             self.total_time_entering_str += time_to_enter_str
             self.total_time_exiting_str += time_to_exit_str
-            self.total_str_time += str_time
+            self.total_str_time += cycle_summary["str_cycle_duration_in_seconds"]
 
             if time_to_enter_str > self.time_metrics["max_time_to_enter_str_in_seconds"]:
                 self.time_metrics["max_time_to_enter_str_in_seconds"] = time_to_enter_str
@@ -309,26 +534,13 @@ class IterativeSTRReporter(GenericReporter):
                 self.time_metrics["min_time_to_exit_str_in_seconds"] = time_to_exit_str
 
         # When the iteration failed during the pre check verifications
-        elif not str_pre_check_success:
-            self._report["str_cycle_summary"][str_cycle] = {
-                "is_str_success": str_success,
-                "is_str_pre_check_success": str_pre_check_success,
-                "is_str_post_check_success": str_post_check_success,
-                "error_message": error_msg,
-            }
+        elif not cycle_summary["is_str_pre_check_success"]:
             self.num_str_pre_check_failed += 1
 
-        # When the iteration failed during the STR routine or during post check verifications
+        # If the failure was during the STR routine
+        elif not cycle_summary["is_str_success"]:
+            self.time_metrics["number_of_str_cycles_failed"] += 1
+
+        # If the failure was during post check verifications
         else:
-            self._report["str_cycle_summary"][str_cycle] = {
-                "is_str_success": str_success,
-                "is_str_pre_check_success": str_pre_check_success,
-                "is_str_post_check_success": str_post_check_success,
-                "error_message": error_msg,
-            }
-            # If the failure was during the STR routine
-            if not str_success:
-                self.time_metrics["number_of_str_cycles_failed"] += 1
-            # If the failure was during post check verifications
-            else:
-                self.num_str_post_check_failed += 1
+            self.num_str_post_check_failed += 1
@@ -5,15 +5,27 @@ import re
 import subprocess
 import time
 from pathlib import Path
-from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageStat
+from PIL import Image, ImageChops, ImageColor, ImageDraw
 
 from diagnose.tools import enhex
 from mtee.testing.connectors.connector_dlt import DLTContext
-from mtee.testing.tools import OcrMode, assert_true, image_to_text, run_command
+from mtee.testing.tools import OcrMode, assert_true, run_command
+import numpy as np
 from si_test_idcevo.si_test_helpers.file_path_helpers import verify_file_in_host_with_timeout
+from si_test_idcevo.si_test_helpers.framebuffer_capture import (
+    RAW_SCREENSHOT_CAPTURE,
+    framebuffer_capture,
+    is_black_frame,
+)
+from si_test_idcevo.si_test_helpers.image_handle import ImageHandle
+from si_test_idcevo.si_test_helpers.ocr_service import ocr_service
 
 logger = logging.getLogger(__name__)
 
+PHUD_DRIVER_DISPLAY_ID = "4633128631561747460"
+# Offsets with the lowest SSD on which match_template computes the exact diff ratio
+MATCH_TEMPLATE_CANDIDATES = 16
+
 
 def crop_image(image_path, box, output="test.png"):
     """Crop an image given a certain coordinates(box)
@@ -45,7 +57,7 @@ def extract_text(
     """
     -Extract the text present in the given screenshot via OCR
     Args:
-            screenshot - File path of the captured screenshot.
+            screenshot - File path of the captured screenshot, or its ImageHandle.
             region - area which will be used to extract the text.
             brightness - Brightness multiplier.
             contrast - Contrast multiplier.
@@ -59,14 +71,11 @@ def extract_text(
             image_text - Extracted text from the image
             regex.findall - returns list of the matched regex
     """
-    if Path(screenshot).exists() and Path(screenshot).stat().st_size > 0:
-        logger.info(f"Searching for text on image: '{screenshot}'")
-        image_path = screenshot
-        if region:
-            image_path = Path(Path(screenshot).parent, Path(screenshot).stem + "_cropped.png")
-            crop_image(screenshot, region, image_path)
-        image_text = image_to_text(
-            image_path,
+    logger.info(f"Searching for text on image: '{screenshot}'")
+    image_text = (
+        ocr_service.submit(
+            screenshot,
+            region=region,
             lang=lang,
             monochrome=monochrome,
             brightness=brightness,
@@ -75,13 +84,12 @@ def extract_text(
             resize_height=resize_height,
             resize_width=resize_width,
             pagesegmode=pagesegmode,
-        ).replace("\n", " ")
-        logger.debug(f"Extracted text: '{image_text}' using OCR mode:'{pagesegmode}'")
-        return image_text
-    else:
-        err = "Image file size is 0 or file not found at: " + str(screenshot)
-        logger.info(err)
-        raise RuntimeError(err)
+        )
+        .result()
+        .replace("\n", " ")
+    )
+    logger.debug(f"Extracted text: '{image_text}' using OCR mode:'{pagesegmode}'")
+    return image_text
 
 
 def take_phud_driver_screenshot(test, screenshot_path, try_via_diag_job=True):
@@ -95,10 +103,23 @@ def take_phud_driver_screenshot(test, screenshot_path, try_via_diag_job=True):
     :type try_via_diag_job: bool
     """
     logger.info(f"Taking phud driver screenshot with adb: {screenshot_path}")
+    if RAW_SCREENSHOT_CAPTURE:
+        try:
+            framebuffer_capture.capture(
+                screenshot_path,
+                display_id=PHUD_DRIVER_DISPLAY_ID,
+                skip_identical=False,
+                serial=test.apinext_target.get_android_serial_number(),
+            )
+            framebuffer_capture.wait_for_file(screenshot_path)
+            return
+        except Exception as e:
+            logger.info(f"Failed to take raw screenshot using adb, taking it as PNG. Error: {e}")
+
     with open(screenshot_path, mode="wb") as screenshot:
         try:
             run_command(
-                ["adb", "exec-out", "screencap", "-p", "-d", "4633128631561747460"], check=True, stdout=screenshot
+                ["adb", "exec-out", "screencap", "-p", "-d", PHUD_DRIVER_DISPLAY_ID], check=True, stdout=screenshot
             )
         except Exception as e:
             logger.info(f"Failed to take screenshot using adb. Error: {e}")
@@ -169,69 +190,145 @@ def take_phud_driver_diag_job_screenshot(test, screenshot_path):
     subprocess.run(cp_cmd, check=True)
 
 
+def _load_grayscale_array(image):
+    """Returns a PIL image as a float array in "L" mode, to reduce computation by factor 3 "RGB"->"L" """
+    return np.asarray(image.convert(mode="L"), dtype=np.float64)
+
+
+def _prepare_search_array(search_array):
+    """Returns the real FFT and the integral image of squares of a search array, shared by all the templates"""
+    search_height, search_width = search_array.shape
+    integral = np.zeros((search_height + 1, search_width + 1))
+    integral[1:, 1:] = np.cumsum(np.cumsum(search_array**2, axis=0), axis=1)
+    return np.fft.rfft2(search_array), integral
+
+
+def _find_best_template_offset(search_array, search_spectrum, search_integral, template_array):
+    """Finds the offset of the search array where the template array has the lowest diff ratio
+
+    The sum of squared differences (SSD) of every offset is computed at once, with an FFT cross-correlation and
+    an integral image of the search array. The exact diff ratio (mean absolute difference, in %) is then
+    computed for the MATCH_TEMPLATE_CANDIDATES offsets with the lowest SSD, and for every other offset which can
+    still beat them: as each pixel differs by at most 255, the diff ratio of an offset is at least
+    SSD * 100 / (255 * 255 * pixels), so the offsets above the best diff ratio found are skipped without changing
+    the result of a full scan.
+    :param search_array: (np.ndarray)- Search image in "L" mode
+    :param search_spectrum: (np.ndarray)- Real FFT of the search array
+    :param search_integral: (np.ndarray)- Integral image of the squares of the search array
+    :param template_array: (np.ndarray)- Template image in "L" mode
+    :return: (xs, ys, diff_ratio) of the best offset, or None if the template is bigger than the search image
+    """
+    search_height, search_width = search_array.shape
+    template_height, template_width = template_array.shape
+    valid_height, valid_width = search_height - template_height + 1, search_width - template_width + 1
+    if valid_height <= 0 or valid_width <= 0:
+        return None
+
+    template_spectrum = np.fft.rfft2(template_array, s=search_array.shape)
+    correlation = np.fft.irfft2(search_spectrum * np.conj(template_spectrum), s=search_array.shape)
+    correlation = correlation[:valid_height, :valid_width]
+
+    integral = search_integral
+    bottom, right = template_height, template_width
+    window_squares = (
+        integral[bottom:, right:] - integral[:valid_height, right:] - integral[bottom:, :valid_width]
+    ) + integral[:valid_height, :valid_width]
+    ssd = window_squares - 2 * correlation + np.sum(template_array**2)
+
+    def diff_ratio_at(index):
+        ys, xs = divmod(int(index), valid_width)
+        y_end, x_end = ys + template_height, xs + template_width
+        return float(np.mean(np.abs(search_array[ys:y_end, xs:x_end] - template_array))) * 100 / 255, xs, ys
+
+    ssd = ssd.ravel()
+    candidates = min(MATCH_TEMPLATE_CANDIDATES, ssd.size)
+    candidate_indexes = np.argpartition(ssd, candidates - 1)[:candidates]
+    # On ties, keep the first offset on the search order (column by column)
+    best_diff_ratio, best_xs, best_ys = min(diff_ratio_at(index) for index in candidate_indexes)
+
+    # Small tolerance for the rounding errors of the FFT, so ties are compared on their exact diff ratio
+    min_diff_ratios = np.maximum(ssd, 0) * 100 / (255 * 255 * template_array.size)
+    remaining_indexes = np.flatnonzero(min_diff_ratios <= best_diff_ratio + 1e-6)
+    for index in np.setdiff1d(remaining_indexes, candidate_indexes, assume_unique=True):
+        if min_diff_ratios[index] > best_diff_ratio + 1e-6:
+            continue
+        best_diff_ratio, best_xs, best_ys = min((best_diff_ratio, best_xs, best_ys), diff_ratio_at(index))
+    return best_xs, best_ys, best_diff_ratio
+
+
 def match_template(image, image_to_search, region, results_path, context="", acceptable_diff=2.0, save_diff=False):
     """
     To search for a smaller image inside a bigger image
     :param image:(str)- Path to Main image in which template image is to be searched
-    :param image_to_search:(str)- Path to Small image which is to be searched.
+    :param image_to_search:(str or list)- Path to Small image which is to be searched, or list of paths to search
+        several templates in one call. The main image is only loaded and transformed once.
     :param region:(tuple)- If search is to be performed in a limited region of main_image
     :param results_path:(str)- Path to save the images generated.
     :param context:(str)- Name prefix from which will derive the artifacts saved
     :param acceptable_diff:(float)- Acceptable diff ratio. Defaults to 2.
-    :param save_diff:(boolean)- Save the diff image if diff_ratio less than acceptable_diff. Defaults to False.
+    :param save_diff:(boolean)- Save the diff image of the best offset if no match is found and its diff ratio is
+        less than acceptable_diff + 5. Defaults to False.
+    :return: (result, location) tuple of the offset with the lowest diff ratio, or a list of these tuples
+        (in the same order) when a list of templates is given
     disclaimer:
-        Searching a template in 1000x150 image takes approx 8-10 seconds
+        The search is vectorized with NumPy, searching a template in the full CID screenshot takes milliseconds
     """
     results_path = Path(results_path) if results_path else Path(image).parent
-    logger.debug(f"Searching for '{image_to_search}' inside '{image}'")
+    templates = [image_to_search] if isinstance(image_to_search, (str, Path)) else list(image_to_search)
+    logger.debug(f"Searching for '{templates}' inside '{image}'")
     image_name = Path(image).stem
     start = time.time()
-    with Image.open(image) as main_image, Image.open(image_to_search) as template_image:
+    results = []
+    with Image.open(image) as main_image:
+        region = region or (0, 0) + main_image.size
         search_image = main_image.crop(region)
-        # Convert images to "L" to reduce computation by factor 3 "RGB"->"L"
-        search_image = search_image.convert(mode="L")
-        template_image = template_image.convert(mode="L")
-        search_width, search_height = search_image.size
-        template_width, template_height = template_image.size
-        diff_ratio_history = []  # keep track of diff ratio
-        # Loop over each pixel in the search image
-        for xs in range(search_width - template_width + 1):
-            for ys in range(search_height - template_height + 1):
-                search_crop = search_image.crop((xs, ys, xs + template_width, ys + template_height))
-                diff = ImageChops.difference(template_image, search_crop)
-                stat = ImageStat.Stat(diff)
-                diff_ratio = sum(stat.mean) * 100 / (len(stat.mean) * 255)
-                diff_ratio_history.append(diff_ratio)
-                if diff_ratio <= acceptable_diff:
-                    location = (
-                        xs + region[0],
-                        ys + region[1],
-                        xs + template_width + region[0],
-                        ys + template_height + region[1],
-                    )
-                    main_image = Image.open(image)
-                    draw = ImageDraw.Draw(main_image)
-                    draw.rectangle(location, outline="red")
-                    main_image.save(f"{results_path}/{image_name}_{context}_matched_image.png")
-                    time_elapsed = round(time.time() - start, 3)
-                    logging.info(f"Found match. diff={round(diff_ratio, 3)} time elapsed: {time_elapsed}s")
-                    return True, location
-
-                elif save_diff and diff_ratio == min(diff_ratio_history) and diff_ratio < (acceptable_diff + 5):
-                    # Save the closest match within a 5 diff radius from the desired value
-                    logging.debug(f"Keeping artifact... Diff_ratio: '{round(diff_ratio, 3)}'")
-                    screenshot_name_diff = f"{image_name}_{context}_diff_{xs}_{ys}.png"
-                    screenshot_path_diff = results_path / screenshot_name_diff
-                    diff.save(screenshot_path_diff, lossless=True)
-                    logging.debug(f"screenshot_path_diff: '{screenshot_path_diff}'")
+        search_array = _load_grayscale_array(search_image)
+        search_spectrum, search_integral = _prepare_search_array(search_array)
+        matched_image = None
+        for template in templates:
+            with Image.open(template) as template_image:
+                template_array = _load_grayscale_array(template_image)
+            best_offset = _find_best_template_offset(search_array, search_spectrum, search_integral, template_array)
+            if best_offset is None:
+                logging.info(f"No match found for '{template}', template is bigger than the search region")
+                results.append((False, None))
+                continue
+
+            xs, ys, diff_ratio = best_offset
+            template_height, template_width = template_array.shape
+            crop_box = (xs, ys, xs + template_width, ys + template_height)
+            if diff_ratio <= acceptable_diff:
+                location = (
+                    xs + region[0],
+                    ys + region[1],
+                    xs + template_width + region[0],
+                    ys + template_height + region[1],
+                )
+                matched_image = matched_image or main_image.copy()
+                draw = ImageDraw.Draw(matched_image)
+                draw.rectangle(location, outline="red")
+                logging.info(f"Found match for '{template}'. diff={round(diff_ratio, 3)}")
+                results.append((True, location))
+                continue
+
+            logging.info(f"No match found for '{template}'. Lowest diff ratio found was: {diff_ratio}")
+            if save_diff and diff_ratio < (acceptable_diff + 5):
+                # Save the closest match within a 5 diff radius from the desired value
+                logging.debug(f"Keeping artifact... Diff_ratio: '{round(diff_ratio, 3)}'")
+                diff = ImageChops.difference(
+                    Image.fromarray(template_array.astype(np.uint8)), search_image.convert(mode="L").crop(crop_box)
+                )
+                screenshot_path_diff = results_path / f"{image_name}_{context}_diff_{xs}_{ys}.png"
+                diff.save(screenshot_path_diff, lossless=True)
+                logging.debug(f"screenshot_path_diff: '{screenshot_path_diff}'")
+            results.append((False, None))
+
+        if matched_image:
+            matched_image.save(f"{results_path}/{image_name}_{context}_matched_image.png")
 
     time_elapsed = round(time.time() - start, 3)
-    logging.info(f"No match found. time elapsed: {time_elapsed}s")
-    if diff_ratio_history:
-        logging.info(f"Lowest diff ratio found was: {min(diff_ratio_history)}")
-    else:
-        logging.info("diff_ratio_history is empty")
-    return False, None
+    logging.info(f"Searched {len(templates)} template(s). time elapsed: {time_elapsed}s")
+    return results[0] if isinstance(image_to_search, (str, Path)) else results
 
 
 def fetch_expected_color_present_in_image(image_path, expected_hex_color, threshold=30):
@@ -266,7 +363,4 @@ def check_if_image_is_fully_black(image_path):
     :param image_path: Path where image file is located
     :return: True if all pixels in the image are black, False otherwise
     """
-    with Image.open(image_path) as img:
-        img = img.convert("RGB")
-        pixels = img.getdata()
-        return all(pixel == (0, 0, 0) for pixel in pixels)
+    return is_black_frame(ImageHandle.open(image_path).array)
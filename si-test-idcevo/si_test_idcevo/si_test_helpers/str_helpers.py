@@ -3,16 +3,19 @@
 import logging
 import os
 import re
+import threading
 import time
 
+from collections import namedtuple
 from mtee.testing.connectors.connector_dlt import DLTContext
 from si_test_idcevo.si_test_helpers.android_helpers import ensure_launcher_page, wait_for_all_widgets_drawn
 from si_test_idcevo.si_test_helpers.apinext_target_handlers import LIST_HUD_DISPLAY_ID
 from si_test_idcevo.si_test_helpers.dlt_helpers import check_dlt_trace
+from si_test_idcevo.si_test_helpers.framebuffer_capture import RAW_SCREENSHOT_CAPTURE, capture_displays
+from si_test_idcevo.si_test_helpers.readiness_waits import wait_until
 from si_test_idcevo.si_test_helpers.screenshot_utils import check_if_image_is_fully_black
 from tee.target_common import VehicleCondition
 from tee.tools.lifecycle import LifecycleFunctions
-from validation_utils.utils import TimeoutCondition
 
 logger = logging.getLogger(__name__)
 lf = LifecycleFunctions()
@@ -42,6 +45,160 @@ STR_FAILURE_MESSAGES = {
     "service_failure": r"Service failure: (.*service)",
     "coredump_found": r"Transfer complete for (\w+).*",
 }
+# Phases of a STR cycle, in the order they happen, named as their STR_VERIFICATION_MESSAGES
+STR_PHASES = (
+    "entering_parken",
+    "vm_control_suspended",
+    "entering_str",
+    "entering_wohnen",
+    "vm_control_resumed",
+    "resume_number",
+)
+# Latency of each phase, measured from the vehicle state switch that triggers it: {phase: reference phase}
+STR_PHASE_LATENCY_REFERENCES = {
+    "vm_control_suspended": "entering_parken",
+    "entering_str": "entering_parken",
+    "vm_control_resumed": "entering_wohnen",
+    "resume_number": "entering_wohnen",
+}
+STR_FAILURE_FILTERS = [("NSM", None), ("NSG", None), ("CDM", None), ("RECM", None), ("VMC", "VMC")]
+# Time to keep watching for failures after resuming from STR, shared by all the failure messages
+STR_FAILURE_GRACE_PERIOD = max(SERVICE_FAILURE_TIMEOUT, COREDUMP_TIMEOUT)
+STR_FAILURE_POLL_INTERVAL = 1  # seconds
+
+
+STRPhase = namedtuple("STRPhase", ["name", "target_timestamp", "host_timestamp", "payload"])
+
+
+def get_str_phase(name, dlt_msg):
+    """Returns the STRPhase of the DLT message marking a phase of the STR cycle"""
+    return STRPhase(name, dlt_msg.tmsp, dlt_msg.storage_timestamp, dlt_msg.payload_decoded)
+
+
+class STRCycleError(AssertionError):
+    """Raised by 'perform_str' when a STR cycle fails, the outcome of the cycle is kept on 'result'"""
+
+    def __init__(self, result):
+        self.result = result
+        super().__init__(result.error_message)
+
+
+class STRCycleResult(object):
+    """Outcome of a STR cycle: the timeline of its phases and the failures detected"""
+
+    def __init__(self, iteration=0, resume_number_before_str=0):
+        """
+        :param int iteration: STR Iteration count
+        :param int resume_number_before_str: Resume Number before performing STR
+        """
+        self.iteration = iteration
+        self.resume_number_before_str = resume_number_before_str
+        self.resume_number = resume_number_before_str + 1
+        self.current_resume_number = None
+        self.expected_resume_number = None
+        self.expected_cold_boot = False
+        self.network_down = False
+        self.phases = {}
+        self.missing_messages = []
+        self.fail_messages = []
+        self.resume_number_mismatches = []
+        self.timestamp_tolerance_messages = []
+
+    def add_phase(self, name, dlt_msg):
+        self.phases[name] = get_str_phase(name, dlt_msg)
+
+    @property
+    def is_success(self):
+        return not (
+            self.missing_messages
+            or self.fail_messages
+            or self.resume_number_mismatches
+            or self.timestamp_tolerance_messages
+        )
+
+    @property
+    def error_message(self):
+        return (
+            f"Missing log: {self.missing_messages} | Fail log: {self.fail_messages} | "
+            f"Resume Number Mismatch log: {self.resume_number_mismatches} | "
+            f"Timestamp tolerance log: {self.timestamp_tolerance_messages}"
+        )
+
+    def _host_time_between(self, start_phase, end_phase):
+        if start_phase not in self.phases or end_phase not in self.phases:
+            return 0
+        return self.phases[end_phase].host_timestamp - self.phases[start_phase].host_timestamp
+
+    @property
+    def time_to_enter_str(self):
+        """Time between the target switching to PARKEN and the Suspend DLT message, on the host clock"""
+        return self._host_time_between("entering_parken", "entering_str")
+
+    @property
+    def time_to_exit_str(self):
+        """Time between the target switching to WOHNEN and the Resume Number DLT message, on the host clock"""
+        return self._host_time_between("entering_wohnen", "resume_number")
+
+    @property
+    def str_duration(self):
+        """Total time the target was suspended, on the host clock, the target clock stops while suspended"""
+        if "entering_str" not in self.phases:
+            return 0
+        resume_timestamp = self.phases["resume_number"].host_timestamp if "resume_number" in self.phases else 0
+        return resume_timestamp - self.phases["entering_str"].host_timestamp
+
+    def phase_latencies(self):
+        """Returns the latency of each detected phase since the vehicle state switch that triggers it
+
+        The target timestamps are used, as they don't include the DLT transport delays. Both phases happen on
+        the same side of the suspension, so the target clock doesn't stop between them.
+        """
+        latencies = {}
+        for phase, reference_phase in STR_PHASE_LATENCY_REFERENCES.items():
+            if phase in self.phases and reference_phase in self.phases:
+                latencies[phase] = self.phases[phase].target_timestamp - self.phases[reference_phase].target_timestamp
+        return latencies
+
+    def _is_missing(self, message_name):
+        return any(message.startswith(f"{message_name}:") for message in self.missing_messages)
+
+    def next_resume_number(self):
+        """Returns the Resume Number the target reached on this cycle, expected to be increased on the next cycle
+
+        When the cycle failed, the Resume Number depends on how far the target went through the cycle.
+        """
+        if self.is_success:
+            return self.resume_number
+        # Target didn't switch to PARKEN, or failed to enter STR
+        if self._is_missing("entering_parken"):
+            return 0
+        if any(message.startswith("Failure entering STR!") for message in self.fail_messages):
+            target_suspended = "entering_str" in self.phases or "vm_control_suspended" in self.phases
+            return self.resume_number_before_str + 1 if target_suspended else 0
+        # The Resume Number reported by the target is the reference from now on
+        if self.resume_number_mismatches:
+            return self.current_resume_number
+        # A cold boot might have happened
+        if self.timestamp_tolerance_messages:
+            return 0
+        # The resume messages are missing, or a failure was detected, but the target went through STR
+        target_suspended = not self._is_missing("entering_str") and not self._is_missing("vm_control_suspended")
+        resume_missing = any(
+            self._is_missing(name) for name in ("entering_wohnen", "resume_number", "vm_control_resumed")
+        )
+        if target_suspended and (resume_missing or not self.missing_messages):
+            return self.resume_number_before_str + 1
+        return self.resume_number_before_str
+
+    def to_dict(self):
+        """Returns the timeline of the cycle, as written to the reports"""
+        return {
+            "phases": {
+                name: {"target_timestamp": phase.target_timestamp, "host_timestamp": phase.host_timestamp}
+                for name, phase in sorted(self.phases.items(), key=lambda item: STR_PHASES.index(item[0]))
+            },
+            "latencies_in_seconds": self.phase_latencies(),
+        }
 
 
 def check_network_down_during_str(max_time=MAX_TIME_TO_GET_INTO_STR):
@@ -50,20 +207,15 @@ def check_network_down_during_str(max_time=MAX_TIME_TO_GET_INTO_STR):
     :returns bool: True, if target network is down, False otherwise
     """
     logger.info(f"Starting {max_time} second(s) timeout to check if network is down")
-    timer = TimeoutCondition(max_time)
-    while timer:
-        time.sleep(1)
-        if not lf.is_alive():
-            logger.debug(f"Target network is down after {timer.time_elapsed}, Timeout was set to {max_time}")
-            return True
-    else:
-        return False
+    # Only polled, the DLT connection goes down together with the network
+    return wait_until(lambda: not lf.is_alive(), max_time, name="network_down_during_str", max_interval=1)
 
 
-def enter_str(test, missing_messages=[], fail_messages=[]):
+def enter_str(test, missing_messages=[], fail_messages=[], phases=None):
     """Enter STR and wait for the ECU to be asleep
     :param TestBase test: instance of the test class
     :param list missing_messages: var to store missing message in case target does not enter in PARKEN state
+    :param dict phases: var to store the STRPhase of the PARKEN DLT message
     :returns tupple (
         target_uptime_before_str(float): /proc/uptime of the target before STR,
         worker_timestamp_before_str(float): last recorded timestamp of Worker before STR
@@ -90,6 +242,8 @@ def enter_str(test, missing_messages=[], fail_messages=[]):
             else:
                 logger.info(f"Vehicle State changed to PARKEN: {parken_msg[-1].payload_decoded}")
                 worker_timestamp_before_str = parken_msg[-1].storage_timestamp
+                if phases is not None:
+                    phases["entering_parken"] = get_str_phase("entering_parken", parken_msg[-1])
                 ret = test.mtee_target.execute_command("cat /proc/uptime", shell=True)
                 target_uptime_before_str = float(ret.stdout.split()[0])
 
@@ -108,10 +262,11 @@ def enter_str(test, missing_messages=[], fail_messages=[]):
     return target_uptime_before_str, worker_timestamp_before_str
 
 
-def exit_str(test, missing_messages):
+def exit_str(test, missing_messages, phases=None):
     """Resume from STR and restores SSH connection
     :param TestBase test: instance of the test class
     :param list missing_messages: var to store missing message in case target does not enter in WOHNEN state
+    :param dict phases: var to store the STRPhase of the WOHNEN DLT message
     :returns tuple (
         target_uptime_after_str(float): /proc/uptime of the target after STR,
         worker_timestamp_after_str(float): last recorded timestamp of Worker after STR
@@ -135,6 +290,8 @@ def exit_str(test, missing_messages):
         else:
             logger.info(f"Vehicle State changed to WOHNEN: {wohnen_msg[-1].payload_decoded}")
             worker_timestamp_after_str = wohnen_msg[-1].storage_timestamp
+            if phases is not None:
+                phases["entering_wohnen"] = get_str_phase("entering_wohnen", wohnen_msg[-1])
             ret = test.mtee_target.execute_command("cat /proc/uptime", shell=True)
             target_uptime_after_str = float(ret.stdout.split()[0])
 
@@ -181,6 +338,109 @@ def get_str_state(test):
     return str_state
 
 
+class STRFailureWatcher(object):
+    """Watches the service failures and coredumps during a whole STR cycle, on a background thread
+
+    Whitelisted services are discarded as their messages arrive. After resuming, a single grace period is waited
+    for the failures raised by the resume itself, instead of waiting for each failure message one after another.
+
+        with STRFailureWatcher(test.mtee_target.connectors.dlt.broker, services_whitelist=whitelist) as watcher:
+            ...  # enter and exit STR
+            watcher.start_grace_period()
+            ...  # resume verifications
+            fail_messages = watcher.wait_for_failures()
+    """
+
+    def __init__(
+        self,
+        dlt_broker,
+        failure_messages=STR_FAILURE_MESSAGES,
+        services_whitelist=None,
+        grace_period=STR_FAILURE_GRACE_PERIOD,
+        poll_interval=STR_FAILURE_POLL_INTERVAL,
+    ):
+        """
+        :param dlt_broker: DLT broker of the target
+        :param dict failure_messages: regex of each failure, with the failing service/process as first group
+        :param list services_whitelist: services/processes whose failures are ignored
+        :param grace_period: time to keep watching after resuming from STR (seconds)
+        :param poll_interval: time to wait for new DLT messages on each poll (seconds)
+        """
+        self.dlt_broker = dlt_broker
+        self.failure_regexes = {item: re.compile(regex) for item, regex in failure_messages.items()}
+        self.services_whitelist = set(services_whitelist or [])
+        self.grace_period = grace_period
+        self.poll_interval = poll_interval
+        self.fail_messages = []
+        self._deadline = None
+        self._trace = None
+        self._stop_flag = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._trace = DLTContext(self.dlt_broker, filters=STR_FAILURE_FILTERS)
+        self._trace.__enter__()
+        self._thread = threading.Thread(target=self._watch, name="str_failure_watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop()
+        self._trace.__exit__(exc_type, exc_value, traceback)
+
+    def _stop(self):
+        self._stop_flag.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        failures_regex = re.compile("|".join(f"(?:{regex.pattern})" for regex in self.failure_regexes.values()))
+        while not self._stop_flag.is_set():
+            dlt_msgs = self._trace.wait_for(
+                attrs=dict(payload_decoded=failures_regex),
+                count=0,
+                drop=True,
+                timeout=self.poll_interval,
+                raise_on_timeout=False,
+            )
+            for msg in dlt_msgs or []:
+                self.process_message(msg)
+
+    def process_message(self, msg):
+        """Records the failure of a DLT message, unless its service is whitelisted"""
+        for item, regex in self.failure_regexes.items():
+            match = regex.search(msg.payload_decoded)
+            if not match:
+                continue
+            failing_service = match.group(1)
+            if failing_service in self.services_whitelist:
+                logger.info(f"Service {failing_service} is whitelisted, skipping service failure")
+                continue
+            fail_message = ": ".join((item, failing_service if failing_service else regex.pattern))
+            if fail_message not in self.fail_messages:
+                logger.info(f"STR failure detected: {msg.payload_decoded}")
+                self.fail_messages.append(fail_message)
+
+    def start_grace_period(self):
+        """Starts the grace period, to be called once the target resumed from STR"""
+        if self._deadline is None:
+            self._deadline = time.time() + self.grace_period
+
+    def wait_for_failures(self):
+        """Waits until the end of the grace period and stops watching
+
+        :return: list with the detected failures, as "<failure>: <service/process>" strings
+        """
+        self.start_grace_period()
+        remaining_time = self._deadline - time.time()
+        if remaining_time > 0:
+            logger.debug(f"Watching for STR failures for {remaining_time:.1f} more seconds")
+            time.sleep(remaining_time)
+        self._stop()
+        return list(self.fail_messages)
+
+
 def perform_str(
     test,
     expected_messages=STR_VERIFICATION_MESSAGES,
@@ -197,38 +457,35 @@ def perform_str(
     :param int iteration: STR Iteration count, default to 0
     :param int resume_number_before_str: Resume Number before performing STR, default to 0
     :param int resume_number_after_str: Resume Number after performing STR, default to 0
-    :returns tupple (
-        network_down (bool): True, if target's network is down,
-        resume_number_after_str (int): Resume Number detected in the respective DLT message after resuming from STR
-        str_duration (float): total time the target was suspended during the cycle
-        time_to_enter_str (float): time it took between target switching to PARKEN and Suspend DLT message coming up
-        time_to_exit_str (float): time it took between target switching to WOHNEN and Resume DLT message coming up
-        expected_cold_boot (bool): this value is set to True if in the current cycle we expected a cold boot to happen
-    )
+    :param list services_whitelist: services whose failures are ignored
+    :returns STRCycleResult: outcome of the cycle, with the network state, the Resume Number after STR,
+        the timeline of the cycle phases and its durations
+    :raises STRCycleError: if any missing message or failure was detected, with the STRCycleResult of the cycle
     """
-    entering_str_timestamp = 0
-    resume_msg_timestamp = 0
-    str_duration = 0
-    time_to_enter_str = 0
-    time_to_exit_str = 0
+    result = STRCycleResult(iteration, resume_number_before_str)
     worker_timestamp_before_str = 0
     resume_number_after_str = resume_number_before_str + 1
-    missing_msgs = []
-    fail_messages = []
-    resume_no_mismatch_msgs = []
-    timestamp_tolerance_exceeded_msgs = []
-    expected_cold_boot = False
+    missing_msgs = result.missing_messages
+    fail_messages = result.fail_messages
+    resume_no_mismatch_msgs = result.resume_number_mismatches
+    timestamp_tolerance_exceeded_msgs = result.timestamp_tolerance_messages
 
     logger.info("Starting STR Routine!")
 
     with DLTContext(
         test.mtee_target.connectors.dlt.broker,
         filters=[("NSM", None), ("NSG", None), ("CDM", None), ("RECM", None), ("VMC", "VMC")],
-    ) as trace:
+    ) as trace, STRFailureWatcher(
+        test.mtee_target.connectors.dlt.broker,
+        failure_messages=non_expected_messages,
+        services_whitelist=services_whitelist,
+    ) as failure_watcher:
         try:
-            target_uptime_before_str, worker_timestamp_before_str = enter_str(test, missing_msgs, fail_messages)
-            network_down = check_network_down_during_str()
-            if network_down:
+            target_uptime_before_str, worker_timestamp_before_str = enter_str(
+                test, missing_msgs, fail_messages, phases=result.phases
+            )
+            result.network_down = check_network_down_during_str()
+            if result.network_down:
                 # Delay for ECU to suspend after Network down
                 time.sleep(10)
                 test.mtee_target.reset_connector_dlt_state()
@@ -236,7 +493,10 @@ def perform_str(
             with DLTContext(
                 test.mtee_target.connectors.dlt.broker, filters=[("NSM", None), ("NSG", None), ("VMC", "VMC")]
             ) as resume_trace:
-                target_uptime_after_str, worker_timestamp_after_str = exit_str(test, missing_msgs)
+                target_uptime_after_str, worker_timestamp_after_str = exit_str(
+                    test, missing_msgs, phases=result.phases
+                )
+                failure_watcher.start_grace_period()
                 test.mtee_target.wait_for_nsm_fully_operational()
 
                 # Check if Android VM was correctly resumed
@@ -249,6 +509,7 @@ def perform_str(
                     logger.info(
                         f"vm_control_resumed DLT message detected: {vm_control_resume_msg[-1].payload_decoded}"
                     )
+                    result.add_phase("vm_control_resumed", vm_control_resume_msg[-1])
 
                 # Check if 'Resume Number' DLT message came up after target switching to WOHNEN
                 resume_msg = check_dlt_trace(resume_trace, rgx=expected_messages["resume_number"], timeout=60)
@@ -258,16 +519,15 @@ def perform_str(
                     # Store the number present in 'Resume Number' DLT message
                     match = re.search(expected_messages["resume_number"], resume_msg[-1].payload_decoded)
                     logger.info(f"resume_number DLT message detected: {resume_msg[-1].payload_decoded}")
+                    result.add_phase("resume_number", resume_msg[-1])
                     current_resume_no = get_str_resume_number(match)
                     if resume_number_after_str == MAX_SUCCESSIVE_STR_CYCLES_BEFORE_COLD_BOOT:
                         expected_resume_no = 0
-                        expected_cold_boot = True
+                        result.expected_cold_boot = True
                     else:
                         expected_resume_no = resume_number_after_str
-
-                    # Store the time it took to Resume after target switching to WOHNEN
-                    resume_msg_timestamp = resume_msg[-1].storage_timestamp
-                    time_to_exit_str = resume_msg_timestamp - worker_timestamp_after_str
+                    result.current_resume_number = current_resume_no
+                    result.expected_resume_number = expected_resume_no
 
                     logger.debug(f"At iteration {iteration}:")
                     logger.debug(f"Current Resume Number: {current_resume_no}")
@@ -315,6 +575,7 @@ def perform_str(
                     logger.info(
                         f"vm_control_suspended DLT message detected: {vm_control_suspended_msg[-1].payload_decoded}"
                     )
+                    result.add_phase("vm_control_suspended", vm_control_suspended_msg[-1])
                 else:
                     missing_msgs.append(f"vm_control_suspended: {expected_messages['vm_control_suspended']}")
 
@@ -322,50 +583,27 @@ def perform_str(
                 entering_str_msg = check_dlt_trace(trace, rgx=expected_messages["entering_str"])
                 if entering_str_msg:
                     logger.info(f"entering_str DLT message detected: {entering_str_msg[-1].payload_decoded}")
-                    # Store the time it took to Suspend after target switching to PARKEN
-                    entering_str_timestamp = entering_str_msg[-1].storage_timestamp
-                    time_to_enter_str = entering_str_timestamp - worker_timestamp_before_str
+                    result.add_phase("entering_str", entering_str_msg[-1])
                 else:
                     missing_msgs.append(f"entering_str: {expected_messages['entering_str']}")
 
-                # Total time target spent in 'Suspended' state
-                str_duration = resume_msg_timestamp - entering_str_timestamp
-
-                # Check for service failures or coredumps detected, during or after STR
-                for item, message in non_expected_messages.items():
-                    timeout = SERVICE_FAILURE_TIMEOUT if item == "service_failure" else COREDUMP_TIMEOUT
-                    # Check if any of the DLT regex's present in "STR_FAILURE_MESSAGES" are detected
-                    msg = check_dlt_trace(trace, rgx=message, timeout=timeout)
-                    if msg:
-                        match = re.search(message, msg[-1].payload_decoded)
-                        if match.group(1) in services_whitelist:
-                            logger.info(f"Service {match.group(1)} is whitelisted, skipping service failure")
-                            continue
-                        fail_messages.append(": ".join((item, match.group(1) if match.group(1) else message)))
-
-        # If any missing message or failure was detected during or after the STR cycle,
-        # we raise an Error message featuring all the detected errors
-        if missing_msgs or fail_messages or resume_no_mismatch_msgs or timestamp_tolerance_exceeded_msgs:
-            raise AssertionError(
-                f"Missing log: {missing_msgs} | Fail log: {fail_messages} | "
-                f"Resume Number Mismatch log: {resume_no_mismatch_msgs} | "
-                f"Timestamp tolerance log: {timestamp_tolerance_exceeded_msgs}"
-            )
+                # Collect the service failures or coredumps detected during the cycle, or after resuming
+                fail_messages.extend(failure_watcher.wait_for_failures())
 
         # If we detect an expected cold boot, resume_number_after_str var has to be updated before returning otherwise
         # we will be expecting Resume Number = MAX_SUCCESSIVE_STR_CYCLES_BEFORE_COLD_BOOT + 1 in the next cycle
-        if expected_cold_boot and current_resume_no == expected_resume_no:
-            resume_number_after_str = current_resume_no
+        if result.expected_cold_boot and result.current_resume_number == result.expected_resume_number:
+            resume_number_after_str = result.current_resume_number
+        result.resume_number = resume_number_after_str
+        logger.info(f"STR cycle {iteration} timeline: {result.to_dict()}")
+
+        # If any missing message or failure was detected during or after the STR cycle,
+        # we raise an Error message featuring all the detected errors
+        if not result.is_success:
+            raise STRCycleError(result)
 
         # If no errors were detected during the cycle, we return the cycle statistics for further reporting
-        return (
-            network_down,
-            resume_number_after_str,
-            str_duration,
-            time_to_enter_str,
-            time_to_exit_str,
-            expected_cold_boot,
-        )
+        return result
 
 
 def set_str_state_and_reboot_target(test, state):
@@ -384,6 +622,36 @@ def set_str_state_and_reboot_target(test, state):
     test.mtee_target.wait_for_nsm_fully_operational()
 
 
+def find_black_hud_after_str(test, screenshot_path):
+    """Takes the screenshots of all the HUDs after STR and returns the first one showing a black image
+
+    With RAW_SCREENSHOT_CAPTURE=1 all the HUDs are captured at the same time and checked in memory, see
+    capture_displays. If the raw capture fails, the screenshots are taken one by one as PNG.
+    :param screenshot_path str: Folder where the screenshots will be saved
+    :return: (display name, screenshot path) of the black HUD, or None if all the HUDs show content
+    """
+    if RAW_SCREENSHOT_CAPTURE:
+        try:
+            test.apinext_target.wait_for_boot_completed_flag()
+            hud_captures = capture_displays(
+                LIST_HUD_DISPLAY_ID,
+                screenshot_path,
+                file_suffix="_after_str",
+                persist_all=True,
+                serial=test.apinext_target.get_android_serial_number(),
+            )
+            black_huds = [(capture.name, capture.file_path) for capture in hud_captures.values() if capture.is_black]
+            return black_huds[0] if black_huds else None
+        except Exception as e:
+            logger.warning(f"Failed to capture the HUDs as raw framebuffers, taking them as PNG. Error: {e}")
+
+    for display, id in LIST_HUD_DISPLAY_ID.items():
+        hud_screenshot_path = test.take_apinext_target_screenshot(screenshot_path, display + "_after_str", id)
+        if check_if_image_is_fully_black(hud_screenshot_path):
+            return display, hud_screenshot_path
+    return None
+
+
 def str_post_check_validations(test, network_down, screenshot_dir):
     """Post checks to perform after STR cycle
     :param network_down bool: True if network was down during STR cycle, False otherwise
@@ -408,20 +676,17 @@ def str_post_check_validations(test, network_down, screenshot_dir):
                 f"Screenshot can be checked at: {screenshot_path}/launcher_focused_after_str.png"
             )
         # Ensure all HUD's screenshots taken after STR show content
-        for display, id in LIST_HUD_DISPLAY_ID.items():
-            test.take_apinext_target_screenshot(screenshot_path, display + "_after_str", id)
-            hud_screenshot_path = os.path.join(screenshot_path, display + "_after_str.png")
-            error_msg = (
-                f"'{display}' display does not show content after STR. "
-                f"Screenshot can be checked at: {hud_screenshot_path}"
+        black_hud = find_black_hud_after_str(test, screenshot_path)
+        if black_hud:
+            # If a black image is detected, a cold boot is performed
+            test.mtee_target.reboot(prefer_softreboot=False)
+            test.mtee_target.wait_for_nsm_fully_operational()
+            test.apinext_target.wait_for_boot_completed_flag()
+            wait_for_all_widgets_drawn(test)
+            raise AssertionError(
+                f"'{black_hud[0]}' display does not show content after STR. "
+                f"Screenshot can be checked at: {black_hud[1]}"
             )
-            if check_if_image_is_fully_black(hud_screenshot_path):
-                # If a black image is detected, a cold boot is performed
-                test.mtee_target.reboot(prefer_softreboot=False)
-                test.mtee_target.wait_for_nsm_fully_operational()
-                test.apinext_target.wait_for_boot_completed_flag()
-                wait_for_all_widgets_drawn(test)
-                raise AssertionError(error_msg)
 
         # Check if target's network was down during the STR cycle
         assert network_down, "Network was not down during STR!"
@@ -0,0 +1,139 @@
+# Copyright (C) 2025. BMW CTW PT. All rights reserved.
+"""Persistent cache of the target facts discovered by TestBase.setup_base_class
+
+Facts like the generation, the build branch or the android launcher activities only change when a new build is
+flashed, or when the target is coded again. They are stored in 'extracted_files/target_facts.json', so the following
+test classes (and following runs pointing TARGET_FACTS_CACHE_DIR to the same folder) load them instead of
+discovering them again.
+
+Each entry is keyed by the target identity (VIN and android serial number) and by the build ID, a hash of the target
+'/etc/os-release'. A different target or a different flashed build never reads the facts of another one.
+The flashing and coding helpers invalidate the entries of the VIN they act on, because coding, or flashing the same
+build again, does not change the key.
+"""
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+TARGET_FACTS_FILE_NAME = "target_facts.json"
+# Optional folder shared between runs. By default the cache is stored in the run 'extracted_files' folder.
+TARGET_FACTS_CACHE_DIR = os.getenv("TARGET_FACTS_CACHE_DIR")
+
+# Cache files used by this process, so that flashing and coding helpers can invalidate them by VIN
+_known_cache_paths = set()
+
+
+def get_build_id(os_release):
+    """Returns the build ID of a target, given the content of its '/etc/os-release' file"""
+    return hashlib.sha256(os_release.strip().encode()).hexdigest()
+
+
+def get_target_key(vin, serial, build_id):
+    """Returns the key of the facts of a target identity and flashed build
+
+    :param str vin: target vehicle identifier number
+    :param str serial: android serial number of the target, None if android is not available
+    :param str build_id: ID of the build currently flashed, see get_build_id
+    """
+    return hashlib.sha256(f"{vin}:{serial}:{build_id}".encode()).hexdigest()
+
+
+def get_target_facts_cache_path(result_dir):
+    """Returns the path of the target facts cache file for a run result dir"""
+    cache_dir = TARGET_FACTS_CACHE_DIR or os.path.join(result_dir, "extracted_files")
+    cache_path = os.path.join(cache_dir, TARGET_FACTS_FILE_NAME)
+    _known_cache_paths.add(cache_path)
+    return cache_path
+
+
+def invalidate_target_facts(vin=None):
+    """Removes the cached facts of a VIN from every target facts cache used by this process
+
+    Called by the flashing and coding helpers, which change the facts without changing the cache key.
+
+    :param str vin: target vehicle identifier number, None to remove the facts of every target
+    """
+    cache_paths = set(_known_cache_paths)
+    if TARGET_FACTS_CACHE_DIR:
+        cache_paths.add(os.path.join(TARGET_FACTS_CACHE_DIR, TARGET_FACTS_FILE_NAME))
+    for cache_path in cache_paths:
+        TargetFactsCache(cache_path).invalidate(vin)
+
+
+class TargetFactsCache(object):
+    """Target facts stored on a json file, keyed by target identity and flashed build"""
+
+    def __init__(self, cache_path):
+        """
+        :param str cache_path: path of the json file where the facts are stored
+        """
+        self.cache_path = cache_path
+
+    def _read(self):
+        try:
+            with open(self.cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            logger.warning(f"Ignoring invalid target facts cache '{self.cache_path}': {error}")
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _write(self, cache):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temporary_path = self.cache_path + ".tmp"
+        with open(temporary_path, "w") as cache_file:
+            json.dump(cache, cache_file, indent=4)
+        os.replace(temporary_path, self.cache_path)
+
+    def load(self, vin, serial, build_id):
+        """Returns the facts stored for a target and flashed build
+
+        :param str vin: target vehicle identifier number
+        :param str serial: android serial number of the target
+        :param str build_id: ID of the build currently flashed, see get_build_id
+        :return: dict with the stored facts, empty if there are none for this target and build
+        """
+        entry = self._read().get(get_target_key(vin, serial, build_id), {})
+        return entry.get("facts", {})
+
+    def update(self, vin, serial, build_id, **facts):
+        """Stores facts of a target and flashed build, keeping the facts already stored for them
+
+        The entries of the same VIN and serial on another build are dropped, they can not be valid anymore.
+
+        :param str vin: target vehicle identifier number
+        :param str serial: android serial number of the target
+        :param str build_id: ID of the build the facts were collected on
+        :param facts: facts to store, they must be json serializable
+        """
+        cache = self._read()
+        key = get_target_key(vin, serial, build_id)
+        stored_facts = cache.get(key, {}).get("facts", {})
+        stored_facts.update(facts)
+        cache = {
+            entry_key: entry
+            for entry_key, entry in cache.items()
+            if (entry.get("vin"), entry.get("serial")) != (vin, serial)
+        }
+        cache[key] = {"vin": vin, "serial": serial, "build_id": build_id, "facts": stored_facts}
+        self._write(cache)
+
+    def invalidate(self, vin=None):
+        """Removes the stored facts of a VIN, e.g. after flashing or coding the target
+
+        :param str vin: target vehicle identifier number, None to remove the facts of every target
+        """
+        cache = self._read()
+        kept = {key: entry for key, entry in cache.items() if vin is not None and entry.get("vin") != vin}
+        if len(kept) == len(cache):
+            return
+        logger.info(f"Invalidating target facts of VIN '{vin or 'all'}' in cache '{self.cache_path}'")
+        if kept:
+            self._write(kept)
+        else:
+            os.remove(self.cache_path)
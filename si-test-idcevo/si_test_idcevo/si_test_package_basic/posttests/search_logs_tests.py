@@ -63,7 +63,7 @@ class SearchDLTLogsPostTest(object):
                 :return: assert if encountered at least one DLT log for each lifecycle
                 """
 
-                logs_found = self.dlt_logs_handler.parse_dlt_logs(config)
+                logs_found = self.dlt_logs_matcher.get_logs_found(test_name)
                 patterns_not_found = ""
                 logs_found_list = []
                 for pattern, list_lifecycles_found in logs_found.items():
@@ -103,3 +103,5 @@ class SearchDLTLogsPostTest(object):
         # gets list containing all csv files path
         cls.files_path = csv_handler.get_csv_files_path(lifecyle_full_path)
         cls.dlt_logs_handler = DLTLogsHandler(logger, cls.files_path)
+        # All the generated tests are answered by a single scan of the DLT logs
+        cls.dlt_logs_matcher = cls.dlt_logs_handler.get_pattern_matcher(DLT_LOG_VERIFICATION)
@@ -14,6 +14,8 @@ from mtee.testing.tools import metadata
 from mtee_apinext.plugins.android_target import AndroidTarget
 from mtee_apinext.targets import TargetShare
 from nose.plugins.skip import SkipTest
+from si_test_idcevo.si_test_helpers.adb_delta_pull import CRASH_ARTIFACTS_DELTA_PULL, delta_pull
+from si_test_idcevo.si_test_helpers.crash_id_helpers import CrashIdEngine, get_crash_id_cache_path
 
 MTEE_TARGET_MANAGER_IP = "localhost"
 MTEE_TARGET_MANAGER_PORT = 5005
@@ -87,9 +89,11 @@ class StabilityPostTest(object):
         else:
             _crash_parser_script = os.path.abspath(os.path.join(THIS_DIR, "apinext-crash-parser.py"))
 
-        cls.crash_parser = sh.Command(_crash_parser_script).bake("--crash-id")
-
         os.makedirs(cls.host_crash_artifacts_dir, exist_ok=True)
+        # The crash IDs are computed in parallel, and cached by artifact content between tests and runs
+        cls.crash_id_engine = CrashIdEngine(
+            _crash_parser_script, get_crash_id_cache_path(cls.host_crash_artifacts_dir)
+        )
         # Prioritize ENV variable otherwise search for default file
         whitelisted_crashes = os.environ.get("WHITELISTED_CRASHES")
         if not whitelisted_crashes and os.path.isfile(DEFAULT_WHITELISTED_CRASHES):
@@ -196,6 +200,16 @@ class StabilityPostTest(object):
         :param source: The path on the target that is to be pulled
         :param destination: Where on the test host to pull
         """
+        if CRASH_ARTIFACTS_DELTA_PULL:
+            # Only the files new or changed since the previous pull are transferred
+            # 'destination' is either the local copy of 'source' or the directory where it is created, as on adb pull
+            local_dir = destination
+            if os.path.basename(os.path.normpath(destination)) != os.path.basename(os.path.normpath(source)):
+                local_dir = os.path.join(destination, os.path.basename(os.path.normpath(source)))
+            try:
+                return delta_pull(self.target, source, local_dir, with_root=self.target.file_transfer_requires_root)
+            except Exception as error:
+                logger.info(f"Delta pull of '{source}' failed, pulling the full directory: {error}")
         try:
             return self.target.pull(source, destination)
         except sh.ErrorReturnCode_1 as err:
@@ -297,6 +311,7 @@ class StabilityPostTest(object):
                 anr_list = glob.glob(os.path.join(self.host_anr_dir, "anr_*"))
             else:
                 anr_list = anr_found
+            self.crash_id_engine.compute([(anr_file, "ANR") for anr_file in anr_list])
             for anr_file in anr_list:
                 crash_parser_output = self._create_crash_id(
                     crash_path=anr_file,
@@ -348,6 +363,12 @@ class StabilityPostTest(object):
         crashes_detected = self._check_crash_logs()
         if not crashes_detected:
             return
+        self.crash_id_engine.compute(
+            [
+                (os.path.abspath(os.path.join(self.host_crash_log_dir, crash_log_dir)), None)
+                for crash_log_dir in os.listdir(self.host_crash_log_dir)
+            ]
+        )
         for crash_log_dir in os.listdir(self.host_crash_log_dir):
             log_dir_abs = os.path.abspath(os.path.join(self.host_crash_log_dir, crash_log_dir))
             # if the target is MGUPP it's historic, right  ?
@@ -428,29 +449,18 @@ class StabilityPostTest(object):
         """
         crash_id_dir = crash_path if os.path.isdir(crash_path) else os.path.dirname(crash_path)
         crash_id_file = os.path.join(crash_id_dir, crash_id_file_name)
-        try:
-            # create the crashID file and store the result in a local variable
-            crash_parser_output = (
-                self.crash_parser(crash_path, "--crash-type", crash_type)
-                if crash_type
-                else self.crash_parser(crash_path)
-            )
-            output = str(crash_parser_output.stdout, "utf-8")
-            logger.debug("Computed crash_parser_output: %s", output)
-            crash_id = str(crash_parser_output.stdout, "utf-8").split(",")[0]
-            logger.debug("Computed crash_id found: %s ", crash_id)
-            with open(crash_id_file, mode="w") as _crash_id_file:
-                _crash_id_file.write(crash_id)
-            # crash_id is initially a completed command item, let's convert it to a string
-            # the stdout property of the completed command object
-            return str(crash_parser_output.stdout, "utf-8")
-        except sh.ErrorReturnCode as crash_id_err:
-            logger.warning("Could not compute crash id from %s", crash_path)
-            logger.debug("Creating the crash ID failed with: %s", crash_id_err)
-            logger.debug("Stderr: %s", crash_id_err.stderr)
-
+        # The output is usually precomputed in parallel for all the artifacts of a test, see CrashIdEngine.compute
+        crash_parser_output = self.crash_id_engine.get(crash_path, crash_type)
+        if crash_parser_output is None:
             return None
 
+        logger.debug("Computed crash_parser_output: %s", crash_parser_output)
+        crash_id = crash_parser_output.split(",")[0]
+        logger.debug("Computed crash_id found: %s ", crash_id)
+        with open(crash_id_file, mode="w") as _crash_id_file:
+            _crash_id_file.write(crash_id)
+        return crash_parser_output
+
     def test_tombstones(self):
         if self.user_build and self.target.product_type == "bmw_rse22_ext":
             raise SkipTest("Skipping Tombstones check as root access is not possible and target is Extension board")
@@ -487,6 +497,15 @@ class StabilityPostTest(object):
             )
 
             # try to hash and check the crash whitelist for some of the tombstone hashes
+            self.crash_id_engine.compute(
+                [
+                    (
+                        os.path.abspath(os.path.join(self.host_crash_artifacts_dir, "tombstones", tombstone)),
+                        "TOMBSTONE",
+                    )
+                    for tombstone in self.not_whitelisted_tombstones
+                ]
+            )
             for tombstone in self.not_whitelisted_tombstones:
                 crash_id_filename = os.path.basename(tombstone) + ".mtee.crashid.txt"
                 crash_parser_output = self._create_crash_id(
@@ -10,11 +10,11 @@ from mtee.testing.support.target_share import TargetShare as TargetShareMTEE
 from mtee.testing.tools import assert_process_returncode, assert_true, metadata, run_command
 from mtee_idcevo.pre_test_validator import PreTestVerification
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
+from si_test_idcevo.si_test_helpers.pdx_helpers import is_application_mode
 from tee.const import SFA_FEATURE_IDS
 from tee.target_common import VehicleCondition
 from tee.tools.secure_modes import SecureECUMode
 from tee.tools.sfa_utils import SFAHandler
-from validation_utils.utils import TimeoutCondition
 
 logger = logging.getLogger(__name__)
 generation = "25"
@@ -44,14 +44,7 @@ class TestGen25PDX:
         cls.test.teardown_base_class()
 
     def is_application_mode(self, timeout):
-        command = ["systemctl", "is-active", "application.target"]
-        timer = TimeoutCondition(timeout)
-        while timer:
-            return_stdout, _, return_code = self.test.mtee_target.execute_command(command)
-            if return_code == 0 and return_stdout == "active":
-                return True
-        else:
-            return False
+        return is_application_mode(self.test, timeout)
 
     def setup(self):
         self.test.take_apinext_target_screenshot(
@@ -10,7 +10,12 @@ from mtee.testing.connectors.connector_dlt import DLTContext
 from mtee.testing.tools import metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
 from si_test_idcevo.si_test_helpers.csv_handlers import CSVHandler
-from si_test_idcevo.si_test_helpers.kpi_handlers import process_kpi_value
+from si_test_idcevo.si_test_helpers.kpi_handlers import (
+    StreamingKPICollector,
+    get_specific_kpi_threshold,
+    process_kpi_value,
+)
+from si_test_idcevo.si_test_helpers.kpi_statistics import KPI_ADAPTIVE_REBOOTS, SequentialKPISampler
 from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
 from si_test_idcevo.si_test_helpers.report_helpers import MultipleRebootsKPIsReporter
 
@@ -79,33 +84,33 @@ class TestsMultipleDLTKPIS(object):
         Steps:
             - Reboot Target inside DLTContext
             - Get all DLT filters
-            - Open Multi DLT wait for with filters
+            - Collect the KPIs while the DLT messages arrive, until all are found or the timeout expires
             - At the end, all metrics should be reported
             - Resume after reboot
             - Repeat as many times as required
-            - Generate a report with relevant information
+            - Generate a report with relevant information, including the statistics of each KPI
         Note: Amount of reboots is equal to the max amount of reboots requested by
         a metric in kpi_metrics_config.py.
+        With KPI_ADAPTIVE_REBOOTS=1, the reboots stop earlier once the confidence interval of every KPI is
+        tighter than KPI_CI_TOLERANCE, or clearly above or below its threshold.
         Success - if all the metrics were processed and reported
         Failure - if some metric failed to be processed
         """
 
-        kpi_filters_dict = []
         processed_kpis = defaultdict(list)
-        dlt_filters = []
-        for name, config in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.items():
-            # Collect all the DLT filters into a list of tuples and remove duplicates
-            kpi_filters_dict.append(
-                {"apid": config["apid"], "ctid": config["ctid"], "payload_decoded": config["pattern"]}
-            )
-            dlt_filters.append((config["apid"], config["ctid"]))
-            dlt_filters = list(set(dlt_filters))
-
+        for name in MULTIPLE_REBOOTS_DLT_KPI_CONFIG:
             # Initialize processed kpis dictionary
             processed_kpis[name] = {"reboot_number": [], "value": []}
 
         # Find number of reboots to do (biggest amount of reboots in config file)
         reboots_amount = max(int(config["reboots"]) for config in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.values())
+        kpi_sampler = SequentialKPISampler(
+            {name: config["reboots"] for name, config in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.items()},
+            kpi_thresholds={
+                name: get_specific_kpi_threshold(config["metric"], self.kpi_thresholds)
+                for name, config in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.items()
+            },
+        )
         for reboot_counter in range(1, reboots_amount + 1):
 
             # Wait for previous reboot to finish, in case it hasn't
@@ -114,35 +119,21 @@ class TestsMultipleDLTKPIS(object):
                 self.test.mtee_target.reboot(prefer_softreboot=False)
                 wait_for_application_target(self.test.mtee_target)
 
-            with DLTContext(self.test.mtee_target.connectors.dlt.broker, filters=dlt_filters) as trace:
+            kpi_collector = StreamingKPICollector(
+                MULTIPLE_REBOOTS_DLT_KPI_CONFIG,
+                on_kpi_collected=lambda name, kpi_value, config: process_kpi_value(
+                    kpi_value, config, self.csv_handler, self.kpi_thresholds
+                ),
+            )
+            with DLTContext(self.test.mtee_target.connectors.dlt.broker, filters=kpi_collector.dlt_filters) as trace:
                 logger.debug(f"Performing reboot number: {reboot_counter}")
                 self.test.mtee_target.reboot(prefer_softreboot=True)
-                dlt_msgs = trace.wait_for_multi_filters(
-                    filters=kpi_filters_dict,
-                    drop=True,
-                    count=0,
-                    timeout=KPI_COLLECTION_TIMEOUT,
-                )
+                kpi_collector.collect(trace, grace_period=KPI_COLLECTION_TIMEOUT)
                 self.test.mtee_target.resume_after_reboot()
 
-            for name, config in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.items():
-                for msg in dlt_msgs:
-                    if name in processed_kpis and reboot_counter in processed_kpis[name]["reboot_number"]:
-                        # Only the first occurrence of each metric is to be processed
-                        break
-
-                    match = config["pattern"].search(msg.payload_decoded)
-
-                    if match and config["type"] == "msg_tmsp":
-                        process_kpi_value(msg.tmsp, config, self.csv_handler, self.kpi_thresholds)
-                        processed_kpis[name]["reboot_number"].extend([reboot_counter])
-                        processed_kpis[name]["value"].extend([msg.tmsp])
-
-                    elif match and config["type"] == "regex_group":
-                        kpi_value = float(match.group(1))
-                        process_kpi_value(kpi_value, config, self.csv_handler, self.kpi_thresholds)
-                        processed_kpis[name]["reboot_number"].extend([reboot_counter])
-                        processed_kpis[name]["value"].extend([kpi_value])
+            for name, kpi_value in kpi_collector.processed_kpis.items():
+                processed_kpis[name]["reboot_number"].extend([reboot_counter])
+                processed_kpis[name]["value"].extend([kpi_value])
 
             reboot_summary = defaultdict(list)
             for name, _ in MULTIPLE_REBOOTS_DLT_KPI_CONFIG.items():
@@ -155,27 +146,33 @@ class TestsMultipleDLTKPIS(object):
                 reboot_summary,
             )
 
-        # Create a dictionary with the reboots that are not present in processed_kpis for displaying
-        not_processed_kpis = {
-            name: [num for num in range(1, reboots_amount + 1) if num not in processed_kpis[name]["reboot_number"]]
-            for name in processed_kpis
-        }
-        # Filter out empty values from not_processed_kpis
-        not_processed_kpis = {name: value for name, value in not_processed_kpis.items() if value}
+            kpi_sampler.add_samples(kpi_collector.processed_kpis)
+            if KPI_ADAPTIVE_REBOOTS and reboot_counter < reboots_amount and kpi_sampler.should_stop():
+                logger.info(f"Stopping after {reboot_counter} of {reboots_amount} reboots, all KPIs are known")
+                self.reporter.stopped_early = True
+                break
+        reboots_performed = kpi_sampler.reboots
+
+        kpi_statistics = kpi_sampler.statistics()
+        for name, statistics in kpi_statistics.items():
+            metric_logger.publish(
+                {
+                    "name": "generic_kpi_statistics",
+                    "kpi_name": MULTIPLE_REBOOTS_DLT_KPI_CONFIG[name]["metric"],
+                    **statistics,
+                }
+            )
 
-        total_kpis_found = sum(len(config["reboot_number"]) for _, config in processed_kpis.items())
-        total_kpis_not_found = len(MULTIPLE_REBOOTS_DLT_KPI_CONFIG) * reboots_amount - total_kpis_found
+        total_kpis_found = self.reporter.values_collected_amount
 
-        # Add summary entries to reporter
+        # Add summary entries to reporter, the found and missing KPIs are counted by the reporter on each reboot
         self.reporter.reboots_amount = reboots_amount
         self.reporter.individual_KPIs_to_collect = len(MULTIPLE_REBOOTS_DLT_KPI_CONFIG)
-        self.reporter.values_collected_amount = total_kpis_found
-        self.reporter.values_not_collected_amount = total_kpis_not_found
-        self.reporter.missing_kpis = not_processed_kpis
+        self.reporter.kpi_statistics = kpi_statistics
         self.reporter.add_report_summary()
 
         logger.debug(f"total KPIs found: {total_kpis_found}")
         logger.debug(f"Found these KPIs: {processed_kpis}")
         assert (
-            total_kpis_found == len(MULTIPLE_REBOOTS_DLT_KPI_CONFIG) * reboots_amount
-        ), f"Failed to process the following KPIs in reboot number (check the report): {not_processed_kpis}"
+            total_kpis_found == len(MULTIPLE_REBOOTS_DLT_KPI_CONFIG) * reboots_performed
+        ), f"Failed to process the following KPIs in reboot number (check the report): {self.reporter.missing_kpis}"
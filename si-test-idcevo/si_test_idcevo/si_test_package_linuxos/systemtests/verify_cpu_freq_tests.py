@@ -7,6 +7,7 @@ from unittest import SkipTest
 
 from mtee.testing.tools import assert_equal, assert_true, metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
+from si_test_idcevo.si_test_helpers.remote_probe import RemoteProbe
 
 # Config parser reading data from config file.
 config = configparser.ConfigParser()
@@ -16,6 +17,7 @@ logger = logging.getLogger(__name__)
 DEFAULT_FREQ_CMD = "cat /sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_cur_freq"
 CUR_FREQ_CMD = "cat /sys/devices/platform/cpufreq/cur_freq"
 CPU_INFO_CMD = "cat /sys/devices/system/cpu/cpufreq/policy*/cpuinfo_cur_freq"
+SET_FREQ_CMD = "echo {cluster} {freq} > /sys/devices/platform/cpufreq/cur_freq"
 DEFAULT_MODE_FREQ = "2112000"
 EFFICIENT_MODE_FREQ = "1824000"
 THERMAL_MODE_FREQ = "1152000"
@@ -45,32 +47,48 @@ class TestsVerifyCpuFrequency(object):
         cls.test.setup_base_class(skip_setup_apinext=True)
         cls.target_type = cls.test.mtee_target.options.target
         cls.hw_revision = cls.test.mtee_target.options.hardware_revision
-        cls.default_cpu_freq, _, _ = cls.test.mtee_target.execute_command(DEFAULT_FREQ_CMD)
-        return_stdout, _, _ = cls.test.mtee_target.execute_command(CPU_INFO_CMD)
-        cls.clusters_frequencies = return_stdout.strip().splitlines()
+        probe_results = (
+            RemoteProbe(cls.test.mtee_target)
+            .add_command("default_freq", DEFAULT_FREQ_CMD)
+            .add_command("cpu_info", CPU_INFO_CMD)
+            .run()
+        )
+        cls.default_cpu_freq = probe_results["default_freq"].stdout.strip()
+        cls.clusters_frequencies = probe_results["cpu_info"].stdout.strip().splitlines()
         cls.total_no_clusters_avail = len(cls.clusters_frequencies)
 
     def teardown(self):
         logger.info("Verify default setting of CPU frequency is set to 'Boost Mode' to all clusters")
 
+        probe = RemoteProbe(self.test.mtee_target)
         for cluster_num in range(self.total_no_clusters_avail):
             if self.clusters_frequencies[cluster_num] == self.default_cpu_freq:
                 logger.debug(f"Default setting of CPU frequency for Cluster {cluster_num} is set to 'Boost Mode'")
             else:
-                set_freq_cmd = f"echo {cluster_num} {self.default_cpu_freq} > /sys/devices/platform/cpufreq/cur_freq"
-                self.test.mtee_target.execute_command(set_freq_cmd)
+                probe.add_command(cluster_num, SET_FREQ_CMD.format(cluster=cluster_num, freq=self.default_cpu_freq))
+        probe.run()
 
     def set_verify_cpu_freq_all_clusters(self, mode_freq):
         """
         Setting CPU Mode Frequency for different Clusters and verifying the set Mode Frequency
+        Setting and reading back the frequencies of each cluster is done in a single command (RemoteProbe)
         :param mode_freq: (int)Frequency Mode
         """
         for num in range(self.total_no_clusters_avail):
-            set_freq_cmd = f"echo {num} {mode_freq} > /sys/devices/platform/cpufreq/cur_freq"
-
-            self.test.mtee_target.execute_command(set_freq_cmd, expected_return_code=0)
+            probe_results = (
+                RemoteProbe(self.test.mtee_target)
+                .add_command("set_freq", SET_FREQ_CMD.format(cluster=num, freq=mode_freq))
+                .add_command("cur_freq", CUR_FREQ_CMD)
+                .add_command("cpu_info", CPU_INFO_CMD)
+                .run()
+            )
+            assert_equal(
+                probe_results["set_freq"].returncode,
+                0,
+                f"Failed to set frequency {mode_freq} for cluster {num}",
+            )
 
-            return_stdout, _, _ = self.test.mtee_target.execute_command(CUR_FREQ_CMD)
+            return_stdout = probe_results["cur_freq"].stdout
             total_current_freq = return_stdout.strip().splitlines()
             assert_equal(
                 total_current_freq[num],
@@ -78,7 +96,7 @@ class TestsVerifyCpuFrequency(object):
                 f"Got an unexpected output of current frequency for cluster {num}: {return_stdout}",
             )
 
-            return_stdout, _, _ = self.test.mtee_target.execute_command(CPU_INFO_CMD)
+            return_stdout = probe_results["cpu_info"].stdout
             total_cpu_info = return_stdout.strip().splitlines()
             assert_equal(
                 total_cpu_info[num],
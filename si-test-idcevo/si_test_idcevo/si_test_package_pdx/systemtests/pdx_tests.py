@@ -4,9 +4,8 @@
 import logging
 import os
 import sh
-import time  # noqa: AZ100
 
-from gen22_helpers.pdx_utils import PDXUtils
+from gen22_helpers.pdx_utils import PDXUtils  # noqa: AZ100
 from mtee.metric import MetricLogger
 from mtee.testing.tools import assert_equal, assert_true, metadata, run_command
 from si_test_idcevo.si_test_helpers.android_helpers import wait_for_all_widgets_drawn
@@ -20,13 +19,11 @@ from si_test_idcevo.si_test_helpers.pdx_helpers import (
     perform_mirror_pdx_flash,
     retrieve_svk,
 )
-from si_test_idcevo.si_test_helpers.reboot_handlers import (
-    wait_for_application_target,
-)
+from si_test_idcevo.si_test_helpers.readiness_waits import APPLICATION_TARGET_REACHED, get_dlt_broker, wait_until
+from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
 from tee.target_common import VehicleCondition
 from tee.tools.secure_modes import SecureECUMode
 from tee.tools.sfa_utils import SFAHandler
-from validation_utils.utils import TimeoutCondition
 
 logger = logging.getLogger(__name__)
 metric_logger = MetricLogger()
@@ -72,19 +69,22 @@ class TestGen25PDXflash:
 
     def wait_for_application_target(self, timeout=130):
         """Wait for application target to be active with timeout (defaults to 130s)"""
-        timeout_condition = TimeoutCondition(timeout)
-        while timeout_condition:
-            if self.is_application_mode():
-                logger.info(f"Target into application after {timeout_condition.time_elapsed}s")
-                metric_logger.publish(
-                    {
-                        "name": "node0_target",
-                        "kpi_name": "application_boot_time",
-                        "value": self.get_uptime(),
-                    }
-                )
-                return True
-            time.sleep(3)
+        if not wait_until(
+            self.is_application_mode,
+            timeout,
+            name="application_target_after_pdx_flash",
+            dlt_broker=get_dlt_broker(self.test.mtee_target),
+            marker=APPLICATION_TARGET_REACHED,
+        ):
+            return False
+        metric_logger.publish(
+            {
+                "name": "node0_target",
+                "kpi_name": "application_boot_time",
+                "value": self.get_uptime(),
+            }
+        )
+        return True
 
     def is_application_mode(self):
         return_stdout, _, return_code = self.test.mtee_target.execute_command(
@@ -268,5 +268,6 @@ class TestGen25PDXflash:
 
             logger.info("Coding the target")
             self.test.mtee_target.install_coding(enable_doip_protocol=True)
+            self.test.invalidate_target_facts()
         finally:
             self.test.mtee_target.switch_vehicle_to_state(VehicleCondition.FAHREN)
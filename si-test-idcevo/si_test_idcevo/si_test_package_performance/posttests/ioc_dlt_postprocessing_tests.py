@@ -12,6 +12,8 @@ from dlt import dlt
 from mtee.metric import MetricLogger
 from mtee.testing.tools import metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
+from si_test_idcevo.si_test_helpers.dlt_file_helpers import write_dlt_messages
+from si_test_idcevo.si_test_helpers.dlt_file_index import get_dlt_file_index
 
 config = configparser.ConfigParser()
 config.read(Path(__file__).parent.resolve() / "features_config.ini")
@@ -19,6 +21,10 @@ logger = logging.getLogger(__name__)
 
 metric_logger = MetricLogger()
 
+# Raw payloads searched on the IOC DLT file, only the messages containing them are loaded. Non verbose messages
+# only carry a message ID, so when none of them is found the whole file is decoded instead.
+SHUTDOWN_PAYLOADS = [rb"Type of shutdown received:", rb"SoC reached sleep state"]
+
 
 @metadata(testsuite=["SI", "SI-performance"])
 class IOCdltPostProcessingPostTest(object):
@@ -33,9 +39,20 @@ class IOCdltPostProcessingPostTest(object):
         )
         if not os.path.exists(cls.ioc_nonverbose_file_path):
             raise SkipTest("Unable to find IOC non verbose DLT file, skipping")
-        cls.ioc_dlt_msgs = dlt.load(cls.ioc_nonverbose_file_path)
+        ioc_dlt_index = get_dlt_file_index(cls.ioc_nonverbose_file_path)
+        shutdown_msgs = ioc_dlt_index.search_payloads(SHUTDOWN_PAYLOADS)
+        logger.info(f"IOC DLT contains: {ioc_dlt_index.message_count} messages, {len(shutdown_msgs)} shutdown related")
+
+        if shutdown_msgs:
+            cls.ioc_shutdown_msgs_file_path = os.path.join(
+                cls.test.mtee_target.options.result_dir, "serial_console_IOC_shutdown_msgs.dlt"
+            )
+            write_dlt_messages(cls.ioc_nonverbose_file_path, shutdown_msgs, cls.ioc_shutdown_msgs_file_path)
+            cls.ioc_dlt_msgs = dlt.load(cls.ioc_shutdown_msgs_file_path)
+        else:
+            logger.info("Shutdown payloads not found on the raw IOC DLT data, decoding all the messages")
+            cls.ioc_dlt_msgs = dlt.load(cls.ioc_nonverbose_file_path)
         cls.ioc_dlt_msgs.generate_index()
-        logger.info(f"IOC DLT contains: {cls.ioc_dlt_msgs.counter_total} messages")
 
     @metadata(
         testsuite=["SI", "SI-performance"],
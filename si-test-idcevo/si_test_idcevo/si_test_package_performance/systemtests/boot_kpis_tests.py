@@ -3,7 +3,6 @@ import configparser
 import copy
 import json
 import logging
-import re
 
 from pathlib import Path
 
@@ -12,6 +11,7 @@ from mtee.testing.connectors.connector_dlt import DLTContext
 from mtee.testing.test_environment import TEST_ENVIRONMENT as TE
 from mtee.testing.tools import metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
+from si_test_idcevo.si_test_helpers.kpi_handlers import BootMarkersKPICollector
 from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
 
 
@@ -53,44 +53,22 @@ class TestBootKPIs:
         cls.test.teardown_base_class()
 
     def setup_filters(self):
-        compiled_kpi_filters = [
-            {
-                "apid": boot_kpi["apid"],
-                "ctid": boot_kpi["ctid"],
-                "payload_decoded": re.compile(boot_kpi["RegExp"]),
-                "name": boot_kpi["Name"],
-            }
-            for boot_kpi in self.filter_file["config"]["markers"]
-            if boot_kpi["apid"] == WANTED_APID and boot_kpi["ctid"] == WANTED_CTID
-        ]
-        return compiled_kpi_filters
-
-    def analyze_found_kpis(self, dlt_msgs, compiled_kpi_filters):
-        boot_kpis_found = {}
+        self.boot_kpis_collector = BootMarkersKPICollector(
+            self.filter_file["config"]["markers"], apid=WANTED_APID, ctid=WANTED_CTID
+        )
+        return self.boot_kpis_collector.kpi_filters
 
+    def analyze_found_kpis(self, dlt_msgs):
         # Sort the messages by asceding order of message index
         dlt_msgs_sorted = sorted(dlt_msgs, key=lambda msg: msg.mcnt)
 
+        # Some KPIs will have duplicate entries in "dlt_msgs".
+        # Since the messages are sorted, only the last occurrence of each KPI is kept by the collector,
+        # which comes from the "Core 7" KPIs the last to get printed and containing all the KPIs we want to collect.
         for msg in dlt_msgs_sorted:
-            for kpi_regex in compiled_kpi_filters:
-                if match := kpi_regex["payload_decoded"].search(msg.payload_decoded):
-                    name = kpi_regex["name"].replace(" ", "_")
-                    # Some KPIs will have duplicate entries in "dlt_msgs".
-                    # Since the messages are sorted, and taking into account the line below,
-                    # only the last occurrence of each KPI will be stored, which comes from the "Core 7" KPIs
-                    # the last to get printed and containing all the KPIs we want to collect.
-                    if name:
-                        boot_kpis_found[name] = float(match.group(1))
-
-        boot_kpis_missing = [
-            marker["Name"].replace(" ", "_")
-            for marker in self.filter_file["config"]["markers"]
-            if marker["apid"] == WANTED_APID
-            and marker["ctid"] == WANTED_CTID
-            and marker["Name"].replace(" ", "_") not in boot_kpis_found.keys()
-        ]
-
-        return boot_kpis_found, boot_kpis_missing
+            self.boot_kpis_collector.process_message(msg)
+
+        return self.boot_kpis_collector.processed_kpis, self.boot_kpis_collector.missing_kpis
 
     @metadata(
         testsuite=["domain", "SI", "SI-performance"],
@@ -136,6 +114,6 @@ class TestBootKPIs:
             )
             self.test.mtee_target.resume_after_reboot()
 
-        boot_kpis_found, boot_kpis_missing = self.analyze_found_kpis(dlt_msgs, compiled_kpi_filters)
+        boot_kpis_found, boot_kpis_missing = self.analyze_found_kpis(dlt_msgs)
         metric_logger.publish({"name": "boot_kpis", **boot_kpis_found})
         assert not boot_kpis_missing, f"These boot KPIs are missing: {boot_kpis_missing}"
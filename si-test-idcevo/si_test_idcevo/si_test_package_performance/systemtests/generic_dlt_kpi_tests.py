@@ -11,7 +11,7 @@ from mtee.testing.tools import metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
 from si_test_idcevo.si_test_helpers.csv_handlers import CSVHandler
 from si_test_idcevo.si_test_helpers.diagnostic_helper import get_dtc_list
-from si_test_idcevo.si_test_helpers.kpi_handlers import process_kpi_value
+from si_test_idcevo.si_test_helpers.kpi_handlers import StreamingKPICollector, process_kpi_value
 from si_test_idcevo.si_test_helpers.reboot_handlers import wait_for_application_target
 
 try:
@@ -58,10 +58,6 @@ DISPLAY_METRICS = ["CID Ready Show Content", "PHUD Driver Ready Show Content"]
     },
 )
 class TestsGenericDLTKPIS(object):
-    dlt_filters = []
-    processed_kpis = {}  # {{name_kpi: kpi_value}, ... }
-    processed_multi_marker_kpis = {}  # {{name_kpi: kpi_value}, ... }
-
     @classmethod
     def setup_class(cls):
         cls.test = TestBase.get_instance()
@@ -80,6 +76,15 @@ class TestsGenericDLTKPIS(object):
                 cls.generic_kpis.pop(display_kpi, None)
                 cls.multi_marker_kpis.pop(display_kpi, None)
 
+        # KPIs and multi marker KPIs are processed as soon as they are collected
+        cls.kpi_collector = StreamingKPICollector(
+            cls.generic_kpis,
+            cls.multi_marker_kpis,
+            on_kpi_collected=lambda name, kpi_value, config: process_kpi_value(
+                kpi_value, config, cls.csv_handler, cls.kpi_thresholds
+            ),
+        )
+
     @classmethod
     def teardown_class(cls):
         """Test case teardown"""
@@ -90,7 +95,7 @@ class TestsGenericDLTKPIS(object):
         Steps:
             - Reboot Target
             - Get all DLT filters
-            - Open Multi DLT wait for with filters
+            - Collect the KPIs while the DLT messages arrive, until all are found or the timeout expires
             - At the end, all metrics should be reported.
             - Resume after reboot
         Note: All the metrics will be logged to the ECU log file and also
@@ -98,55 +103,23 @@ class TestsGenericDLTKPIS(object):
         Success - if all the metrics were processed and reported
         Failure - if some metric failed to be processed
         """
-        kpi_filters_dict = []
-        for _, config in self.generic_kpis.items():
-            kpi_filters_dict.append(
-                {"apid": config["apid"], "ctid": config["ctid"], "payload_decoded": config["pattern"]}
-            )
-
-            # Collect all the DLT filters into a list of tuples and remove duplicates
-            self.dlt_filters.append((config["apid"], config["ctid"]))
-            self.dlt_filters = list(set(self.dlt_filters))
-
         # Wait for previous reboot to finish, in case it hasn't
         # If it times out while waiting, force an hard reboot and wait
         if not wait_for_application_target(self.test.mtee_target):
             self.test.mtee_target.reboot(prefer_softreboot=False)
             wait_for_application_target(self.test.mtee_target)
 
-        with DLTContext(self.test.mtee_target.connectors.dlt.broker, filters=self.dlt_filters) as trace:
+        with DLTContext(self.test.mtee_target.connectors.dlt.broker, filters=self.kpi_collector.dlt_filters) as trace:
             self.test.mtee_target.reboot(prefer_softreboot=True)
-            dlt_msgs = trace.wait_for_multi_filters(
-                filters=kpi_filters_dict,
-                drop=True,
-                count=0,
-                timeout=KPI_COLLECTION_TIMEOUT,
-            )
+            processed_kpis = self.kpi_collector.collect(trace, grace_period=KPI_COLLECTION_TIMEOUT)
             self.test.mtee_target.resume_after_reboot(skip_ready_checks=False)
 
-        for name, config in self.generic_kpis.items():
-            for msg in dlt_msgs:
-                if name in self.processed_kpis.keys():
-                    # Only the first occurrence of each metric is to be processed
-                    break
-
-                match = config["pattern"].search(msg.payload_decoded)
+        logger.debug(f"Processed KPI's: {processed_kpis.keys()}")
 
-                if match and config["type"] == "msg_tmsp":
-                    process_kpi_value(msg.tmsp, config, self.csv_handler, self.kpi_thresholds)
-                    self.processed_kpis.update({name: msg.tmsp})
-
-                elif match and config["type"] == "regex_group":
-                    kpi_value = float(match.group(1))
-                    process_kpi_value(kpi_value, config, self.csv_handler, self.kpi_thresholds)
-                    self.processed_kpis.update({name: kpi_value})
-
-        logger.debug(f"Processed KPI's: {self.processed_kpis.keys()}")
-
-        not_processed_kpis = list(set(self.generic_kpis.keys()) - set(self.processed_kpis.keys()))
+        not_processed_kpis = self.kpi_collector.missing_kpis
         logger.debug(f"KPI's missing: {not_processed_kpis}")
 
-        assert len(self.processed_kpis) == len(self.generic_kpis), f"Failed to process: {not_processed_kpis}"
+        assert len(processed_kpis) == len(self.generic_kpis), f"Failed to process: {not_processed_kpis}"
 
     def test_002_generic_multi_marker_kpi(self):
         """[SIT_Automated] Collect all the multi markers KPIs
@@ -154,26 +127,19 @@ class TestsGenericDLTKPIS(object):
             - Verify if needed kpi's are on processed_kpis list
             - Calculate the difference between time stamps
             - Process the new kpi
+        Note: The multi marker KPIs are calculated and processed by the KPI collector of test_001,
+              as soon as both markers are collected.
         Note: All the metrics will be logged to the ECU log file and also
               to a CSV file.
         Success - if all the metrics were processed and reported
         Failure - if some metric failed to be processed
         """
-        for name, config in self.multi_marker_kpis.items():
-            if config["kpi_1"] in self.processed_kpis.keys() and config["kpi_2"] in self.processed_kpis.keys():
-                tmsp1 = self.processed_kpis[config["kpi_1"]]
-                tmsp2 = self.processed_kpis[config["kpi_2"]]
-                tmsp_diff = tmsp2 - tmsp1
+        processed_multi_marker_kpis = self.kpi_collector.processed_multi_marker_kpis
+        logger.debug(f"Processed multi marker KPI's: {processed_multi_marker_kpis}")
 
-                process_kpi_value(tmsp_diff, {"metric": config["metric"]}, self.csv_handler, self.kpi_thresholds)
-
-                self.processed_multi_marker_kpis.update({name: tmsp_diff})
-
-        not_processed_multi_marker_kpis = list(
-            set(self.multi_marker_kpis.keys()) - set(self.processed_multi_marker_kpis.keys())
-        )
+        not_processed_multi_marker_kpis = self.kpi_collector.missing_multi_marker_kpis
         logger.debug(f"KPI's missing: {not_processed_multi_marker_kpis}")
 
-        assert len(self.processed_multi_marker_kpis) == len(
+        assert len(processed_multi_marker_kpis) == len(
             self.multi_marker_kpis
         ), f"Failed to process: {not_processed_multi_marker_kpis}"
@@ -3,10 +3,12 @@
 import inspect
 import json
 import logging
+import os
 import subprocess
 import time
 import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest import skip
 
@@ -21,6 +23,7 @@ from mtee.testing.tools import (
     metadata,
 )
 from mtee.tools.utils import StopWatch
+from si_test_idcevo.si_test_helpers.target_facts_cache import invalidate_target_facts
 from tee.tools.diagnosis import DiagClient
 from validation_utils.utils import TimeoutCondition
 
@@ -34,6 +37,8 @@ RESPONSE_TIMESTAMP = 1
 RESPONSE_EXCEPTION_TRACEBACK = 2
 SSH_BOOT_TIMEOUT = 240
 REBOOT_CYCLES = 50
+# Run the independent reboot checks of each boot cycle concurrently, instead of one after another
+CONCURRENT_BOOT_CHECKS = bool(int(os.getenv("INTENSIVE_REBOOT_CONCURRENT_CHECKS", "0")))
 
 
 class IntensiveRebootReporter:
@@ -46,11 +51,22 @@ class IntensiveRebootReporter:
         "total_execution_time": "Total execution time (unit: sec)",
         "total_reboot_time": "Total reboot time (unit: sec)",
         "total_reboot_check_time": "Total reboot-checking time (unit: sec)",
+        "total_reboot_check_items_time": "Total time of the reboot-check items (unit: sec)",
+        "total_cycle_time": "Total boot cycle time, with cool down (unit: sec)",
+        "concurrent_checks": "Reboot checks run concurrently",
         "reboot_failed": "Fail reboot times",
         "reboot_check_failed": "Fail reboot-check times",
     }
 
-    def __init__(self, test_name, reboot_times, report_filename=None, expected_boot_mode=None, description=""):
+    def __init__(
+        self,
+        test_name,
+        reboot_times,
+        report_filename=None,
+        expected_boot_mode=None,
+        description="",
+        concurrent_checks=False,
+    ):
         """
         Init the reporter
 
@@ -58,11 +74,13 @@ class IntensiveRebootReporter:
         :param int reboot_times: the times of running the test
         :param Optional[str] report_filename: the report filename.
             The default value is "{test_name}_intensive_reboot_report.json"
+        :param bool concurrent_checks: the reboot checks run concurrently, for report
         """
         self.test_name = test_name
         self.description = description
         self.reboot_times = reboot_times
         self.expected_boot_mode = expected_boot_mode
+        self.concurrent_checks = concurrent_checks
         self.report_path = self.INTENSIVE_REBOOT_REPORT_DIR / (
             report_filename or f"{self.test_name}_intensive_reboot_report.json"
         )
@@ -77,6 +95,9 @@ class IntensiveRebootReporter:
         #         "total_execution_time": 1000,      # unit: sec(s)
         #         "total_reboot_time": 900,          # unit: sec(s)
         #         "total_reboot_check_time": 100,    # unit: sec(s)
+        #         "total_reboot_check_items_time": 180,  # sum of all the check items, unit: sec(s)
+        #         "total_cycle_time": 1200,          # wall time of all the boot cycles, with cool down, unit: sec(s)
+        #         "concurrent_checks": True,         # The reboot checks run concurrently
         #         "reboot_failed": 2,                # The number of exceptions happen during reboot function
         #         "reboot_check_failed": 3,          # The number of fails for checking functions
         #         "reboot_failed_stats: {
@@ -105,7 +126,9 @@ class IntensiveRebootReporter:
         #             "reboot_check": True,
         #             "total": 100.0,                       # "reboot_time" + "reboot_check_time"
         #             "reboot_time": 90.0,                  # sum of "reboot_time_items", unit: sec
-        #             "reboot_check_time": 10.0,            # sum of "reboot_check_time_items", unit: sec
+        #             "reboot_check_time": 10.0,            # wall time of the reboot checks, unit: sec
+        #             "reboot_check_items_time": 18.0,      # sum of "reboot_check_time_items", unit: sec
+        #             "cycle_time": 220.0,                  # "total" + "cool_down_time_after_reboot"
         #             "reboot_time_items": {
         #                 "ecu_reset_and_uds_check": 34.0,  # unit: sec
         #                 "install_coding_esys": 42.0,
@@ -152,6 +175,7 @@ class IntensiveRebootReporter:
 
         self.total_reboot_time = 0
         self.total_reboot_check_time = 0
+        self.total_cycle_time = 0
 
         self.num_reboot_failed = 0
         self.num_reboot_check_failed = 0
@@ -186,19 +210,24 @@ class IntensiveRebootReporter:
     def add_boot_cycle_summary(
         self, boot_cycle, is_reboot, is_reboot_check, reboot_time, reboot_check_time, cool_down_time_after_reboot
     ):
-        self._report["boot_cycle_summary"][boot_cycle].update(
+        boot_cycle_summary = self._report["boot_cycle_summary"][boot_cycle]
+        cycle_time = reboot_time + reboot_check_time + (cool_down_time_after_reboot if is_reboot else 0)
+        boot_cycle_summary.update(
             {
                 "reboot": is_reboot,
                 "reboot_check": is_reboot_check,
                 "total": reboot_time + reboot_check_time,
                 "reboot_time": reboot_time,
                 "reboot_check_time": reboot_check_time,
+                "reboot_check_items_time": sum(boot_cycle_summary["reboot_check_time_items"].values()),
+                "cycle_time": cycle_time,
                 "cool_down_time_after_reboot": cool_down_time_after_reboot,
             }
         )
 
         self.total_reboot_time += reboot_time
         self.total_reboot_check_time += reboot_check_time
+        self.total_cycle_time += cycle_time
 
         self.num_reboot_failed += not is_reboot
         self.num_reboot_check_failed += not is_reboot_check
@@ -210,6 +239,12 @@ class IntensiveRebootReporter:
             "total_execution_time": self.total_execution_time,
             "total_reboot_time": self.total_reboot_time,
             "total_reboot_check_time": self.total_reboot_check_time,
+            "total_reboot_check_items_time": sum(
+                cycle_summary.get("reboot_check_items_time", 0)
+                for cycle_summary in self._report["boot_cycle_summary"].values()
+            ),
+            "total_cycle_time": self.total_cycle_time,
+            "concurrent_checks": self.concurrent_checks,
             "reboot_failed": self.num_reboot_failed,
             "reboot_check_failed": self.num_reboot_check_failed,
             "reboot_failed_stats": {
@@ -269,6 +304,20 @@ class IntensiveRebootRunner:
         "RSU": ("boot_mode_failure", "detected_crash_state"),
     }
 
+    # Checks that can only start once other checks are done, when the checks run concurrently.
+    # The DTCs are only queried once the boot mode confirmed that the ECU is up. The crash state is checked
+    # last, as on the serial order, so it also catches the crashes happening while the others wait for the boot.
+    # Dependencies which are not part of the boot mode checks are ignored.
+    BOOT_CHECK_DEPENDENCIES = {
+        "found_unexpected_dtc": ("boot_mode_failure",),
+        "detected_crash_state": (
+            "boot_mode_failure",
+            "found_unexpected_dtc",
+            "wait_for_android_device",
+            "ssh_not_ready",
+        ),
+    }
+
     def __init__(
         self,
         test_name,
@@ -284,6 +333,7 @@ class IntensiveRebootRunner:
         custom_diagnostic_client=None,
         resume_before_reboot=False,
         cool_down_time_after_reboot=0,
+        concurrent_checks=None,
     ):
         """
         Init the runner
@@ -301,6 +351,8 @@ class IntensiveRebootRunner:
             None presents to check that the boot_mode has value (one of three).
             Otherwise, check that the boot_mode is the same or not
         :param bool serial: If test verifications should be done using serial connection only.
+        :param Optional[bool] concurrent_checks: Run the reboot checks concurrently, respecting
+            BOOT_CHECK_DEPENDENCIES. The default value is CONCURRENT_BOOT_CHECKS.
         """
         self._target = custom_target or TargetShare().target
         self._diagnostic_client = custom_diagnostic_client or diagnostic_client
@@ -315,6 +367,7 @@ class IntensiveRebootRunner:
         self.expected_boot_mode = expected_boot_mode
         self.serial = serial
         self.cool_down_time_after_reboot = cool_down_time_after_reboot
+        self.concurrent_checks = CONCURRENT_BOOT_CHECKS if concurrent_checks is None else concurrent_checks
         self.already_raised_dtcs = []
         self.reporter = IntensiveRebootReporter(
             self.test_name,
@@ -322,6 +375,7 @@ class IntensiveRebootRunner:
             report_filename=report_filename,
             expected_boot_mode=self.expected_boot_mode,
             description=self.description,
+            concurrent_checks=self.concurrent_checks,
         )
 
         self.boot_mode_check_names = self._get_boot_mode_check_names()
@@ -362,24 +416,74 @@ traceback: {traceback.format_exc()}"""
 
         return is_reboot
 
+    def _run_boot_check(self, check_name, boot_cycle):
+        """
+        Run a single reboot check
+
+        :return Tuple[bool, Optional[str], float]: is_passed, error_log and the duration of the check
+        """
+        is_passed = True
+        error_log = ""
+
+        with StopWatch() as check_watch:
+            try:
+                is_passed, error_log = getattr(self, f"{self.BOOT_CHECK_FUNCS[check_name]}")(boot_cycle)
+            except Exception as err:
+                is_passed = False
+                error_log = str(err)
+
+        return is_passed, error_log, check_watch.duration
+
+    def _run_boot_checks_concurrently(self, boot_cycle):
+        """
+        Run the reboot checks in parallel threads
+
+        Each check waits for its BOOT_CHECK_DEPENDENCIES before starting, so the boot cycle takes as long as
+        the slowest chain of checks, instead of the sum of all of them.
+
+        :return Dict[str, Tuple[bool, Optional[str], float]]: the result of each check
+        """
+        futures = {}
+
+        def run_after_dependencies(check_name):
+            for dependency in self.BOOT_CHECK_DEPENDENCIES.get(check_name, ()):
+                if dependency in futures:
+                    futures[dependency].result()
+            return self._run_boot_check(check_name, boot_cycle)
+
+        # Dependencies are submitted before their dependants and there is one thread per check,
+        # so a check never waits for a check that can not start
+        check_names = sorted(
+            self.boot_mode_check_names,
+            key=lambda check_name: self._get_boot_check_depth(check_name, self.boot_mode_check_names),
+        )
+        with ThreadPoolExecutor(max_workers=len(check_names) or 1) as executor:
+            for check_name in check_names:
+                futures[check_name] = executor.submit(run_after_dependencies, check_name)
+
+        return {check_name: future.result() for check_name, future in futures.items()}
+
+    def _get_boot_check_depth(self, check_name, check_names):
+        """Return the length of the longest dependency chain of a check, among the given checks"""
+        dependencies = [
+            dependency for dependency in self.BOOT_CHECK_DEPENDENCIES.get(check_name, ()) if dependency in check_names
+        ]
+        return max((self._get_boot_check_depth(dependency, check_names) + 1 for dependency in dependencies), default=0)
+
     def reboot_check(self, boot_cycle, is_log=True):
         is_passed_all = True
 
-        for check_name in self.boot_mode_check_names:
-            is_passed = True
-            error_log = ""
+        if self.concurrent_checks:
+            check_results = self._run_boot_checks_concurrently(boot_cycle)
 
-            with StopWatch() as check_watch:
-                try:
-                    is_passed, error_log = getattr(self, f"{self.BOOT_CHECK_FUNCS[check_name]}")(boot_cycle)
-                except Exception as err:
-                    is_passed = False
-                    error_log = str(err)
+        for check_name in self.boot_mode_check_names:
+            if self.concurrent_checks:
+                is_passed, error_log, duration = check_results[check_name]
+            else:
+                is_passed, error_log, duration = self._run_boot_check(check_name, boot_cycle)
 
             if is_log:
-                self.reporter.add_reboot_check_item_log(
-                    boot_cycle, check_name, is_passed, error_log, check_watch.duration
-                )
+                self.reporter.add_reboot_check_item_log(boot_cycle, check_name, is_passed, error_log, duration)
             else:
                 if not is_passed:
                     logger.error(
@@ -392,7 +496,7 @@ traceback: {traceback.format_exc()}"""
                 boot_cycle if boot_cycle else -1,
                 check_name,
                 "pass" if is_passed else "fail",
-                check_watch.duration,
+                duration,
             )
 
             is_passed_all &= is_passed
@@ -749,11 +853,18 @@ class IntensiveRebootRunnerCoding(IntensiveRebootRunnerECUReset):
         if not self.reboot_check(-1, is_log=False):
             raise RuntimeError("ECU reset error")
 
+    def code_target(self):
+        """Code the target with esys, discarding the target facts cached for it"""
+        try:
+            self._target.install_coding_esys(enable_doip_protocol=True)
+        finally:
+            invalidate_target_facts(self._target.options.vin)
+
     def reboot(self, boot_cycle, is_log=True):
         is_reboot = True
 
         reboot_steps = (
-            ("coding_target", lambda: self._target.install_coding_esys(enable_doip_protocol=True)),
+            ("coding_target", self.code_target),
             ("ecu_reset_and_uds_check", lambda: self._ecu_reset.ecu_reset(boot_cycle)),
         )
         for step_name, func in reboot_steps:
@@ -3,7 +3,6 @@
 import configparser
 import datetime
 import logging
-import random
 import re
 import time
 from pathlib import Path
@@ -12,7 +11,13 @@ from mtee.testing.connectors.connector_dlt import DLTContext
 from mtee.testing.support.target_share import TargetShare
 from mtee.testing.tools import assert_equal, metadata
 from si_test_idcevo.si_test_helpers.android_testing.test_base import TestBase
-from si_test_idcevo.si_test_helpers.report_helpers import RobustnessLifecycleReporter
+from si_test_idcevo.si_test_helpers.reboot_scheduler import (
+    REBOOT_SCHEDULER_REPLAY,
+    REBOOT_SCHEDULER_SEED,
+    RebootScheduler,
+    load_replay_steps,
+)
+from si_test_idcevo.si_test_helpers.report_helpers import REPORT_JOURNAL_RESUME, RobustnessLifecycleReporter
 
 target = TargetShare().target
 config = configparser.ConfigParser()
@@ -43,6 +48,7 @@ class TestsRobustnessSwitchingModes(object):
         cls.expected_mode, cls.wakeup_reason = "", ""
         cls.error_msg = ""
         cls.waiting_time = 0
+        cls.seed = None
 
         cls.msg_filters = [
             {
@@ -58,7 +64,19 @@ class TestsRobustnessSwitchingModes(object):
             test_name="robustness_switch_modes_tests",
             description="Test report for robustness on switching randomly between APP and Bolo modes",
             report_filename=cls.report_filename,
+            resume=REPORT_JOURNAL_RESUME,
         )
+        # With REPORT_JOURNAL_RESUME=1, the reboots continue from the last one of a previous run, with its seed
+        cycle_summaries = [cls.reporter.get_cycle_summary(cycle) for cycle in range(1, cls.reporter.last_cycle + 1)]
+        last_cycle_summary = cycle_summaries[-1] if cycle_summaries else {}
+        cls.boot_mode = last_cycle_summary.get("boot_mode", "")
+
+        cls.scheduler = RebootScheduler(
+            REBOOT_MODES,
+            seed=REBOOT_SCHEDULER_SEED or last_cycle_summary.get("seed"),
+            replay_steps=load_replay_steps(REBOOT_SCHEDULER_REPLAY) if REBOOT_SCHEDULER_REPLAY else None,
+        )
+        cls.scheduler.restore(cycle_summaries)
 
     def verify_wakeupreason(self, dlt_msg):
         """
@@ -77,14 +95,17 @@ class TestsRobustnessSwitchingModes(object):
     def reboot_randomly_between_modes(self):
         """
         Reboot target randomly according to the reboot_mode and point of time
-        after ECU can starting receive requests
+        after ECU can starting receive requests. The mode and the waiting time (between 0 and 5 minutes)
+        are drawn by the scheduler, covering every mode transition and waiting time bucket.
         """
         self.prev_boot_mode = self.boot_mode
         self.boot_mode = ""
         self.wakeup_reason = ""
 
-        self.waiting_time = random.randint(0, 300)  # between 0 and 5 minutes
-        self.expected_mode = random.choice(REBOOT_MODES)
+        reboot_step = self.scheduler.next_step(self.prev_boot_mode)
+        self.waiting_time = reboot_step.waiting_time
+        self.expected_mode = reboot_step.mode
+        self.seed = reboot_step.seed
 
         reboot_function = self.modes_mapping[self.expected_mode].get("reboot_function", "")
 
@@ -140,6 +161,7 @@ class TestsRobustnessSwitchingModes(object):
             "boot_mode": self.boot_mode,
             "wakeup_reason": self.wakeup_reason,
             "waiting_time": self.waiting_time,
+            "seed": self.seed,
         }
 
         boot_cycle_summary = self.add_error_msg(boot_cycle_summary)
@@ -183,12 +205,17 @@ class TestsRobustnessSwitchingModes(object):
             3 - Check startup in the expected mode
             4 - In case of failure continue with the test sequence
         """
-        num_of_tries = 0
+        num_of_tries = self.reporter.last_cycle
         to_break = False
-        initial_time = time.time()
+        initial_time = self.reporter.start_time
         run_total_time = 3 * 60 * 60  # 3 hours
         while not to_break:
-            if time.time() - initial_time >= run_total_time:
+            if self.scheduler.is_replay:
+                # The replay may have no reboots, or have been completed by the run resumed
+                if self.scheduler.is_replay_done():
+                    break
+                to_break = self.scheduler.is_last_step()
+            elif time.time() - initial_time >= run_total_time:
                 to_break = True
             num_of_tries += 1
             self.reboot_randomly_between_modes()
@@ -198,13 +225,12 @@ class TestsRobustnessSwitchingModes(object):
                 f"Wakeup reason: {self.wakeup_reason}"
             )
             test_status = (self.expected_mode == self.boot_mode) and bool(self.wakeup_reason)
-            if not test_status:
-                self.reporter.num_reboot_failed += 1
             self.add_boot_cycle_summary_on_report(num_of_tries, test_status)
 
         total_time_elapsed_sec = time.time() - initial_time
         self.reporter.total_execution_time = str(datetime.timedelta(seconds=total_time_elapsed_sec))
-        self.reporter.num_reboot = num_of_tries
+        self.reporter.seed = self.scheduler.seed
+        self.reporter.transition_coverage = self.scheduler.coverage_summary()
 
         self.reporter.add_report_summary()
 
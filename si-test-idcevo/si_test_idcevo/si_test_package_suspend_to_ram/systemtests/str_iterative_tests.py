@@ -1,7 +1,6 @@
 # Copyright (C) 2025. BMW Car IT GmbH. All rights reserved.
 """Intensive-STR test cases"""
 import logging
-import re
 
 from mtee.testing.test_environment import TEST_ENVIRONMENT, require_environment, require_environment_setup
 from mtee.testing.tools import parse_whitelisted_ids
@@ -12,8 +11,9 @@ from si_test_idcevo.si_test_helpers.diagnostic_helper import (
     enable_postpone_shutdown,
     get_postpone_shutdown_status,
 )
-from si_test_idcevo.si_test_helpers.report_helpers import IterativeSTRReporter
+from si_test_idcevo.si_test_helpers.report_helpers import IterativeSTRReporter, REPORT_JOURNAL_RESUME
 from si_test_idcevo.si_test_helpers.str_helpers import (
+    STRCycleError,
     get_str_state,
     perform_str,
     set_str_state_and_reboot_target,
@@ -157,12 +157,7 @@ class TestIterativeSTR:
         """
         resume_no_before_str = 0
         resume_no_after_str = 0
-        failures_during_str = 0
-        failures_during_pre_check_validation = 0
-        failures_during_post_check_validation = 0
-        str_duration = 0
-        time_to_enter_str = 0
-        time_to_exit_str = 0
+        str_result = None
         is_str_success = False
         is_str_pre_check_success = False
         is_str_post_check_success = False
@@ -173,7 +168,13 @@ class TestIterativeSTR:
             test_name="test_str_iterations",
             str_cycles=NUMBER_OF_STR_CYCLES,
             description=f"Run {NUMBER_OF_STR_CYCLES} STR consecutive iterations",
+            resume=REPORT_JOURNAL_RESUME,
         )
+        # With REPORT_JOURNAL_RESUME=1, the cycles continue from the last one of a previous run. The target was
+        # rebooted by 'setup_class', so the Resume Number starts again from 0.
+        failures_during_str = reporter.time_metrics["number_of_str_cycles_failed"]
+        failures_during_pre_check_validation = reporter.num_str_pre_check_failed
+        failures_during_post_check_validation = reporter.num_str_post_check_failed
 
         try:
             services_whitelist = parse_whitelisted_ids("/resources/services-whitelist-idcevo", [])
@@ -183,7 +184,7 @@ class TestIterativeSTR:
 
         services_whitelist.extend(EXTRA_WHITELISTED_SERVICES)
 
-        for str_cycle in range(1, NUMBER_OF_STR_CYCLES + 1):
+        for str_cycle in range(reporter.last_cycle + 1, NUMBER_OF_STR_CYCLES + 1):
             # For each str cycle, we create a new directory with the cycle number as name, under 'test.results_dir'
             # Screenshots taken throughout the cycle will be placed there
             screenshot_dir = "{0:03}".format(str_cycle)
@@ -191,26 +192,20 @@ class TestIterativeSTR:
                 str_pre_check_validations(self.test, screenshot_dir)
                 is_str_pre_check_success = True
 
-                (
-                    network_down,
-                    current_resume_number,
-                    str_duration,
-                    time_to_enter_str,
-                    time_to_exit_str,
-                    expected_cold_boot,
-                ) = perform_str(
+                str_result = perform_str(
                     self.test,
                     iteration=str_cycle,
                     resume_number_before_str=resume_no_before_str,
                     resume_number_after_str=resume_no_after_str,
                     services_whitelist=services_whitelist,
                 )
-                resume_no_after_str = current_resume_number
+                resume_no_after_str = str_result.resume_number
+                expected_cold_boot = str_result.expected_cold_boot
                 is_str_success = True
 
                 # If a cold boot was expected, then the STR post validations are not applicable
                 if not expected_cold_boot:
-                    str_post_check_validations(self.test, network_down, screenshot_dir)
+                    str_post_check_validations(self.test, str_result.network_down, screenshot_dir)
                     is_str_post_check_success = True
 
             except Exception as e:
@@ -226,56 +221,11 @@ class TestIterativeSTR:
                 elif not is_str_success:
                     error_msg = f"Failed to Execute STR Successfully! {str(e)}"
                     logger.debug(error_msg)
-                    error_splitted = [cause_of_error.strip() for cause_of_error in str(e).split(" | ")]
-
-                    # If the failure was due to some error before entering STR
-                    if "PowerStateMachine input: pwf is: PARKEN" in error_splitted[0]:
-                        resume_no_after_str = 0
-
-                    # If target entered PARKEN but some Error was raised before entering STR
-                    elif "Failure entering STR!" in error_splitted[1]:
-                        # If target still entered STR
-                        if not "vm_control_suspended" or "entering_str" in error_splitted[0]:
-                            resume_no_after_str += 1
-                        # If target failed to enter STR
-                        else:
-                            resume_no_after_str = 0
-
-                    # If the failure was due to a mismatch in STR Resume Number
-                    elif not error_splitted[2].endswith("[]"):
-                        # Search the mismatch message for the actual Resume Number received
-                        resume_numbers = re.findall(r"\d+", str(e))
-                        expected_resume_number = int(resume_numbers[0])
-                        resume_no_after_str = int(resume_numbers[-1])
-                        # If we were expecting a cold boot but it didn't happen
-                        if expected_resume_number == 0:
-                            expected_cold_boot = True
-
-                    # If the failure was due to timestamp tolerance being exceeded
-                    elif not error_splitted[3].endswith("[]"):
-                        resume_no_after_str = 0
-
-                    # If the failure was due to WOHNEN message or Resume messages not appearing
-                    # but still the target entered STR
-                    elif (
-                        (
-                            "entering_wohnen" in error_splitted[0]
-                            or "resume_number" in error_splitted[0]
-                            or "vm_control_resumed" in error_splitted[0]
-                        )
-                        and "vm_control_suspended" not in error_splitted[0]
-                        and "entering_str" not in error_splitted[0]
-                    ):
-                        resume_no_after_str += 1
-
-                    # If the failure was due to a detected service failure but still the STR cycle was successful
-                    elif (
-                        ("service_failure" in error_splitted[1] or "coredump_found" in error_splitted[1])
-                        and error_splitted[0].endswith("[]")
-                        and error_splitted[2].endswith("[]")
-                        and error_splitted[3].endswith("[]")
-                    ):
-                        resume_no_after_str += 1
+                    if isinstance(e, STRCycleError):
+                        # The Resume Number depends on how far the target went through the failed cycle
+                        str_result = e.result
+                        resume_no_after_str = str_result.next_resume_number()
+                        expected_cold_boot = str_result.expected_cold_boot
 
                     failures_during_str += 1
                     # If STR fails during 'perform_str', post check validations are not performed
@@ -297,10 +247,11 @@ class TestIterativeSTR:
                     is_str_pre_check_success,
                     is_str_post_check_success,
                     error_msg,
-                    str_duration,
-                    time_to_enter_str,
-                    time_to_exit_str,
+                    str_result.str_duration if str_result else 0,
+                    str_result.time_to_enter_str if str_result else 0,
+                    str_result.time_to_exit_str if str_result else 0,
                     expected_cold_boot,
+                    phase_timeline=str_result.to_dict() if str_result else None,
                 )
                 logger.debug(f"At iteration {str_cycle}:")
                 logger.debug(f"Resume Number before STR: {resume_no_before_str}")
@@ -312,9 +263,7 @@ class TestIterativeSTR:
                 is_str_post_check_success = False
                 is_str_pre_check_success = False
                 error_msg = ""
-                str_duration = 0
-                time_to_enter_str = 0
-                time_to_exit_str = 0
+                str_result = None
                 self.setup()
 
         total_failures = (
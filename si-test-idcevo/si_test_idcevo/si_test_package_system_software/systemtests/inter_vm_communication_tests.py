@@ -22,6 +22,7 @@ from si_test_idcevo.si_test_helpers.reboot_handlers import (
     reboot_and_wait_for_android_target,
     wait_for_application_target,
 )
+from si_test_idcevo.si_test_helpers.remote_probe import RemoteProbe
 from si_test_idcevo.si_test_helpers.test_helpers import check_ipk_installed
 from tee.target_common import NsmRestartReasons
 
@@ -400,6 +401,7 @@ class TestsInterVMCommunication(object):
             /proc/device-tree/ufs@0x17E10000/vlink-compatible"
 
         2 - For each vufs/vsxgmac device found, determine its value and status.
+            The value and status of all the devices are read in a single adb call (RemoteProbe).
             Example for vufs, considering the example device:
             - "/proc/device-tree/ufs@0x16E10000/vlink-compatible"
 
@@ -426,16 +428,20 @@ class TestsInterVMCommunication(object):
         vlink_devices_list = re.findall(vlink_pattern, str(vlink_devices_output))
         logger.info(f"{vlink_device} devices list: {vlink_devices_list}")
 
+        probe = RemoteProbe(self.test.apinext_target)
+        for device in range(len(vlink_devices_list)):
+            command_check_status = vlink_devices_list[device].replace(check_status_keyword_to_replace, "status")
+            probe.add_read(f"value_{device}", vlink_devices_list[device])
+            probe.add_read(f"status_{device}", command_check_status)
+        probe_results = probe.run()
+
         for device in range(len(vlink_devices_list)):
             logger.info(f"{vlink_device} device: {vlink_devices_list[device]}")
 
-            vlink_value = self.test.apinext_target.execute_command(["cat", vlink_devices_list[device], "&&", "echo"])
-            vlink_value = self.remove_non_ascii_characters(str(vlink_value))
+            vlink_value = self.remove_non_ascii_characters(probe_results[f"value_{device}"].stdout)
             logger.info(f"{vlink_device} value: {vlink_value}")
 
-            command_check_status = vlink_devices_list[device].replace(check_status_keyword_to_replace, "status")
-            vlink_status = self.test.apinext_target.execute_command(["cat", command_check_status, "&&", "echo"])
-            vlink_status = self.remove_non_ascii_characters(str(vlink_status)).lower()
+            vlink_status = self.remove_non_ascii_characters(probe_results[f"status_{device}"].stdout).lower()
             logger.info(f"{vlink_device} status: {vlink_status}")
 
             if vlink_status == "disabled":